@@ -6,6 +6,41 @@ import json
 # ── CONFIGURATION ──
 # Defaults to localhost for testing, but respects Render/Cloud env vars
 API_URL = os.getenv("BACKEND_API_URL", "http://127.0.0.1:8000/generate-workout")
+STREAM_API_URL = os.getenv("BACKEND_STREAM_API_URL", API_URL.rstrip("/") + "/stream")
+
+def iter_sse_events(response):
+    """Yields (event, data) pairs from a text/event-stream response."""
+    event, data_lines = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+
+def render_exercise_card(exercise):
+    tags = exercise.get('tags', exercise.get('tag', []))
+    tag_str = ", ".join(tags) if isinstance(tags, list) else str(tags)
+
+    st.markdown(f"""
+    <div style="padding: 20px; border: 1px solid #444; border-radius: 12px; background-color: #262730; height: 100%; display: flex; flexDirection: column; justifyContent: space-between;">
+        <div>
+            <h4 style="color: #FF4B4B; margin-top: 0;">{exercise.get('name', 'Exercise')}</h4>
+            <span style="background: #333; color: #fff; padding: 4px 8px; border-radius: 4px; font-size: 0.8em;">{tag_str.upper()}</span>
+            <p style="margin-top: 15px; font-weight: bold; font-size: 1.1em;">{exercise.get('sets_reps', '3 x 10')}</p>
+            <p style="color: #bbb; font-size: 0.9em;">Tempo: {exercise.get('tempo', '2-0-2')}</p>
+        </div>
+        <div>
+            <hr style="border-color: #444;">
+            <p style="font-style: italic; color: #ddd; font-size: 0.95em;">💡 "{exercise.get('coach_tip', '')}"</p>
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
 
 # Initialize session state for manual override
 if 'use_manual_scores' not in st.session_state:
@@ -270,57 +305,53 @@ if submit_btn:
         }
     }
 
-    # 2. Call API
-    with st.spinner("🤖 AI Coach is analyzing faults and querying NeonDB..."):
-        try:
-            response = requests.post(API_URL, json=payload, timeout=120)
-            
-            if response.status_code == 200:
-                data = response.json()
+    # 2. Call API (streamed: analysis first, then each exercise card as soon as it is written)
+    status_box = st.empty()
+    st.markdown("### 📋 Prescribed Exercises")
+    grid = st.columns(3)
+    data = None
+    try:
+        status_box.info("🤖 AI Coach is analyzing faults and querying NeonDB...")
+        with requests.post(STREAM_API_URL, json=payload, stream=True, timeout=(10, 120)) as response:
+            if response.status_code != 200:
+                status_box.error(f"API Error ({response.status_code}): {response.text}")
+            else:
+                card_count = 0
+                for event, event_data in iter_sse_events(response):
+                    if event == "analysis":
+                        if event_data.get('status') == "STOP":
+                            st.error(f"🛑 MEDICAL REFERRAL REQUIRED: {event_data.get('reason', 'Pain detected.')}")
+                        status_box.info(f"🤖 {event_data.get('status')} (Level {event_data.get('target_level')}) – writing your plan...")
+                    elif event == "card":
+                        with grid[card_count % 3]:
+                            render_exercise_card(event_data)
+                        card_count += 1
+                    elif event == "plan":
+                        data = event_data
+                    elif event == "error":
+                        status_box.error(event_data.get('detail', 'Generation failed.'))
 
-                if data.get('status') == "STOP":
-                    st.error(f"🛑 MEDICAL REFERRAL REQUIRED: {data.get('reason', 'Pain detected.')}")
-                
-                # --- RESULTS DISPLAY ---
-                color_map = {"Green": "green", "Yellow": "orange", "Red": "red"}
-                ui_color = color_map.get(data.get("difficulty_color", "Green"), "blue")
-                
-                st.subheader(f"🎯 Target Session: :{ui_color}[{data.get('session_title', 'Workout')}]")
-                st.info(f"**Coach's Logic:** {data.get('coach_summary', '')}")
-                
-                # --- RENDER EXERCISES ---
-                st.markdown("### 📋 Prescribed Exercises")
-                if data.get('exercises'):
-                    grid = st.columns(3)
-                    for i, exercise in enumerate(data['exercises']):
+                if data is not None:
+                    # --- RESULTS DISPLAY ---
+                    color_map = {"Green": "green", "Yellow": "orange", "Red": "red"}
+                    ui_color = color_map.get(data.get("difficulty_color", "Green"), "blue")
+
+                    status_box.empty()
+                    st.subheader(f"🎯 Target Session: :{ui_color}[{data.get('session_title', 'Workout')}]")
+                    st.info(f"**Coach's Logic:** {data.get('coach_summary', '')}")
+
+                    # Cards not streamed (e.g. cached or fallback plans) are rendered from the final plan
+                    for i, exercise in enumerate(data.get('exercises', [])[card_count:], start=card_count):
                         with grid[i % 3]:
-                            tags = exercise.get('tags', [])
-                            tag_str = ", ".join(tags) if isinstance(tags, list) else str(tags)
-                            
-                            st.markdown(f"""
-                            <div style="padding: 20px; border: 1px solid #444; border-radius: 12px; background-color: #262730; height: 100%; display: flex; flexDirection: column; justifyContent: space-between;">
-                                <div>
-                                    <h4 style="color: #FF4B4B; margin-top: 0;">{exercise.get('name', 'Exercise')}</h4>
-                                    <span style="background: #333; color: #fff; padding: 4px 8px; border-radius: 4px; font-size: 0.8em;">{tag_str.upper()}</span>
-                                    <p style="margin-top: 15px; font-weight: bold; font-size: 1.1em;">{exercise.get('sets_reps', '3 x 10')}</p>
-                                    <p style="color: #bbb; font-size: 0.9em;">Tempo: {exercise.get('tempo', '2-0-2')}</p>
-                                </div>
-                                <div>
-                                    <hr style="border-color: #444;">
-                                    <p style="font-style: italic; color: #ddd; font-size: 0.95em;">💡 "{exercise.get('coach_tip', '')}"</p>
-                                </div>
-                            </div>
-                            """, unsafe_allow_html=True)
-                else:
-                    st.warning("No exercises returned. Check if Database is populated.")
+                            render_exercise_card(exercise)
 
-                with st.expander("🔍 Debug Data"):
-                    st.json(data)
+                    if not data.get('exercises'):
+                        st.warning("No exercises returned. Check if Database is populated.")
 
-            else:
-                st.error(f"API Error ({response.status_code}): {response.text}")
+                    with st.expander("🔍 Debug Data"):
+                        st.json(data)
 
-        except requests.exceptions.ConnectionError:
-            st.error(f"❌ Could not connect to {API_URL}. Is the backend running?")
-        except Exception as e:
-            st.error(f"An error occurred: {e}")
\ No newline at end of file
+    except requests.exceptions.ConnectionError:
+        st.error(f"❌ Could not connect to {STREAM_API_URL}. Is the backend running?")
+    except Exception as e:
+        st.error(f"An error occurred: {e}")
@@ -1,12 +1,13 @@
 import asyncio
-from src.database import engine, Base
+from src.database import engine, SCHEMA_VERSION, ensure_schema
 
 async def init_db():
     print("⏳ Connecting to Database...")
     async with engine.begin() as conn:
-        # This checks your blueprints and creates any missing tables
-        await conn.run_sync(Base.metadata.create_all)
-    print("✅ Success! Tables created.")
+        # This checks your blueprints and creates any missing tables, adds columns
+        # introduced since the tables were first created, and stamps the schema version
+        await ensure_schema(conn, force=True)
+    print(f"✅ Success! Tables created (schema version {SCHEMA_VERSION}).")
 
 if __name__ == "__main__":
     asyncio.run(init_db())
\ No newline at end of file
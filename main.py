@@ -1,33 +1,62 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
 import json
 import uvicorn
 import os
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import Dict, Any
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
 
 # ── IMPORTS ──
-from src.logic.fms_analyzer import analyze_fms_profile
-from src.rag.retriever import get_exercises_by_profile
-from src.rag.generator import generate_workout_plan
-from src.database import AsyncSessionLocal, AssessmentInput, AssessmentScore, engine, Base
+from src.logic.fms_schema import FMS_FAULT_SCHEMA
+from src.pipeline import PipelineContext, build_pipeline_context, build_pipeline_contexts, update_pipeline_context
+from src.screening_sessions import ScreeningSession, screening_sessions
+from src.rag.retriever import get_exercises_by_profile, get_exercises_for_profiles, retrieval_cache
+from src.rag.knowledge_base import kb_store
+from src.rag.generator import agenerate_workout_plan, areassess_workout_plan, astream_workout_plan, init_llm_limiter
+from src.database import AsyncSessionLocal, AssessmentInput, AssessmentScore
+from src.persistence import assessment_writer, pending_assessment, write_assessments, write_job_assessment
+from src.jobs import enqueue_job, get_job, job_view
+from src.analytics import fault_cohort
+from src.athletes import athlete_history, athlete_view, create_athlete, get_athlete, missing_athletes
+from src.metrics import STAGE_SECONDS, InFlightMiddleware, registry as metrics_registry
+from src.rag.llm_cache import llm_cache
+from src.warmup import warm_up, warmup_state
+
+# Cold-start budget for importing this module. The LLM stack (langchain_core prompts,
+# langchain_groq) and pandas are imported lazily and must stay out of this path.
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "3.0"))
+IMPORT_SECONDS = None  # set at the end of this module
 
 # ────────────────────────────────────────────────
 # Lifecycle (Startup)
 # ────────────────────────────────────────────────
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("🚀 Starting up: Connecting to NeonDB...")
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    print("✅ Neon DB Connection Verified & Tables Ready.")
+    budget = "over budget!" if IMPORT_SECONDS > IMPORT_BUDGET_SECONDS else f"budget {IMPORT_BUDGET_SECONDS:.1f}s"
+    print(f"🚀 Starting up: main imported in {IMPORT_SECONDS:.2f}s ({budget})")
+    # Schema check, DB connections, KB/index and LLM client warm up in the background; /readyz reports when done
+    warmup = asyncio.create_task(warm_up(warmup_state))
+    init_llm_limiter()
+    assessment_writer.start()
     yield
+    warmup.cancel()
+    # Write everything still queued before the process exits
+    await assessment_writer.stop()
+    print(f"💾 Assessment writer drained: {assessment_writer.stats()}")
 
 app = FastAPI(title="FMS Smart Coach API", version="3.3", lifespan=lifespan)
 
+app.add_middleware(InFlightMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -237,6 +266,7 @@ class FMSProfileRequest(BaseModel):
     trunk_stability_pushup: TSPData
     rotary_stability: RSData
     use_manual_scores: bool = False
+    athlete_id: Optional[int] = None
 
 class CalculatedScores(BaseModel):
     overhead_squat: int
@@ -249,6 +279,17 @@ class CalculatedScores(BaseModel):
 
 class WorkoutFromScoresRequest(BaseModel):
     calculated_scores: CalculatedScores
+    athlete_id: Optional[int] = None
+
+class AthleteCreateRequest(BaseModel):
+    external_ref: Optional[str] = None
+    name: Optional[str] = None
+
+class ScreeningTestPatch(BaseModel):
+    """Partial update for one test of a live screening; omitted fields keep their current value."""
+    score: Optional[int] = None
+    clearing_pain: Optional[bool] = None
+    sub_faults: Dict[str, Dict[str, int]] = {}   # category -> {fault: 0/1}
 
 # ────────────────────────────────────────────────
 # API Endpoints
@@ -261,81 +302,140 @@ async def get_db():
 # ────────────────────────────────────────────────
 # MAIN ENDPOINT
 # ────────────────────────────────────────────────
-async def _process_workout_generation(full_data: Dict[str, Any], db: AsyncSession):
-    """
-    Reusable core logic for FMS analysis -> Exercise Retrieval -> Workout Generation -> DB Save.
-    """
+def _run_analysis(full_data: Dict[str, Any]) -> PipelineContext:
     # ─────────────────────────────────────────────────
-    # 1. Analyze FMS profile
+    # 1. Analyze FMS profile (once; later stages reuse the context)
     # ─────────────────────────────────────────────────
     try:
-        analysis = analyze_fms_profile(
-            full_data,
-            use_manual_scores=full_data.get('use_manual_scores', False)
-        )
+        with STAGE_SECONDS.time("analyze"):
+            context = build_pipeline_context(full_data)
         
-        effective_scores = analysis.get("effective_scores", {})
         print("\n" + "="*40)
-        print(f"🧐 DEBUG: CALCULATED SCORES: {effective_scores}")
-        print(f"🧐 DEBUG: ANALYSIS STATUS: {analysis.get('status')}")
+        print(f"🧐 DEBUG: CALCULATED SCORES: {context.effective_scores}")
+        print(f"🧐 DEBUG: ANALYSIS STATUS: {context.status}")
         print("="*40 + "\n")
+        return context
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analyzer Error: {str(e)}")
 
+async def _run_retrieval(context: PipelineContext) -> List[Dict[str, Any]]:
     # ─────────────────────────────────────────────────
     # 2. Retrieve relevant exercises
     # ─────────────────────────────────────────────────
     try:
-        retrieval_result = await get_exercises_by_profile(
-            simple_scores=effective_scores,
-            detailed_faults=full_data
-        )
+        with STAGE_SECONDS.time("retrieve"):
+            retrieval_result = await get_exercises_by_profile(
+                simple_scores=context.effective_scores,
+                detailed_faults=context.full_data,
+                context=context
+            )
         
         exercises = retrieval_result.get("data", [])
         
-        print(f"🧐 DEBUG: RETRIEVED {len(exercises)} EXERCISES")
+        print(f"🧐 DEBUG: RETRIEVED {len(exercises)} EXERCISES (kb_version={retrieval_result.get('kb_version')})")
         if exercises:
             names = [ex.get('exercise_name', 'MISSING_NAME') for ex in exercises]
             print(f"Top exercises: {names[:5]}")
         else:
             print("⚠️ WARNING: No exercises found for this profile!")
+        return exercises
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Retrieval Error: {str(e)}")
 
+async def _save_assessments(
+    db: AsyncSession,
+    results: List[Tuple[PipelineContext, Dict[str, Any]]]
+) -> int:
     # ─────────────────────────────────────────────────
-    # 3. Generate workout plan
+    # 4. Save to database (non-blocking)
     # ─────────────────────────────────────────────────
+    # Every (context, plan) pair goes in one transaction (multi-row INSERT ... RETURNING).
+    # Returns the number of assessments saved (0 when the transaction was rolled back).
     try:
-        final_plan = generate_workout_plan(analysis, exercises)
-        final_plan["calculated_scores"] = effective_scores
+        return len(await write_assessments(db, [pending_assessment(context, plan) for context, plan in results]))
+    except Exception as e:
+        await db.rollback()
+        print(f"❌ DB Save Error (non-blocking): {str(e)}")
+        return 0
+
+async def _save_assessment(
+    db: AsyncSession,
+    context: PipelineContext,
+    final_plan: Dict[str, Any]
+):
+    # Handed to the background writer; written inline only when it is not running or its queue is full
+    if not assessment_writer.submit(pending_assessment(context, final_plan)):
+        await _save_assessments(db, [(context, final_plan)])
+
+async def _save_job_assessment(
+    db: AsyncSession,
+    job_id: str,
+    context: PipelineContext,
+    final_plan: Dict[str, Any]
+) -> Dict[str, Any]:
+    # Written inline, at most once per job: when an earlier attempt (or the worker that took over
+    # an expired lease) already saved one, the plan stored with it is returned instead.
+    try:
+        assessment_id, saved = await write_job_assessment(db, job_id, pending_assessment(context, final_plan))
+    except Exception:
+        await db.rollback()
+        raise
+    if saved:
+        return final_plan
+    stored = (await db.execute(
+        select(AssessmentScore.generated_workout).where(AssessmentScore.id == assessment_id)
+    )).scalar()
+    return stored or final_plan
+
+async def _unknown_athletes(db: AsyncSession, athlete_ids: List[Optional[int]]) -> set:
+    # Unknown ids are rejected before any work is done; with the DB unreachable the check is
+    # skipped, like the (non-blocking) save it protects.
+    try:
+        return await missing_athletes(db, athlete_ids)
+    except Exception as e:
+        print(f"⚠️ Athlete check skipped (DB unavailable): {str(e)}")
+        return set()
+
+async def _require_athlete(db: AsyncSession, full_data: Dict[str, Any]):
+    athlete_id = full_data.get("athlete_id")
+    if athlete_id is not None and await _unknown_athletes(db, [athlete_id]):
+        raise HTTPException(status_code=404, detail=f"Athlete {athlete_id} not found.")
+
+async def _process_workout_generation(
+    full_data: Dict[str, Any],
+    db: AsyncSession,
+    context: Optional[PipelineContext] = None,
+    durable: bool = False,
+    job_id: Optional[str] = None
+):
+    """
+    Reusable core logic for FMS analysis -> Exercise Retrieval -> Workout Generation -> DB Save.
+    Pass `context` when the profile has already been analyzed (e.g. a screening session).
+    `durable=True` (queued jobs): an LLM failure raises instead of returning the fallback plan,
+    and the assessment is written inline, so the caller only sees a plan that is generated and saved.
+    With `job_id`, the assessment is saved once per job however many attempts run.
+    """
+    await _require_athlete(db, full_data)
+    context = context or _run_analysis(full_data)
+    exercises = await _run_retrieval(context)
 
-        # ─────────────────────────────────────────────────
-        # 4. Save to database (non-blocking)
-        # ─────────────────────────────────────────────────
-        try:
-            input_entry = AssessmentInput(raw_json_data=full_data)
-            db.add(input_entry)
-            await db.flush()
-
-            score_entry = AssessmentScore(
-                input_id=input_entry.id,
-                overhead_squat=effective_scores.get('overhead_squat', 0),
-                hurdle_step=effective_scores.get('hurdle_step', 0),
-                inline_lunge=effective_scores.get('inline_lunge', 0),
-                shoulder_mobility=effective_scores.get('shoulder_mobility', 0),
-                active_straight_leg_raise=effective_scores.get('active_straight_leg_raise', 0),
-                trunk_stability_pushup=effective_scores.get('trunk_stability_pushup', 0),
-                rotary_stability=effective_scores.get('rotary_stability', 0),
-                total_score=analysis.get("total_score", 0),
-                generated_workout=final_plan
-            )
-            db.add(score_entry)
-            await db.commit()
-        except Exception as e:
-            await db.rollback()
-            print(f"❌ DB Save Error (non-blocking): {str(e)}")
+    # ─────────────────────────────────────────────────
+    # 3. Generate workout plan
+    # ─────────────────────────────────────────────────
+    try:
+        with STAGE_SECONDS.time("generate"):
+            final_plan = await agenerate_workout_plan(context.analysis, exercises, fallback=not durable)
+        final_plan["calculated_scores"] = context.effective_scores
+
+        with STAGE_SECONDS.time("persist"):
+            if not durable:
+                await _save_assessment(db, context, final_plan)
+            elif job_id is not None:
+                final_plan = await _save_job_assessment(db, job_id, context, final_plan)
+            elif not await _save_assessments(db, [(context, final_plan)]):
+                raise RuntimeError("Assessment could not be saved.")
 
         return final_plan
 
@@ -351,6 +451,50 @@ async def generate_workout(
     full_data = profile.dict()
     return await _process_workout_generation(full_data, db)
 
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/generate-workout/stream")
+async def generate_workout_stream(profile: FMSProfileRequest):
+    """
+    Server-Sent Events version of /generate-workout.
+    Events: `analysis`, `exercises` (sent immediately), one `card` per ExerciseCard as the LLM
+    finishes it, then `plan` with the full WorkoutSession (or `error`). If the LLM fails after
+    some cards were sent, `plan` carries exactly those cards.
+    """
+    full_data = profile.dict()
+    async with AsyncSessionLocal() as db:
+        await _require_athlete(db, full_data)
+    context = _run_analysis(full_data)
+    exercises = await _run_retrieval(context)
+
+    async def event_stream():
+        yield _sse("analysis", context.analysis)
+        yield _sse("exercises", exercises)
+        try:
+            final_plan = None
+            async for kind, payload in astream_workout_plan(context.analysis, exercises):
+                if kind == "card":
+                    yield _sse("card", payload)
+                else:
+                    final_plan = payload
+            final_plan["calculated_scores"] = context.effective_scores
+            yield _sse("plan", final_plan)
+        except Exception as e:
+            print(f"Generation Error: {str(e)}")
+            yield _sse("error", {"detail": f"Generation Error: {str(e)}"})
+            return
+
+        # The request-scoped session is already closed once streaming starts, so open our own.
+        async with AsyncSessionLocal() as db:
+            await _save_assessment(db, context, final_plan)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/generate-workout-from-scores")
 async def generate_workout_from_scores(
     request: WorkoutFromScoresRequest,
@@ -370,11 +514,418 @@ async def generate_workout_from_scores(
         for name, value in score_dict.items()
     }
     # Force manual calculation mode so the analyzer picks up these scores directly
+    # (validated 0-3 scores resolve to a single traffic-light table lookup)
     dummy_profile['use_manual_scores'] = True
+    dummy_profile['athlete_id'] = request.athlete_id
 
     return await _process_workout_generation(dummy_profile, db)
 
 
+# ────────────────────────────────────────────────
+# BATCH GENERATION (team screenings)
+# ────────────────────────────────────────────────
+BATCH_MAX_PROFILES = int(os.getenv("BATCH_MAX_PROFILES", "500"))
+BATCH_GENERATION_CONCURRENCY = int(os.getenv("BATCH_GENERATION_CONCURRENCY", "4"))
+
+def _ndjson(data: Any) -> str:
+    return json.dumps(data) + "\n"
+
+async def _read_batch_items(request: Request) -> List[Any]:
+    """Raw items of a JSON array body, or of an NDJSON body (one profile per line); unparsable lines are kept as errors."""
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        items, buffer = [], b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            items.extend(line for line in lines if line.strip())
+            if len(items) > BATCH_MAX_PROFILES:
+                break
+        if buffer.strip():
+            items.append(buffer)
+        parsed = []
+        for line in items:
+            try:
+                parsed.append(json.loads(line))
+            except ValueError as e:
+                parsed.append(HTTPException(status_code=400, detail=f"Invalid JSON line: {str(e)}"))
+        items = parsed
+    else:
+        try:
+            items = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array of FMS profiles or NDJSON.")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array of FMS profiles or NDJSON.")
+
+    if len(items) > BATCH_MAX_PROFILES:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_PROFILES} profiles per batch.")
+    return items
+
+async def _prepare_batch(
+    profiles: Dict[int, Dict[str, Any]], errors: Dict[int, str]
+) -> List[Tuple[int, PipelineContext, List[Dict[str, Any]]]]:
+    """
+    (index, context, exercises) per profile, analyzed and retrieved in one vectorized pass.
+    If that pass fails, each profile is analyzed and retrieved on its own and only the
+    profiles that fail there too are recorded in `errors`.
+    """
+    indices = list(profiles)
+    try:
+        contexts = build_pipeline_contexts([profiles[i] for i in indices])
+        retrieval_results = await get_exercises_for_profiles([profiles[i] for i in indices], contexts=contexts)
+        return [
+            (index, context, result.get("data", []))
+            for index, context, result in zip(indices, contexts, retrieval_results)
+        ]
+    except Exception as e:
+        print(f"Batch analysis/retrieval failed, falling back to per-profile: {str(e)}")
+
+    prepared = []
+    for index in indices:
+        try:
+            context = _run_analysis(profiles[index])
+            prepared.append((index, context, await _run_retrieval(context)))
+        except HTTPException as e:
+            errors[index] = e.detail
+    return prepared
+
+@app.post("/generate-workouts/batch")
+async def generate_workouts_batch(request: Request):
+    """
+    Generate plans for many FMS profiles (a JSON array, or NDJSON with Content-Type application/x-ndjson).
+    Analysis and retrieval run once for the whole batch; plans are generated with bounded
+    concurrency and streamed back as NDJSON in completion order:
+        {"index": i, "status": "ok", "plan": {...}} | {"index": i, "status": "error", "detail": "..."}
+    followed by one {"summary": {...}} line once every plan has been saved in a single transaction.
+    """
+    items = await _read_batch_items(request)
+
+    errors: Dict[int, str] = {}
+    profiles: Dict[int, Dict[str, Any]] = {}
+    for index, item in enumerate(items):
+        if isinstance(item, HTTPException):
+            errors[index] = item.detail
+            continue
+        try:
+            profiles[index] = FMSProfileRequest.model_validate(item).dict()
+        except ValidationError as e:
+            errors[index] = f"Validation Error: {str(e)}"
+
+    async with AsyncSessionLocal() as db:
+        unknown = await _unknown_athletes(db, [profile.get("athlete_id") for profile in profiles.values()])
+    for index in [i for i, profile in profiles.items() if profile.get("athlete_id") in unknown]:
+        errors[index] = f"Athlete {profiles.pop(index)['athlete_id']} not found."
+
+    prepared = await _prepare_batch(profiles, errors)
+    semaphore = asyncio.Semaphore(max(1, BATCH_GENERATION_CONCURRENCY))
+
+    async def generate(index: int, context: PipelineContext, exercises: List[Dict[str, Any]]):
+        try:
+            async with semaphore:
+                final_plan = await agenerate_workout_plan(context.analysis, exercises)
+            final_plan["calculated_scores"] = context.effective_scores
+            return index, context, final_plan, None
+        except Exception as e:
+            print(f"Generation Error (batch item {index}): {str(e)}")
+            return index, context, None, f"Generation Error: {str(e)}"
+
+    async def result_stream():
+        for index, detail in errors.items():
+            yield _ndjson({"index": index, "status": "error", "detail": detail})
+
+        tasks = [asyncio.ensure_future(generate(index, context, exercises)) for index, context, exercises in prepared]
+        completed = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, context, final_plan, detail = await next_done
+                if detail is not None:
+                    errors[index] = detail
+                    yield _ndjson({"index": index, "status": "error", "detail": detail})
+                    continue
+                completed.append((context, final_plan))
+                yield _ndjson({"index": index, "status": "ok", "plan": final_plan})
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        # The request-scoped session is already closed once streaming starts, so open our own.
+        async with AsyncSessionLocal() as db:
+            saved = await _save_assessments(db, completed)
+        yield _ndjson({"summary": {
+            "total": len(items),
+            "succeeded": len(completed),
+            "failed": len(errors),
+            "saved": saved,
+        }})
+
+    return StreamingResponse(
+        result_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# ────────────────────────────────────────────────
+# ASYNC JOBS (processed by worker.py)
+# ────────────────────────────────────────────────
+@app.post("/jobs/generate-workout", status_code=202)
+async def submit_generation_job(profile: FMSProfileRequest, db: AsyncSession = Depends(get_db)):
+    """Queue a /generate-workout request; poll GET /jobs/{job_id} for the plan."""
+    await _require_athlete(db, profile.dict())
+    try:
+        job = await enqueue_job(db, profile.dict())
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Job queue unavailable: {str(e)}")
+    return {"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}"}
+
+@app.get("/jobs/{job_id}")
+async def get_generation_job(job_id: str, db: AsyncSession = Depends(get_db)):
+    job = await get_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+    return job_view(job)
+
+
+# ────────────────────────────────────────────────
+# REASSESSMENT (update a stored plan after a re-screen)
+# ────────────────────────────────────────────────
+async def _load_previous_assessment(db: AsyncSession, assessment_id: int):
+    # Primary keys are (id, created_at) on the partitioned tables, so look rows up by id
+    score_entry = (await db.execute(select(AssessmentScore).where(AssessmentScore.id == assessment_id))).scalars().first()
+    if score_entry is None or not score_entry.generated_workout:
+        raise HTTPException(status_code=404, detail=f"Assessment {assessment_id} not found or has no stored plan.")
+    input_entry = None
+    if score_entry.input_id:
+        input_entry = (await db.execute(
+            select(AssessmentInput).where(AssessmentInput.id == score_entry.input_id, AssessmentInput.created_at == score_entry.created_at)
+        )).scalars().first()
+    if input_entry is None or not input_entry.raw_json_data:
+        raise HTTPException(status_code=404, detail=f"Assessment {assessment_id} has no stored FMS inputs.")
+    return score_entry, input_entry
+
+@app.post("/assessments/{assessment_id}/reassess")
+async def reassess_workout(
+    assessment_id: int,
+    profile: FMSProfileRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Re-screen against a stored assessment (assessment_scores.id). Only the ExerciseCards affected
+    by changed faults are rewritten; the result is saved as a new assessment.
+    """
+    score_entry, input_entry = await _load_previous_assessment(db, assessment_id)
+    try:
+        previous_context = build_pipeline_context(input_entry.raw_json_data)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Analyzer Error (stored assessment): {str(e)}")
+
+    full_data = profile.dict()
+    if full_data.get("athlete_id") is None:
+        full_data["athlete_id"] = input_entry.athlete_id   # a re-screen belongs to the same athlete
+    await _require_athlete(db, full_data)
+    context = _run_analysis(full_data)
+    exercises = await _run_retrieval(context)
+
+    try:
+        final_plan = await areassess_workout_plan(score_entry.generated_workout, previous_context, context, exercises)
+        final_plan["calculated_scores"] = context.effective_scores
+        final_plan["reassessment"]["previous_assessment_id"] = assessment_id
+
+        await _save_assessment(db, context, final_plan)
+        return final_plan
+
+    except Exception as e:
+        print(f"Generation Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Generation Error: {str(e)}")
+
+# ────────────────────────────────────────────────
+# LIVE SCREENING SESSIONS (incremental re-analysis)
+# ────────────────────────────────────────────────
+def _session_view(session: ScreeningSession) -> Dict[str, Any]:
+    context = session.context
+    return {
+        "session_id": session.session_id,
+        "revision": session.revision,
+        "analysis": context.analysis,
+        "search_tags": sorted(context.search_tags),
+    }
+
+def _get_session(session_id: str) -> ScreeningSession:
+    session = screening_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Screening session '{session_id}' not found or expired.")
+    return session
+
+@app.post("/screening-sessions")
+async def create_screening_session(profile: FMSProfileRequest):
+    """Start a live screening from the current (possibly partly filled) profile."""
+    session = screening_sessions.create(_run_analysis(profile.dict()))
+    return _session_view(session)
+
+@app.get("/screening-sessions/{session_id}")
+async def get_screening_session(session_id: str):
+    return _session_view(_get_session(session_id))
+
+@app.patch("/screening-sessions/{session_id}/tests/{test_name}")
+async def patch_screening_test(session_id: str, test_name: str, patch: ScreeningTestPatch):
+    """
+    Apply one test's edits and re-score only that test. `regenerate` tells the client whether
+    the target level or the search tags moved, i.e. whether a new plan would differ.
+    """
+    session = _get_session(session_id)
+    schema = FMS_FAULT_SCHEMA.get(test_name)
+    if schema is None:
+        raise HTTPException(status_code=400, detail=f"Unknown FMS test '{test_name}'.")
+
+    test_data = {k: (dict(v) if isinstance(v, dict) else v) for k, v in session.context.full_data.get(test_name, {}).items()}
+    for category, faults in patch.sub_faults.items():
+        unknown = [f for f in faults if f not in schema.get(category, ())]
+        if category not in schema or unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown sub-fault(s) for {test_name}.{category}: {unknown or list(faults)}")
+        test_data.setdefault(category, {}).update(faults)
+    if patch.score is not None:
+        if not (0 <= patch.score <= 3):
+            raise HTTPException(status_code=400, detail="Score must be between 0 and 3 (0=Pain, 1-3=Score).")
+        test_data["score"] = patch.score
+    if patch.clearing_pain is not None:
+        test_data["clearing_pain"] = patch.clearing_pain
+
+    previous = session.context
+    try:
+        context = update_pipeline_context(previous, test_name, test_data)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Analyzer Error: {str(e)}")
+    screening_sessions.update(session, context)
+
+    target_level_changed = context.target_level != previous.target_level
+    search_tags_changed = context.tag_weights != previous.tag_weights
+    return {
+        **_session_view(session),
+        "test": test_name,
+        "effective_score": context.effective_scores.get(test_name),
+        "previous_effective_score": previous.effective_scores.get(test_name),
+        "target_level_changed": target_level_changed,
+        "search_tags_changed": search_tags_changed,
+        "regenerate": target_level_changed or search_tags_changed,
+    }
+
+@app.post("/screening-sessions/{session_id}/generate-workout")
+async def generate_workout_for_session(session_id: str, db: AsyncSession = Depends(get_db)):
+    """Generate (and save) a plan from the session's current state without re-analyzing it."""
+    context = _get_session(session_id).context
+    return await _process_workout_generation(context.full_data, db, context=context)
+
+
+# ────────────────────────────────────────────────
+# ATHLETES (longitudinal history)
+# ────────────────────────────────────────────────
+async def _get_athlete_or_404(db: AsyncSession, athlete_id: int):
+    athlete = await get_athlete(db, athlete_id)
+    if athlete is None:
+        raise HTTPException(status_code=404, detail=f"Athlete {athlete_id} not found.")
+    return athlete
+
+@app.post("/athletes", status_code=201)
+async def create_athlete_endpoint(request: AthleteCreateRequest, db: AsyncSession = Depends(get_db)):
+    """Register an athlete; pass the returned athlete_id with their FMS profiles."""
+    try:
+        athlete = await create_athlete(db, request.external_ref, request.name)
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail=f"An athlete with external_ref '{request.external_ref}' already exists.")
+    return athlete_view(athlete)
+
+@app.get("/athletes/{athlete_id}")
+async def get_athlete_endpoint(athlete_id: int, db: AsyncSession = Depends(get_db)):
+    return athlete_view(await _get_athlete_or_404(db, athlete_id))
+
+@app.get("/athletes/{athlete_id}/history")
+async def get_athlete_history(
+    athlete_id: int,
+    limit: int = Query(20, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Score trajectory, newest first: the athlete's precomputed summary plus one page of
+    assessments. Pass `next_cursor` back as `cursor` for the next (older) page.
+    """
+    athlete = await _get_athlete_or_404(db, athlete_id)
+    try:
+        page = await athlete_history(db, athlete_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {**athlete_view(athlete), **page}
+
+
+# ────────────────────────────────────────────────
+# ANALYTICS (cohort queries over stored assessments)
+# ────────────────────────────────────────────────
+@app.get("/analytics/fault-cohort")
+async def get_fault_cohort(
+    fault: List[str] = Query(..., description='Repeatable: "knee_valgus", "lower_limb.knee_valgus" or "overhead_squat.lower_limb.knee_valgus"'),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Assessments created in [since, until) and how many of them show each requested fault."""
+    try:
+        return await fault_cohort(db, fault, since, until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Analytics query failed: {str(e)}")
+
+
+# ────────────────────────────────────────────────
+# MONITORING
+# ────────────────────────────────────────────────
+@app.get("/readyz")
+async def readyz():
+    """Readiness probe: 200 once warm-up has finished, 503 (with per-step progress) before."""
+    body = {**warmup_state.view(), "import_seconds": round(IMPORT_SECONDS, 4), "import_budget_seconds": IMPORT_BUDGET_SECONDS}
+    if not warmup_state.ready:
+        return JSONResponse(body, status_code=503)
+    return body
+
+@metrics_registry.collector
+def _cache_metrics():
+    retrieval, llm = retrieval_cache.stats(), llm_cache.stats()
+    for prefix, stats in (("fitai_retrieval_cache", retrieval), ("fitai_llm_cache", llm)):
+        yield f"{prefix}_hits_total", "counter", "Cache hits.", [({}, stats["hits"])]
+        yield f"{prefix}_misses_total", "counter", "Cache misses.", [({}, stats["misses"])]
+        yield f"{prefix}_hit_ratio", "gauge", "Hits / lookups since start.", [({}, stats["hit_ratio"])]
+        yield f"{prefix}_entries", "gauge", "Entries currently cached.", [({}, stats.get("entries", stats.get("size", 0)))]
+
+@metrics_registry.collector
+def _kb_metrics():
+    kb = kb_store.get()
+    yield "fitai_kb_exercises", "gauge", "Exercises in the loaded knowledge base.", [({}, len(kb))]
+    yield "fitai_kb_info", "gauge", "Loaded knowledge base version (content hash).", [({"version": kb.version}, 1)]
+
+@metrics_registry.collector
+def _persistence_metrics():
+    stats = assessment_writer.stats()
+    yield "fitai_persist_queue_depth", "gauge", "Assessments waiting in the write-behind queue.", [({}, stats["queue_depth"])]
+    yield "fitai_persist_written_total", "counter", "Assessments written by the background writer.", [({}, stats["written"])]
+    yield "fitai_persist_failed_total", "counter", "Assessments dropped (batch retry and per-record writes failed).", [({}, stats["failed"])]
+    yield "fitai_persist_batch_retries_total", "counter", "Batch writes retried after a failure.", [({}, stats["retried_batches"])]
+    yield "fitai_persist_write_seconds_last", "gauge", "Duration of the last batch write.", [({}, stats["write_seconds_last"])]
+    yield "fitai_persist_write_seconds_max", "gauge", "Slowest batch write since start.", [({}, stats["write_seconds_max"])]
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of the in-process metrics."""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/persistence/stats")
+async def persistence_stats():
+    """Write-behind queue depth, batch write latency and enqueue-to-commit lag."""
+    return assessment_writer.stats()
+
+
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
     uvicorn.run("main:app", host="0.0.0.0", port=port, reload=True)
\ No newline at end of file
@@ -0,0 +1,69 @@
+import asyncio
+
+from src.database import engine
+from src.partitions import (
+    PARTITION_ARCHIVE,
+    PARTITION_ARCHIVE_DIR,
+    PARTITION_DROP_ARCHIVED,
+    PARTITION_MONTHS_AHEAD,
+    PARTITION_RETENTION_MONTHS,
+    PARTITIONED_TABLES,
+    archive_partition,
+    default_row_counts,
+    detach_old_partitions,
+    detached_partitions,
+    ensure_partitions,
+    partition_default_rows,
+)
+
+# Partition maintenance for the assessment tables. Schedule it (e.g. daily cron):  python maintenance.py
+#  1. creates the next PARTITION_MONTHS_AHEAD months of partitions
+#  2. moves rows out of the DEFAULT partition into partitions of their own month (legacy rows,
+#     months that were not created in time, far-future timestamps), so retention reaches them
+#  3. detaches partitions older than PARTITION_RETENTION_MONTHS
+#  4. archives every detached partition to PARTITION_ARCHIVE_DIR as zstd Parquet, then drops it
+# Each step commits on its own, so a failed archive leaves the detached table for the next run.
+
+async def main():
+    async with engine.begin() as conn:
+        created = await ensure_partitions(conn, months_ahead=PARTITION_MONTHS_AHEAD)
+    print(f"🗓️ Partitions created: {created or 'none'}")
+
+    async with engine.begin() as conn:
+        adopted = await partition_default_rows(conn)
+    print(f"🧹 Partitions created for rows in DEFAULT: {adopted or 'none'}")
+
+    async with engine.begin() as conn:
+        detached = await detach_old_partitions(conn, retention_months=PARTITION_RETENTION_MONTHS)
+    print(f"📦 Partitions detached (older than {PARTITION_RETENTION_MONTHS} months): {detached or 'none'}")
+
+    if not PARTITION_ARCHIVE:
+        print("⏭️ Archiving disabled (PARTITION_ARCHIVE=0); detached partitions are kept as tables.")
+    else:
+        await archive_detached()
+
+    async with engine.connect() as conn:
+        counts = await default_row_counts(conn)
+    # Should be 0 right after step 2; rows here are never detached or archived
+    print(f"📥 Rows left in DEFAULT partitions: {', '.join(f'{name}={rows}' for name, rows in counts.items())}")
+
+async def archive_detached():
+    for table in PARTITIONED_TABLES:
+        async with engine.connect() as conn:
+            pending = await detached_partitions(conn, table)
+        for name in pending:
+            try:
+                async with engine.begin() as conn:
+                    archived = await archive_partition(conn, name, PARTITION_ARCHIVE_DIR)
+                # Own transaction: the archive's server-side cursor keeps the table busy until commit.
+                # If the drop fails, the next run archives the table again (same file) and retries.
+                if PARTITION_DROP_ARCHIVED:
+                    async with engine.begin() as conn:
+                        await conn.exec_driver_sql(f"DROP TABLE {name}")
+            except Exception as e:
+                print(f"❌ Archiving {name} failed: {str(e)}")
+                continue
+            print(f"🗄️ Archived {archived['rows']} rows of {name} to {archived['path']} ({archived['bytes']} bytes)")
+
+if __name__ == "__main__":
+    asyncio.run(main())
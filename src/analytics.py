@@ -0,0 +1,62 @@
+# analytics.py: Cohort queries over stored assessments.
+# Fault filters run against assessment_inputs.active_faults (generated set of fms_bitset
+# positions, GIN-indexed) and date ranges against the created_at B-tree, so questions like
+# "how many assessments had knee_valgus this month" are index scans, not JSON parsing.
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from src.database import AssessmentInput
+from src.logic import fms_bitset
+
+
+def fault_positions(spec: str) -> List[int]:
+    """
+    Bit positions named by a fault spec: "fault", "category.fault" or "test.category.fault"
+    (a suffix of the (test, category, fault) key). "knee_valgus" matches it in every test.
+    Raises ValueError for a spec matching no checkbox.
+    """
+    parts = tuple(p for p in spec.strip().split(".") if p)
+    positions = [
+        position
+        for position, key in enumerate(fms_bitset.BIT_KEYS)
+        if parts and key[1:] != fms_bitset.CLEARING_PAIN_SLOT and key[-len(parts):] == parts
+    ]
+    if not positions:
+        raise ValueError(f"Unknown fault '{spec}'.")
+    return positions
+
+
+async def fault_cohort(
+    db,
+    faults: Sequence[str],
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    Assessments in [since, until) showing each fault, in one query. The WHERE clause (any
+    requested fault, &&) is what the GIN index serves; per-fault counts are FILTERed aggregates.
+    """
+    by_fault = {spec: fault_positions(spec) for spec in faults}
+    conditions = []
+    if since is not None:
+        conditions.append(AssessmentInput.created_at >= since)
+    if until is not None:
+        conditions.append(AssessmentInput.created_at < until)
+
+    columns = [func.count().filter(AssessmentInput.active_faults.overlap(positions)) for positions in by_fault.values()]
+    any_positions = sorted({p for positions in by_fault.values() for p in positions})
+    total = (await db.execute(select(func.count()).select_from(AssessmentInput).where(*conditions))).scalar()
+    counts = (await db.execute(
+        select(*columns).where(AssessmentInput.active_faults.overlap(any_positions), *conditions)
+    )).one() if by_fault else ()
+
+    return {
+        "since": since.isoformat() if since else None,
+        "until": until.isoformat() if until else None,
+        "assessments": total,
+        "faults": {spec: count for spec, count in zip(by_fault, counts)},
+    }
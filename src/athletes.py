@@ -0,0 +1,193 @@
+# athletes.py: Athletes and their assessment history.
+# Assessments carry athlete_id; history is read newest-first with keyset pagination over the
+# (athlete_id, created_at) index, and the per-athlete summary (count, first/last/best score) is
+# kept up to date by the assessment writer in the same transaction as the rows it summarizes.
+# Reading one athlete therefore costs one summary row plus one page of that athlete's history.
+
+import base64
+import os
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+from sqlalchemy import and_, text, tuple_
+from sqlalchemy.future import select
+
+from src.database import AssessmentInput, AssessmentScore, Athlete
+from src.logic.fms_schema import FMS_TESTS
+
+ATHLETE_CACHE_SIZE = int(os.environ.get("ATHLETE_CACHE_SIZE", "10000"))
+HISTORY_PAGE_MAX = int(os.environ.get("HISTORY_PAGE_MAX", "200"))
+
+# Athletes are never deleted, so ids once seen need no further lookup (LRU, most recent last)
+_known_ids: "OrderedDict[int, None]" = OrderedDict()
+
+
+def athlete_view(athlete: Athlete) -> Dict[str, Any]:
+    count = athlete.assessment_count or 0
+    first, last = athlete.first_total_score, athlete.last_total_score
+    return {
+        "athlete_id": athlete.id,
+        "external_ref": athlete.external_ref,
+        "name": athlete.name,
+        "created_at": athlete.created_at.isoformat() if athlete.created_at else None,
+        "summary": {
+            "assessments": count,
+            "first_assessed_at": athlete.first_assessed_at.isoformat() if athlete.first_assessed_at else None,
+            "last_assessed_at": athlete.last_assessed_at.isoformat() if athlete.last_assessed_at else None,
+            "last_assessment_id": athlete.last_assessment_id,
+            "first_total_score": first,
+            "last_total_score": last,
+            "best_total_score": athlete.best_total_score,
+            "average_total_score": round(athlete.total_score_sum / count, 2) if count else None,
+            "change_since_first": last - first if first is not None and last is not None else None,
+        },
+    }
+
+
+async def create_athlete(db, external_ref: Optional[str] = None, name: Optional[str] = None) -> Athlete:
+    athlete = Athlete(external_ref=external_ref, name=name)
+    db.add(athlete)
+    await db.commit()
+    await db.refresh(athlete)
+    _remember(athlete.id)
+    return athlete
+
+
+async def get_athlete(db, athlete_id: int) -> Optional[Athlete]:
+    return await db.get(Athlete, athlete_id)
+
+
+def _remember(athlete_id: int):
+    _known_ids[athlete_id] = None
+    _known_ids.move_to_end(athlete_id)
+    while len(_known_ids) > ATHLETE_CACHE_SIZE:
+        _known_ids.popitem(last=False)
+
+
+async def missing_athletes(db, athlete_ids: Iterable[Optional[int]]) -> Set[int]:
+    """Ids among `athlete_ids` with no athletes row (None is ignored). One query for uncached ids."""
+    unknown = set()
+    for athlete_id in athlete_ids:
+        if athlete_id is None:
+            continue
+        if athlete_id in _known_ids:
+            _known_ids.move_to_end(athlete_id)
+        else:
+            unknown.add(athlete_id)
+    if not unknown:
+        return set()
+    found = set((await db.execute(select(Athlete.id).where(Athlete.id.in_(unknown)))).scalars())
+    for athlete_id in found:
+        _remember(athlete_id)
+    return unknown - found
+
+
+# --- SUMMARIES (maintained on write) ---
+_UPDATE_SUMMARY = text("""
+    UPDATE athletes SET
+        assessment_count = assessment_count + :count,
+        total_score_sum = total_score_sum + :score_sum,
+        best_total_score = GREATEST(best_total_score, :best_score),
+        first_assessed_at = COALESCE(first_assessed_at, :first_at),
+        first_total_score = COALESCE(first_total_score, :first_score),
+        last_total_score = CASE WHEN last_assessed_at IS NULL OR last_assessed_at <= :last_at THEN :last_score ELSE last_total_score END,
+        last_assessment_id = CASE WHEN last_assessed_at IS NULL OR last_assessed_at <= :last_at THEN :last_id ELSE last_assessment_id END,
+        last_assessed_at = GREATEST(last_assessed_at, :last_at)
+    WHERE id = :athlete_id
+""")
+
+
+def summary_updates(
+    athlete_ids: Sequence[Optional[int]],
+    total_scores: Sequence[Any],
+    created_ats: Sequence[datetime],
+    assessment_ids: Sequence[int],
+) -> List[Dict[str, Any]]:
+    """One UPDATE parameter set per athlete in a written batch (rows in write order)."""
+    updates: Dict[int, Dict[str, Any]] = {}
+    for athlete_id, score, created_at, assessment_id in zip(athlete_ids, total_scores, created_ats, assessment_ids):
+        if athlete_id is None:
+            continue
+        try:
+            score = int(score)          # analysis totals may be numpy ints
+        except (TypeError, ValueError):
+            score = None
+        entry = updates.get(athlete_id)
+        if entry is None:
+            entry = updates[athlete_id] = {
+                "athlete_id": athlete_id, "count": 0, "score_sum": 0, "best_score": None,
+                "first_at": created_at, "first_score": score,
+            }
+        entry["count"] += 1
+        entry["score_sum"] += score or 0
+        if score is not None and (entry["best_score"] is None or score > entry["best_score"]):
+            entry["best_score"] = score
+        entry.update(last_at=created_at, last_score=score, last_id=assessment_id)
+    return list(updates.values())
+
+
+async def update_athlete_summaries(db, updates: List[Dict[str, Any]]):
+    if updates:
+        await db.execute(_UPDATE_SUMMARY, updates)
+
+
+# --- HISTORY (keyset pagination) ---
+def encode_cursor(created_at: datetime, input_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{input_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    """(created_at, input_id) of the last row of the previous page. Raises ValueError when malformed."""
+    try:
+        created_at, input_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(input_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+async def athlete_history(db, athlete_id: int, limit: int = 20, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    One page of an athlete's assessments, newest first, with per-test scores and the change in
+    total score from the assessment before each one. `next_cursor` is None on the last page.
+    """
+    limit = max(1, min(limit, HISTORY_PAGE_MAX))
+    query = (
+        select(
+            AssessmentInput.id.label("input_id"),
+            AssessmentInput.created_at,
+            AssessmentScore.id.label("assessment_id"),
+            AssessmentScore.total_score,
+            *(getattr(AssessmentScore, test) for test in FMS_TESTS),
+        )
+        .outerjoin(AssessmentScore, and_(
+            AssessmentScore.input_id == AssessmentInput.id,
+            AssessmentScore.created_at == AssessmentInput.created_at,   # prunes to the same month's partition
+        ))
+        .where(AssessmentInput.athlete_id == athlete_id)
+        .order_by(AssessmentInput.created_at.desc(), AssessmentInput.id.desc())
+        .limit(limit + 1)   # one extra row: tells whether there is a next page, and the last row's change
+    )
+    if cursor:
+        created_at, input_id = decode_cursor(cursor)
+        query = query.where(tuple_(AssessmentInput.created_at, AssessmentInput.id) < tuple_(created_at, input_id))
+    rows = (await db.execute(query)).mappings().all()
+
+    items = []
+    for row, older in zip(rows[:limit], [*rows[1:], None]):
+        change = None
+        if older is not None and row["total_score"] is not None and older["total_score"] is not None:
+            change = row["total_score"] - older["total_score"]
+        items.append({
+            "assessment_id": row["assessment_id"],
+            "input_id": row["input_id"],
+            "created_at": row["created_at"].isoformat(),
+            "total_score": row["total_score"],
+            "change": change,
+            "scores": {test: row[test] for test in FMS_TESTS},
+        })
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last["created_at"], last["input_id"])
+    return {"items": items, "next_cursor": next_cursor}
@@ -1,11 +1,27 @@
 import os
 import asyncio
+import time
+import uuid
+from contextlib import AsyncExitStack
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker, declarative_base, relationship
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy.orm import sessionmaker, declarative_base, foreign, relationship
+from sqlalchemy import Column, Computed, Integer, SmallInteger, String, DateTime, Index, LargeBinary, Text, event, exc, text
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.sql import func
+from typing import Any, Dict, Optional
 from dotenv import load_dotenv
 
+from src.logic import fms_bitset
+from src.partitions import PARTITIONED_TABLES, ensure_partitions, insertable_columns, month_start, partition_default_rows
+from src.metrics import (
+    DB_CONNECTIONS_CLOSED,
+    DB_CONNECTIONS_OPENED,
+    DB_POOL_TIMEOUTS,
+    DB_POOL_WAIT_SECONDS,
+    registry as metrics_registry,
+)
+
 load_dotenv()
 
 # --- CONNECTION SETUP ---
@@ -17,23 +33,164 @@ if not DATABASE_URL:
 if DATABASE_URL.startswith("postgresql://"):
     DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
 
-engine = create_async_engine(DATABASE_URL, echo=False)
+# --- POOL SETTINGS ---
+# Neon suspends idle computes and drops their connections, so connections are pinged on checkout
+# and recycled before its idle window. DB_PGBOUNCER=1 is for a transaction-pooling pgbouncer
+# (e.g. Neon's "-pooler" endpoint): asyncpg's prepared statement caches must be off there, since
+# consecutive statements may land on different server connections.
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "240"))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "1") != "0"
+DB_POOL_USE_LIFO = os.environ.get("DB_POOL_USE_LIFO", "1") != "0"   # lets surplus idle connections age out
+DB_PGBOUNCER = os.environ.get("DB_PGBOUNCER", "0") == "1"
+DB_ECHO = os.environ.get("DB_ECHO", "0") == "1"
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Default async pool, timing each checkout for the fitai_db_pool_checkout_seconds metric."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+
+def _connect_args() -> Dict[str, Any]:
+    if not DB_PGBOUNCER:
+        return {}
+    return {
+        "statement_cache_size": 0,                  # asyncpg's own cache
+        "prepared_statement_cache_size": 0,         # SQLAlchemy dialect cache
+        # unnamed-looking unique names so a reused server connection never sees a duplicate
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+    }
+
+
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=DB_ECHO,
+    poolclass=InstrumentedAsyncPool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    pool_use_lifo=DB_POOL_USE_LIFO,
+    connect_args=_connect_args(),
+)
+
+
+# --- POOL METRICS (connection churn + state) ---
+@event.listens_for(engine.sync_engine, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    DB_CONNECTIONS_OPENED.inc()
+
+@event.listens_for(engine.sync_engine, "close")
+def _on_close(dbapi_connection, connection_record):
+    DB_CONNECTIONS_CLOSED.inc(1, "closed")
+
+@event.listens_for(engine.sync_engine, "invalidate")
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    DB_CONNECTIONS_CLOSED.inc(1, "invalidated")
+
+@event.listens_for(engine.sync_engine, "soft_invalidate")
+def _on_soft_invalidate(dbapi_connection, connection_record, exception):
+    DB_CONNECTIONS_CLOSED.inc(1, "recycled")
+
+@metrics_registry.collector
+def _pool_metrics():
+    pool = engine.sync_engine.pool
+    yield "fitai_db_pool_size", "gauge", "Configured pool size (DB_POOL_SIZE).", [({}, pool.size())]
+    yield "fitai_db_pool_max_overflow", "gauge", "Configured overflow limit (DB_MAX_OVERFLOW).", [({}, DB_MAX_OVERFLOW)]
+    yield "fitai_db_pool_checked_out", "gauge", "Connections currently checked out.", [({}, pool.checkedout())]
+    yield "fitai_db_pool_idle", "gauge", "Idle connections held by the pool.", [({}, pool.checkedin())]
+    yield "fitai_db_pool_overflow_in_use", "gauge", "Connections open beyond DB_POOL_SIZE.", [({}, max(0, pool.overflow()))]
+
+
+async def prewarm_pool(connections: int) -> int:
+    """Open `connections` pool connections at once (capped at pool size) so first requests skip the connect."""
+    connections = max(0, min(connections, DB_POOL_SIZE))
+    async with AsyncExitStack() as stack:
+        for _ in range(connections):
+            conn = await stack.enter_async_context(engine.connect())
+            await conn.execute(text("SELECT 1"))
+    return connections
+
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 Base = declarative_base()
 
+
+# --- ACTIVE FAULTS (generated column) ---
+# Postgres derives the set bit positions of fms_bitset.encode(raw_json_data) itself, so every row
+# (including ones saved before fault_bits existed) is searchable through a GIN index:
+#   active_faults @> ARRAY[12]   -> has bit 12        active_faults && ARRAY[12, 40] -> has either
+# Position i is in active_faults exactly when bit i is set in fault_bits (clearing_pain included).
+def _checked_sql(path: str) -> str:
+    # encode(): an int/float > 0 (True counts, being an int)
+    value = f"raw_json_data #> '{{{path}}}'"
+    return f"({value} = 'true'::jsonb OR (jsonb_typeof({value}) = 'number' AND {value} > '0'::jsonb))"
+
+def _truthy_sql(path: str) -> str:
+    # encode(): test_data.get("clearing_pain", False) is truthy
+    value = f"raw_json_data #> '{{{path}}}'"
+    falsy = ", ".join(f"'{v}'::jsonb" for v in ("null", "false", "0", '""', "[]", "{}"))
+    return f"{value} NOT IN ({falsy})"
+
+def active_faults_sql() -> str:
+    cases = []
+    for position, (test, category, fault) in enumerate(fms_bitset.BIT_KEYS):
+        if (category, fault) == fms_bitset.CLEARING_PAIN_SLOT:
+            condition = _truthy_sql(f"{test},{fault}")
+        else:
+            condition = _checked_sql(f"{test},{category},{fault}")
+        cases.append(f"CASE WHEN {condition} THEN {position} END")
+    return f"array_remove(ARRAY[{', '.join(cases)}]::smallint[], NULL)"
+
+
 # TABLE 1: RAW SUB-INPUTS
 # This table strictly stores "What the user entered"
+# Both assessment tables are partitioned by month on created_at (src/partitions.py), so created_at
+# is part of the primary key; ids still come from one sequence and stay unique.
 class AssessmentInput(Base):
     __tablename__ = "assessment_inputs"
 
-    id = Column(Integer, primary_key=True, index=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now(), index=True)
 
     # Stores the full nested dictionary of checkboxes (e.g., {"overhead_squat": {"heels_lift": true...}})
-    raw_json_data = Column(JSON) 
+    raw_json_data = Column(JSONB)
+
+    # Same checkboxes as a fixed-width bitset (src/logic/fms_bitset.py, little-endian bytes), written by the app
+    fault_bits = Column(LargeBinary, nullable=True)
+
+    # Set bit positions of the same bitset, generated from raw_json_data (see active_faults_sql)
+    active_faults = Column(ARRAY(SmallInteger), Computed(active_faults_sql(), persisted=True))
+
+    # Who was screened (athletes.id); NULL for anonymous assessments. Checked by the API rather
+    # than a foreign key, so one bad id can't fail a whole write-behind batch.
+    athlete_id = Column(Integer, nullable=True)
 
     # Relationship to link to the scores
-    scores = relationship("AssessmentScore", back_populates="input_data", uselist=False)
+    scores = relationship(
+        "AssessmentScore", primaryjoin="AssessmentInput.id == foreign(AssessmentScore.input_id)",
+        back_populates="input_data", uselist=False,
+    )
+
+    __table_args__ = (
+        # jsonb_path_ops: smaller index, serves @> containment (e.g. raw_json_data @> '{"use_manual_scores": true}')
+        Index("ix_assessment_inputs_raw_json_data", "raw_json_data", postgresql_using="gin", postgresql_ops={"raw_json_data": "jsonb_path_ops"}),
+        Index("ix_assessment_inputs_active_faults", "active_faults", postgresql_using="gin"),
+        # Per-athlete history, newest first (keyset pagination in src/athletes.py)
+        Index("ix_assessment_inputs_athlete_created", "athlete_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
 
 # TABLE 2: MAIN FMS SCORES
@@ -41,10 +198,13 @@ class AssessmentInput(Base):
 class AssessmentScore(Base):
     __tablename__ = "assessment_scores"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    # Same transaction as its input row, so now() puts both in the same month's partition
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now(), index=True)
     
-    # Foreign Key: This links the score back to the specific raw inputs in Table 1
-    input_id = Column(Integer, ForeignKey("assessment_inputs.id"))
+    # Links the score back to the specific raw inputs in Table 1. Not a declared foreign key:
+    # Postgres can only reference a partitioned table through its full (id, created_at) key.
+    input_id = Column(Integer, index=True)
     
     # The 7 Calculated Scores (0-3)
     overhead_squat = Column(Integer)
@@ -55,9 +215,244 @@ class AssessmentScore(Base):
     trunk_stability_pushup = Column(Integer)
     rotary_stability = Column(Integer)
     
-    total_score = Column(Integer)
-    generated_workout = Column(JSON, nullable=True)
+    total_score = Column(Integer, index=True)
+    generated_workout = Column(JSONB, nullable=True)
 
     # Relationship
-    input_data = relationship("AssessmentInput", back_populates="scores")
+    input_data = relationship(
+        "AssessmentInput", primaryjoin="foreign(AssessmentScore.input_id) == AssessmentInput.id", back_populates="scores"
+    )
+
+    __table_args__ = (
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+
+# TABLE 3: ASYNC GENERATION JOBS
+# Work queue for POST /jobs/generate-workout; claimed by worker.py with FOR UPDATE SKIP LOCKED
+class GenerationJob(Base):
+    __tablename__ = "generation_jobs"
+
+    id = Column(String(32), primary_key=True)                   # uuid4 hex
+    status = Column(String(16), nullable=False, default="queued", server_default="queued")  # queued | running | succeeded | failed
+    payload = Column(JSONB, nullable=False)                     # FMS profile as posted
+    result = Column(JSONB, nullable=True)                       # generated plan once succeeded
+    error = Column(Text, nullable=True)                         # last failure
+    assessment_id = Column(Integer, nullable=True)              # assessment_scores.id saved for this job (at most one)
+
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    max_attempts = Column(Integer, nullable=False, default=3, server_default="3")
+    available_at = Column(DateTime(timezone=True), server_default=func.now())   # not claimable before (retry backoff)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)         # running job is reclaimable after
+    locked_by = Column(String(64), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_generation_jobs_claim", "status", "available_at"),
+    )
+
+
+# TABLE 4: SCHEMA VERSION
+# Lets startup skip create_all/upgrades (a DDL round-trip per table) when the schema is current.
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True)
+    applied_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# TABLE 5: ATHLETES
+# Summary columns are maintained by the assessment writer (src/athletes.py) in the same
+# transaction as the assessments, so profile/trend views never aggregate history.
+class Athlete(Base):
+    __tablename__ = "athletes"
+
+    id = Column(Integer, primary_key=True)
+    external_ref = Column(String(64), unique=True, nullable=True)   # the client's own id for the athlete
+    name = Column(String(128), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    assessment_count = Column(Integer, nullable=False, default=0, server_default="0")
+    total_score_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    best_total_score = Column(Integer, nullable=True)
+    first_total_score = Column(Integer, nullable=True)
+    last_total_score = Column(Integer, nullable=True)
+    last_assessment_id = Column(Integer, nullable=True)            # assessment_scores.id
+    first_assessed_at = Column(DateTime(timezone=True), nullable=True)
+    last_assessed_at = Column(DateTime(timezone=True), nullable=True)
+
+
+# --- IN-PLACE UPGRADES ---
+# create_all only creates missing tables; columns added to existing tables are applied here.
+def _json_to_jsonb(table: str, column: str) -> str:
+    return f"""
+        DO $$ BEGIN
+            IF EXISTS (SELECT 1 FROM information_schema.columns
+                       WHERE table_name = '{table}' AND column_name = '{column}' AND data_type = 'json') THEN
+                ALTER TABLE {table} ALTER COLUMN {column} TYPE JSONB USING {column}::jsonb;
+            END IF;
+        END $$"""
+
+SCHEMA_UPGRADES = [
+    "ALTER TABLE assessment_inputs ADD COLUMN IF NOT EXISTS fault_bits BYTEA",
+    # v2: JSONB + analytics indexes (the type change must precede the generated column that reads it)
+    _json_to_jsonb("assessment_inputs", "raw_json_data"),
+    _json_to_jsonb("assessment_scores", "generated_workout"),
+    f"ALTER TABLE assessment_inputs ADD COLUMN IF NOT EXISTS active_faults SMALLINT[] GENERATED ALWAYS AS ({active_faults_sql()}) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_assessment_inputs_raw_json_data ON assessment_inputs USING gin (raw_json_data jsonb_path_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_assessment_inputs_active_faults ON assessment_inputs USING gin (active_faults)",
+    "CREATE INDEX IF NOT EXISTS ix_assessment_inputs_created_at ON assessment_inputs (created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_assessment_scores_input_id ON assessment_scores (input_id)",
+    "CREATE INDEX IF NOT EXISTS ix_assessment_scores_total_score ON assessment_scores (total_score)",
+    # v4: athletes (the table itself comes from create_all)
+    "ALTER TABLE assessment_inputs ADD COLUMN IF NOT EXISTS athlete_id INTEGER",
+    "CREATE INDEX IF NOT EXISTS ix_assessment_inputs_athlete_created ON assessment_inputs (athlete_id, created_at)",
+    # v7: job payloads/results as JSONB, like the assessment tables
+    _json_to_jsonb("generation_jobs", "payload"),
+    _json_to_jsonb("generation_jobs", "result"),
+    # v8: the assessment a job saved, so a retried or reclaimed job never saves a second one
+    "ALTER TABLE generation_jobs ADD COLUMN IF NOT EXISTS assessment_id INTEGER",
+]
+
+# Data rewrites; they run after partition_legacy_tables, since they read the partitioned layout
+# (e.g. assessment_scores.created_at, which the original tables don't have).
+SCHEMA_BACKFILLS = [
+    # v6: composite scores for rows stored while total_score was always written as 0, so the
+    # total_score index can narrow scans (before the summary rebuild that reads them)
+    """
+    UPDATE assessment_scores SET total_score =
+        COALESCE(overhead_squat, 0) + COALESCE(hurdle_step, 0) + COALESCE(inline_lunge, 0)
+        + COALESCE(shoulder_mobility, 0) + COALESCE(active_straight_leg_raise, 0)
+        + COALESCE(trunk_stability_pushup, 0) + COALESCE(rotary_stability, 0)
+    WHERE total_score IS NULL OR total_score = 0
+    """,
+    # v5: athlete summaries rebuilt from history (they were written with total_score always 0)
+    """
+    UPDATE athletes a SET
+        assessment_count = h.n, total_score_sum = h.score_sum, best_total_score = h.best,
+        first_total_score = h.scores[1], last_total_score = h.scores[h.n], last_assessment_id = h.ids[h.n],
+        first_assessed_at = h.first_at, last_assessed_at = h.last_at
+    FROM (
+        SELECT i.athlete_id, count(*) AS n, COALESCE(sum(s.total_score), 0) AS score_sum, max(s.total_score) AS best,
+               min(i.created_at) AS first_at, max(i.created_at) AS last_at,
+               array_agg(s.total_score ORDER BY i.created_at, i.id) AS scores,
+               array_agg(s.id ORDER BY i.created_at, i.id) AS ids
+        FROM assessment_inputs i
+        JOIN assessment_scores s ON s.input_id = i.id AND s.created_at = i.created_at
+        WHERE i.athlete_id IS NOT NULL
+        GROUP BY i.athlete_id
+    ) h
+    WHERE a.id = h.athlete_id
+    """,
+]
+
+# Bump whenever a model above, SCHEMA_UPGRADES or SCHEMA_BACKFILLS changes, so the next boot applies it.
+SCHEMA_VERSION = 8
+# pg_advisory_xact_lock key serializing ensure_schema across processes (any constant unique to this app)
+SCHEMA_LOCK_KEY = 7_146_201
+
+async def upgrade_schema(conn):
+    for statement in SCHEMA_UPGRADES:
+        await conn.execute(text(statement))
+
+async def partition_legacy_tables(conn) -> bool:
+    """
+    v3: rebuild plain (pre-partitioning) assessment tables as partitioned ones. Postgres can't
+    partition a table in place: the old table is renamed, a partitioned one is created with
+    partitions covering its rows, the rows are copied (scores take their input's created_at)
+    and the old table is dropped, all inside the caller's transaction.
+    """
+    legacy = []
+    for table in PARTITIONED_TABLES:
+        # compared in SQL: asyncpg returns the "char" relkind as bytes
+        plain = (await conn.execute(text("SELECT relkind = 'r' FROM pg_class WHERE oid = to_regclass(:table)"), {"table": table})).scalar()
+        if plain:
+            legacy.append(table)
+    if not legacy:
+        return False
+
+    for table in legacy:
+        old = f"{table}_legacy"
+        sequence = (await conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table})).scalar()
+        await conn.execute(text(f"ALTER TABLE {table} RENAME TO {old}"))
+        if sequence:
+            await conn.execute(text(f"ALTER SEQUENCE {sequence} RENAME TO {old}_id_seq"))
+        await conn.execute(text(f"ALTER TABLE {old} RENAME CONSTRAINT {table}_pkey TO {old}_pkey"))
+        # Free the index names for the new table (the legacy table is dropped below)
+        indexes = (await conn.execute(
+            text("SELECT indexname FROM pg_indexes WHERE tablename = :old AND indexname <> :pkey"),
+            {"old": old, "pkey": f"{old}_pkey"},
+        )).scalars().all()
+        for index in indexes:
+            await conn.execute(text(f"DROP INDEX {index}"))
+
+    await conn.run_sync(Base.metadata.create_all, tables=[Base.metadata.tables[t] for t in legacy])
+    first = None
+    if "assessment_inputs" in legacy:
+        first = (await conn.execute(text("SELECT min(created_at) FROM assessment_inputs_legacy"))).scalar()
+    await ensure_partitions(conn, first_month=month_start(first.date()) if first else None)
+
+    if "assessment_inputs" in legacy:
+        columns = await insertable_columns(conn, "assessment_inputs")
+        select_list = columns.replace("created_at", "COALESCE(created_at, now())")
+        await conn.execute(text(f"INSERT INTO assessment_inputs ({columns}) SELECT {select_list} FROM assessment_inputs_legacy"))
+    if "assessment_scores" in legacy:
+        columns = [c.strip() for c in (await insertable_columns(conn, "assessment_scores")).split(",")]
+        select_list = ", ".join("COALESCE(i.created_at, now())" if c == "created_at" else f"s.{c}" for c in columns)
+        source = "assessment_inputs_legacy" if "assessment_inputs" in legacy else "assessment_inputs"
+        await conn.execute(text(
+            f"INSERT INTO assessment_scores ({', '.join(columns)}) SELECT {select_list} "
+            f"FROM assessment_scores_legacy s LEFT JOIN {source} i ON i.id = s.input_id"
+        ))
+    # Rows outside the months created above (scores whose input is older, future timestamps)
+    # landed in DEFAULT; give them partitions of their own so retention can detach them
+    await partition_default_rows(conn)
+    for table in legacy:
+        await conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT max(id) FROM {table}), 0) + 1, false)"
+        ))
+    for table in reversed(PARTITIONED_TABLES):   # scores first: the legacy FK points at the legacy inputs
+        if table in legacy:
+            await conn.execute(text(f"DROP TABLE {table}_legacy"))
+    return True
+
+async def current_schema_version(conn) -> Optional[int]:
+    # A catalog query rather than to_regclass(): after waiting on the schema lock, to_regclass can
+    # still answer from this backend's stale catalog cache and miss a table another process just created
+    exists = (await conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_tables WHERE schemaname = current_schema() AND tablename = 'schema_version')"
+    ))).scalar()
+    if not exists:
+        return None
+    return (await conn.execute(text("SELECT max(version) FROM schema_version"))).scalar()
+
+async def _schema_is_current(conn) -> bool:
+    version = await current_schema_version(conn)
+    return version is not None and version >= SCHEMA_VERSION
 
+async def ensure_schema(conn, force: bool = False) -> bool:
+    """
+    Create/upgrade tables only when the stored schema version is older than SCHEMA_VERSION
+    (or `force`). Returns True when DDL was applied. A newer stored version is left alone.
+    Must run inside a transaction: processes booting together (API workers, worker.py) take a
+    transaction-scoped advisory lock, so one upgrades and the others find the version current.
+    """
+    if not force and await _schema_is_current(conn):
+        return False
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+    if not force and await _schema_is_current(conn):
+        return False
+    await conn.run_sync(Base.metadata.create_all)
+    await upgrade_schema(conn)
+    await partition_legacy_tables(conn)
+    await ensure_partitions(conn)
+    for statement in SCHEMA_BACKFILLS:
+        await conn.execute(text(statement))
+    await conn.execute(
+        text("INSERT INTO schema_version (version) VALUES (:version) ON CONFLICT (version) DO NOTHING"),
+        {"version": SCHEMA_VERSION},
+    )
+    return True
@@ -0,0 +1,212 @@
+# jobs.py: Postgres-backed queue for async workout generation.
+# The API inserts a generation_jobs row and returns its id; worker.py processes claimed jobs.
+# A job is claimed with SELECT ... FOR UPDATE SKIP LOCKED, so any number of worker processes
+# can poll the same table without handing one job to two workers. A claim is a lease: the worker
+# extends it while the job runs, and a job whose lease expires (worker crashed) is claimable again.
+
+import asyncio
+import os
+import socket
+import uuid
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import and_, or_, update
+from sqlalchemy.future import select
+from sqlalchemy.sql import func
+
+from src.database import AsyncSessionLocal, GenerationJob
+
+# --- CONFIGURATION ---
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "120"))
+JOB_RETRY_BACKOFF_SECONDS = float(os.environ.get("JOB_RETRY_BACKOFF_SECONDS", "5"))
+JOB_POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", "1.0"))
+WORKER_CONCURRENCY = int(os.environ.get("WORKER_CONCURRENCY", "4"))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+# handler(payload, db, job_id) -> result; runs again on retry, so side effects must be keyed on job_id
+JobHandler = Callable[[Dict[str, Any], Any, str], Awaitable[Dict[str, Any]]]
+
+
+def job_view(job: GenerationJob) -> Dict[str, Any]:
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+async def enqueue_job(db, payload: Dict[str, Any], max_attempts: int = JOB_MAX_ATTEMPTS) -> GenerationJob:
+    job = GenerationJob(id=uuid.uuid4().hex, status=QUEUED, payload=payload, attempts=0, max_attempts=max_attempts)
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+
+async def get_job(db, job_id: str) -> Optional[GenerationJob]:
+    return await db.get(GenerationJob, job_id)
+
+
+def retry_delay(attempts: int, base_seconds: float = JOB_RETRY_BACKOFF_SECONDS) -> float:
+    """Exponential backoff before attempt `attempts + 1` (base, 2×base, 4×base, ...)."""
+    return base_seconds * (2 ** max(0, attempts - 1))
+
+
+async def claim_job(db, worker_id: str, lease_seconds: float = JOB_LEASE_SECONDS) -> Optional[GenerationJob]:
+    """
+    Lease the oldest claimable job: queued and past its backoff, or running with an expired lease.
+    Returns None when there is nothing to do. A job whose lease expired on its last attempt is
+    marked failed instead of being handed out again (and the next job is tried).
+    """
+    now = func.now()
+    claimable = or_(
+        and_(GenerationJob.status == QUEUED, GenerationJob.available_at <= now),
+        and_(GenerationJob.status == RUNNING, GenerationJob.lease_expires_at < now),
+    )
+    while True:
+        async with db.begin():
+            job = (await db.execute(
+                select(GenerationJob)
+                .where(claimable)
+                .order_by(GenerationJob.available_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )).scalars().first()
+            if job is None:
+                return None
+            if job.status == RUNNING and job.attempts >= job.max_attempts:
+                job.status = FAILED
+                job.error = f"Lease expired on attempt {job.attempts} (worker {job.locked_by} stopped responding)."
+                job.lease_expires_at = None
+                job.finished_at = now
+                continue
+            job.status = RUNNING
+            job.attempts += 1
+            job.locked_by = worker_id
+            job.lease_expires_at = now + timedelta(seconds=lease_seconds)
+        await db.refresh(job)
+        return job
+
+
+def _owned(job_id: str, worker_id: str):
+    # Writes are fenced on the lease holder: a worker that lost its lease cannot overwrite the new owner
+    return and_(GenerationJob.id == job_id, GenerationJob.locked_by == worker_id, GenerationJob.status == RUNNING)
+
+
+async def extend_lease(db, job_id: str, worker_id: str, lease_seconds: float = JOB_LEASE_SECONDS) -> bool:
+    result = await db.execute(
+        update(GenerationJob)
+        .where(_owned(job_id, worker_id))
+        .values(lease_expires_at=func.now() + timedelta(seconds=lease_seconds))
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+async def complete_job(db, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+    outcome = await db.execute(
+        update(GenerationJob)
+        .where(_owned(job_id, worker_id))
+        .values(status=SUCCEEDED, result=result, error=None, lease_expires_at=None, finished_at=func.now())
+    )
+    await db.commit()
+    return outcome.rowcount == 1
+
+
+async def fail_job(db, job: GenerationJob, worker_id: str, error: str, retry: bool = True) -> bool:
+    """Requeue with backoff while attempts remain (and `retry` is set), otherwise mark the job failed."""
+    if retry and job.attempts < job.max_attempts:
+        values = dict(
+            status=QUEUED,
+            lease_expires_at=None,
+            available_at=func.now() + timedelta(seconds=retry_delay(job.attempts)),
+        )
+    else:
+        values = dict(status=FAILED, lease_expires_at=None, finished_at=func.now())
+    outcome = await db.execute(update(GenerationJob).where(_owned(job.id, worker_id)).values(error=error, **values))
+    await db.commit()
+    return outcome.rowcount == 1
+
+
+def is_permanent_error(error: Exception) -> bool:
+    """
+    Errors a retry cannot fix: an invalid payload, or a client error such as HTTPException(404)
+    for an unknown athlete (any exception carrying a status_code below 500).
+    """
+    if isinstance(error, ValidationError):
+        return True
+    status_code = getattr(error, "status_code", None)
+    return isinstance(status_code, int) and status_code < 500
+
+
+# --- WORKER ---
+async def _keep_lease(job_id: str, worker_id: str, lease_seconds: float):
+    while True:
+        await asyncio.sleep(lease_seconds / 3)
+        async with AsyncSessionLocal() as db:
+            if not await extend_lease(db, job_id, worker_id, lease_seconds):
+                print(f"⚠️ [{worker_id}] lost the lease on job {job_id}")
+                return
+
+
+async def process_one(handler: JobHandler, worker_id: str, lease_seconds: float = JOB_LEASE_SECONDS) -> bool:
+    """Claim and run one job. Returns False when the queue had nothing claimable."""
+    async with AsyncSessionLocal() as db:
+        job = await claim_job(db, worker_id, lease_seconds)
+    if job is None:
+        return False
+
+    print(f"🛠️ [{worker_id}] job {job.id} attempt {job.attempts}/{job.max_attempts}")
+    heartbeat = asyncio.create_task(_keep_lease(job.id, worker_id, lease_seconds))
+    try:
+        async with AsyncSessionLocal() as db:
+            result = await handler(job.payload, db, job.id)
+    except Exception as e:
+        error = str(getattr(e, "detail", None) or e)
+        permanent = is_permanent_error(e)
+        print(f"❌ [{worker_id}] job {job.id} failed{' permanently' if permanent else ''}: {error}")
+        async with AsyncSessionLocal() as db:
+            await fail_job(db, job, worker_id, error, retry=not permanent)
+    else:
+        async with AsyncSessionLocal() as db:
+            if not await complete_job(db, job.id, worker_id, result):
+                print(f"⚠️ [{worker_id}] job {job.id} finished after its lease moved on; result discarded")
+    finally:
+        heartbeat.cancel()
+    return True
+
+
+async def run_worker(
+    handler: JobHandler,
+    concurrency: int = WORKER_CONCURRENCY,
+    stop: Optional[asyncio.Event] = None,
+    poll_seconds: float = JOB_POLL_SECONDS,
+):
+    """`concurrency` claim loops in this process; each exits after its current job once `stop` is set."""
+    stop = stop or asyncio.Event()
+    base_id = f"{socket.gethostname()}:{os.getpid()}"
+
+    async def loop(worker_id: str):
+        while not stop.is_set():
+            try:
+                busy = await process_one(handler, worker_id)
+            except Exception as e:
+                print(f"❌ [{worker_id}] queue error: {str(e)}")
+                busy = False
+            if not busy:
+                try:
+                    await asyncio.wait_for(stop.wait(), poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+    await asyncio.gather(*(loop(f"{base_id}/{i}") for i in range(max(1, concurrency))))
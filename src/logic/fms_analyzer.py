@@ -1,4 +1,130 @@
 # fms_analyzer.py: Adjusted for binary inputs (0/1 present/absent). Added STOP for pain/score=0.
+# Per-test scoring criteria live in fms_rules.py as declarative tables compiled at import.
+
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd  # imported inside the batch helpers: the API never needs it at startup
+
+from src.logic.fms_bitset import TEST_OFFSETS, TEST_WIDTHS, bits_for_test, unpack
+from src.logic.fms_rules import COMPILED_TESTS, CLEARING_PAIN_LITERAL, encode_test, layout_for, score_bits
+from src.logic.fms_schema import FMS_FAULT_SCHEMA, FMS_TESTS
+
+# status -> (target_level, reason_code, reason). Order is the precedence of the traffic light.
+TRAFFIC_LIGHTS = {
+    "STOP": (0, "pain_detected", "Pain detected (Score 0 in one or more tests). Refer to medical professional."),
+    "MOBILITY": (1, "mobility_restriction", "Mobility Restriction (Score 1 in ASLR or SM)"),
+    "STABILITY": (3, "motor_control_failure", "Motor Control Failure (Score 1 in TS or RS)"),
+    "PATTERN": (5, "pattern_dysfunction", "Pattern Dysfunction (Score 1 in Squat/Hurdle/Lunge)"),
+    "STRENGTH": (7, "acceptable_patterning", "Acceptable Patterning (Score 2). Cleared for Strength."),
+    "POWER": (9, "perfect_patterning", "Perfect Patterning (Score 3). Cleared for Power."),
+}
+STATUSES = tuple(TRAFFIC_LIGHTS)
+
+
+def _traffic_light_result(status, effective_scores):
+    target_level, _, reason = TRAFFIC_LIGHTS[status]
+    return {"status": status, "target_level": target_level, "reason": reason, "effective_scores": effective_scores}
+
+
+def _traffic_light_codes(scores: Dict[str, np.ndarray], n_rows: int) -> np.ndarray:
+    """
+    Vectorized traffic light: index into STATUSES per row. `scores` maps test → effective scores;
+    tests that are not given count as 3.
+    """
+    def score_of(test_name):
+        return scores[test_name] if test_name in scores else np.full(n_rows, 3)
+
+    stop = np.zeros(n_rows, dtype=bool)
+    for values in scores.values():
+        stop |= values == 0
+    min_pattern = np.minimum.reduce([score_of(t) for t in ('hurdle_step', 'inline_lunge', 'overhead_squat')])
+    return np.select(
+        [
+            stop,
+            (score_of('active_straight_leg_raise') <= 1) | (score_of('shoulder_mobility') <= 1),
+            (score_of('rotary_stability') <= 1) | (score_of('trunk_stability_pushup') <= 1),
+            min_pattern <= 1,
+            min_pattern == 2,
+        ],
+        [0, 1, 2, 3, 4],
+        default=5,
+    )
+
+
+# --- TRAFFIC LIGHT LOOKUP TABLE ---
+# Every combination of the seven scores (0-3) is only 4^7 = 16,384 cases, so the decision is
+# precomputed once. Index = base-4 number of the scores in FMS_TESTS order (first test most significant).
+SCORE_PLACE_VALUES = 4 ** np.arange(len(FMS_TESTS) - 1, -1, -1)
+_PLACE_VALUES = tuple(int(v) for v in SCORE_PLACE_VALUES)
+
+
+def _build_traffic_light_lut() -> np.ndarray:
+    index = np.arange(4 ** len(FMS_TESTS))
+    scores = {test: (index // place) % 4 for test, place in zip(FMS_TESTS, _PLACE_VALUES)}
+    return _traffic_light_codes(scores, len(index)).astype(np.uint8)
+
+
+TRAFFIC_LIGHT_LUT = _build_traffic_light_lut()
+TRAFFIC_LIGHT_LUT.flags.writeable = False
+
+
+def score_index(scores) -> Union[int, np.ndarray]:
+    """
+    LUT index for scores in FMS_TESTS order: one sequence of 7 scores, or an (n, 7) array.
+    Scores must already be in 0-3.
+    """
+    return np.asarray(scores, dtype=np.int64) @ SCORE_PLACE_VALUES
+
+
+def encode_scores(effective_scores: Dict[str, Any]) -> Optional[int]:
+    """LUT index for an effective_scores dict (missing tests count as 3), or None when it falls outside the table."""
+    if len(effective_scores) > len(FMS_TESTS):
+        return None
+    index = 0
+    matched = 0
+    for test_name, place in zip(FMS_TESTS, _PLACE_VALUES):
+        score = effective_scores.get(test_name, 3)
+        if test_name in effective_scores:
+            matched += 1
+        if type(score) is not int or not 0 <= score <= 3:
+            return None
+        index += score * place
+    if matched != len(effective_scores):
+        return None  # tests outside the FMS seven still take part in the STOP check
+    return index
+
+
+def _traffic_light_status_branching(effective_scores):
+    # Fallback for inputs outside the lookup table (out-of-range manual scores, extra tests)
+    if any(score == 0 for score in effective_scores.values()):
+        return "STOP"
+    if effective_scores.get('active_straight_leg_raise', 3) <= 1 or \
+       effective_scores.get('shoulder_mobility', 3) <= 1:
+        return "MOBILITY"
+    if effective_scores.get('rotary_stability', 3) <= 1 or \
+       effective_scores.get('trunk_stability_pushup', 3) <= 1:
+        return "STABILITY"
+    min_pattern = min(
+        effective_scores.get('hurdle_step', 3),
+        effective_scores.get('inline_lunge', 3),
+        effective_scores.get('overhead_squat', 3)
+    )
+    if min_pattern <= 1:
+        return "PATTERN"
+    elif min_pattern == 2:
+        return "STRENGTH"
+    return "POWER"
+
+
+def traffic_light_status(effective_scores: Dict[str, Any]) -> str:
+    index = encode_scores(effective_scores)
+    if index is None:
+        return _traffic_light_status_branching(effective_scores)
+    return STATUSES[TRAFFIC_LIGHT_LUT[index]]
+
 
 def analyze_fms_profile(profile, use_manual_scores=False):
     """
@@ -6,212 +132,241 @@ def analyze_fms_profile(profile, use_manual_scores=False):
     Output: Automatic scoring based on sub-inputs (faults) and Traffic Light logic.
     """
 
-    # --- 1. HELPER: AUTOMATIC CALCULATOR ---
-    def calculate_score_from_faults(test_name, test_data):
-        """
-        Returns the strictly calculated score (0-3) based on FMS decision trees from the book.
-        Adjusted for binary (0=absent, 1=present for faults; reverse for positives).
-        """
-        # 1. Extract sub-dictionaries (ignore the manual 'score' field)
-        sub_data = {k: v for k, v in test_data.items() if k != 'score'}
-
-        # 2. Check for PAIN first (Global Override for this test)
-        pain_data = sub_data.get('pain', {})
-        # If pain reported > 0, score is immediately 0
-        if pain_data.get('pain_reported', 0) > 0:
-            return 0
-        # Also check clearing_pain for relevant tests
-        if test_data.get('clearing_pain', False):
-            return 0
-
-        # 3. Test-specific logic from PDF (binary-adjusted)
-        if test_name == 'overhead_squat':
-            feet = sub_data.get('feet', {})
-            trunk = sub_data.get('trunk_torso', {})
-            lower = sub_data.get('lower_limb', {})
-            upper = sub_data.get('upper_body_bar_position', {})
-            
-            # Score 1: Major faults present (bad >0 or good ==0)
-            major_faults = (
-                trunk.get('excessive_forward_lean', 0) > 0 or 
-                trunk.get('lumbar_flexion', 0) > 0 or
-                lower.get('knee_valgus', 0) > 0 or
-                feet.get('heels_lift', 0) > 0 or
-                upper.get('bar_drifts_forward', 0) > 0 or
-                trunk.get('upright_torso', 0) == 0  # Good thing absent
-            )
-            if major_faults:
-                return 1
-            
-            # Score 2: Heels lift but others ok
-            if feet.get('heels_lift', 0) > 0:
-                return 2
-            
-            # All good → 3
-            return 3
-
-        elif test_name == 'hurdle_step':
-            pelvis = sub_data.get('pelvis_core_control', {})
-            stepping = sub_data.get('stepping_leg', {})
-            stance = sub_data.get('stance_leg', {})
-            
-            # Score 1: Contact or loss of balance
-            if stepping.get('toe_drag', 0) > 0 or pelvis.get('loss_of_balance', 0) > 0:
-                return 1
-            
-            # Score 2: Alignment lost, movement in lumbar, etc.
-            if (pelvis.get('excessive_rotation', 0) > 0 or 
-                stance.get('knee_valgus', 0) > 0 or
-                stance.get('knee_varus', 0) > 0 or
-                stance.get('knee_stable', 0) == 0):
-                return 2
-            
-            # All aligned → 3
-            return 3
-
-        elif test_name == 'inline_lunge':
-            alignment = sub_data.get('alignment', {})
-            lower = sub_data.get('lower_body_control', {})
-            balance = sub_data.get('balance_stability', {})
-            
-            # Score 1: Loss of balance
-            if balance.get('loss_of_balance', 0) > 0:
-                return 1
-            
-            # Score 2: Forward lean, valgus, etc.
-            if (alignment.get('excessive_forward_lean', 0) > 0 or 
-                alignment.get('lateral_shift', 0) > 0 or 
-                lower.get('knee_valgus', 0) > 0 or
-                lower.get('heel_lift', 0) > 0 or
-                lower.get('knee_tracks_over_foot', 0) == 0):
-                return 2
-            
-            # All good → 3
-            return 3
-
-        elif test_name == 'shoulder_mobility':
-            reach = sub_data.get('reach_quality', {})
-            compensation = sub_data.get('compensation', {})
-            
-            # Score 0 already handled by pain
-            # Score 1: Excessive gap or asymmetry
-            if reach.get('excessive_gap', 0) > 0 or reach.get('asymmetry_present', 0) > 0:
-                return 1
-            
-            # Score 2: Within hand length but compensation
-            if compensation.get('rib_flare', 0) > 0 or compensation.get('scapular_winging', 0) > 0:
-                return 2
-            
-            # Score 3: Within fist, no comp
-            if reach.get('hands_within_fist_distance', 0) > 0:
-                return 3
-            return 2  # Default if partial
-
-        elif test_name == 'active_straight_leg_raise':
-            non_moving = sub_data.get('non_moving_leg', {})
-            moving = sub_data.get('moving_leg', {})
-            pelvic = sub_data.get('pelvic_control', {})
-            
-            # Score 1: <60 flexion or major faults
-            if moving.get('lt_60_hip_flexion', 0) > 0 or non_moving.get('foot_lifts_off_floor', 0) > 0:
-                return 1
-            
-            # Score 2: 60-80 with some tilt
-            if pelvic.get('anterior_tilt', 0) > 0 or moving.get('hamstring_restriction', 0) > 0:
-                return 2
-            
-            # Score 3: >80, stable
-            if moving.get('gt_80_hip_flexion', 0) > 0 and pelvic.get('pelvis_stable', 0) > 0:
-                return 3
-            return 2
-
-        elif test_name == 'trunk_stability_pushup':
-            core = sub_data.get('core_control', {})
-            body = sub_data.get('body_alignment', {})
-            upper = sub_data.get('upper_body', {})
-            
-            # Score 1: Unable (lag or sagging)
-            if core.get('hips_lag', 0) > 0 or body.get('sagging_hips', 0) > 0:
-                return 1
-            
-            # Score 2: Minor issues
-            if upper.get('uneven_arm_push', 0) > 0 or upper.get('shoulder_instability', 0) > 0:
-                return 2
-            
-            return 3
-
-        elif test_name == 'rotary_stability':
-            diagonal = sub_data.get('diagonal_pattern', {})
-            spinal = sub_data.get('spinal_control', {})
-            
-            # Score 1: Unable
-            if diagonal.get('unable_to_complete', 0) > 0:
-                return 1
-            
-            # Score 2: Can do with loss
-            if diagonal.get('loss_of_balance', 0) > 0 or spinal.get('excessive_rotation', 0) > 0:
-                return 2
-            
-            # Score 3: Smooth
-            if diagonal.get('smooth_controlled', 0) > 0:
-                return 3
-            return 1
-        
-        # Default for any missed test
-        return 3
-
-    # --- 2. EXECUTE SCORING ---
+    # --- 1. EXECUTE SCORING ---
     effective_scores = {}
     
-    for test_name in profile:
-        if test_name in ['use_manual_scores']: continue # Skip flag
-        
-        test_data = profile[test_name]
-        
-        # Check if sub-data exists (did the user expand and check boxes?)
-        # We check this by seeing if any value in the nested dicts is > 0
-        has_sub_inputs = False
-        for k, v in test_data.items():
-            if isinstance(v, dict):
-                if sum(v.values()) > 0:
-                    has_sub_inputs = True
-                    break
-        
+    for test_name, test_data in profile.items():
+        if not isinstance(test_data, dict): continue # Skip flags and ids (use_manual_scores, athlete_id)
+
         if use_manual_scores:
             # Coach override: Always use manual score
             effective_scores[test_name] = test_data.get('score', 2)
-        elif has_sub_inputs:
+            continue
+
+        # Pack the checkboxes into the test's bit layout. has_sub_inputs tells us whether
+        # the user expanded the test and checked boxes (any nested dict sums above 0).
+        bits, has_sub_inputs = encode_test(test_name, test_data)
+        
+        if has_sub_inputs:
             # AUTOMATIC MODE: Calculate based on checkboxes
-            effective_scores[test_name] = calculate_score_from_faults(test_name, test_data)
+            effective_scores[test_name] = score_bits(test_name, bits)
         else:
             # No override, no sub-inputs: Use manual score
             effective_scores[test_name] = test_data.get('score', 2)
 
-    # --- 3. TRAFFIC LIGHT LOGIC (With STOP for pain/0 scores) ---
-    # Now we use 'effective_scores' which contains the computed values
-   
-    # STOP: If any score ==0 (pain)
-    if any(score == 0 for score in effective_scores.values()):
-        return {"status": "STOP", "target_level": 0, "reason": "Pain detected (Score 0 in one or more tests). Refer to medical professional.", "effective_scores": effective_scores}
+    # --- 2. TRAFFIC LIGHT LOGIC (With STOP for pain/0 scores) ---
+    # Precomputed over the whole 0-3 score space: one table lookup on the base-4 encoded scores
+    return _traffic_light_result(traffic_light_status(effective_scores), effective_scores)
 
-    # RED LIGHT (Mobility)
-    if effective_scores.get('active_straight_leg_raise', 3) <= 1 or \
-       effective_scores.get('shoulder_mobility', 3) <= 1:
-        return {"status": "MOBILITY", "target_level": 1, "reason": "Mobility Restriction (Score 1 in ASLR or SM)", "effective_scores": effective_scores}
-    # YELLOW LIGHT (Stability)
-    if effective_scores.get('rotary_stability', 3) <= 1 or \
-       effective_scores.get('trunk_stability_pushup', 3) <= 1:
-        return {"status": "STABILITY", "target_level": 3, "reason": "Motor Control Failure (Score 1 in TS or RS)", "effective_scores": effective_scores}
-    # GREEN LIGHT
-    min_pattern = min(
-        effective_scores.get('hurdle_step', 3),
-        effective_scores.get('inline_lunge', 3),
-        effective_scores.get('overhead_squat', 3)
+
+def effective_score_from_bits(test_name: str, fault_bits: int, manual_score: Any, use_manual_scores: bool = False):
+    """One test's effective score from the fault bitset (manual score when forced or nothing is checked)."""
+    if use_manual_scores:
+        return manual_score
+    layout = layout_for(test_name)
+    bits = bits_for_test(fault_bits, test_name)
+    if bits & layout.sub_input_mask:
+        return score_bits(test_name, bits, layout)
+    return manual_score
+
+
+def analyze_effective_scores(effective_scores: Dict[str, Any]) -> Dict[str, Any]:
+    """Traffic-light result for already-computed effective scores."""
+    return _traffic_light_result(traffic_light_status(effective_scores), effective_scores)
+
+
+def analyze_fms_bits(fault_bits: int, manual_scores: Dict[str, Any], use_manual_scores: bool = False) -> Dict[str, Any]:
+    """
+    analyze_fms_profile on the compact form: the fms_bitset fault bitset plus each present test's
+    entered score. A test counts as having sub-inputs when any of its checkboxes is set.
+    """
+    effective_scores = {
+        test_name: effective_score_from_bits(test_name, fault_bits, manual_score, use_manual_scores)
+        for test_name, manual_score in manual_scores.items()
+    }
+    return analyze_effective_scores(effective_scores)
+
+
+# --- BATCH SCORING (vectorized, for offline re-scoring of stored assessments) ---
+# Flat column layout: "<test>.score", "<test>.clearing_pain", "<test>.<category>.<fault>".
+# A 2-D array passed to analyze_fms_profiles_batch must follow BATCH_COLUMNS order.
+BATCH_COLUMNS = tuple(
+    column
+    for test in FMS_TESTS
+    for column in (
+        f"{test}.score",
+        f"{test}.{CLEARING_PAIN_LITERAL}",
+        *(f"{test}.{category}.{fault}" for category, faults in FMS_FAULT_SCHEMA[test].items() for fault in faults),
     )
-   
-    if min_pattern <= 1:
-        return {"status": "PATTERN", "target_level": 5, "reason": "Pattern Dysfunction (Score 1 in Squat/Hurdle/Lunge)", "effective_scores": effective_scores}
-    elif min_pattern == 2:
-        return {"status": "STRENGTH", "target_level": 7, "reason": "Acceptable Patterning (Score 2). Cleared for Strength.", "effective_scores": effective_scores}
+)
+
+
+def flatten_fms_profile(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """One nested profile (e.g. assessment_inputs.raw_json_data) as a flat {column: value} row."""
+    row = {}
+    for test_name, test_data in profile.items():
+        if not isinstance(test_data, dict):
+            if test_name == 'use_manual_scores':
+                row[test_name] = bool(test_data)
+            continue
+        for key, value in test_data.items():
+            if isinstance(value, dict):
+                for fault, flag in value.items():
+                    row[f"{test_name}.{key}.{fault}"] = flag
+            else:
+                row[f"{test_name}.{key}"] = value
+    return row
+
+
+def profiles_to_frame(profiles: Iterable[Dict[str, Any]]) -> "pd.DataFrame":
+    import pandas as pd
+    return pd.DataFrame.from_records([flatten_fms_profile(p) for p in profiles])
+
+
+def _column(frame: "pd.DataFrame", name: str, n_rows: int, default) -> np.ndarray:
+    if name not in frame.columns:
+        return np.full(n_rows, default)
+    values = frame[name]
+    if values.isna().any():
+        values = values.fillna(default)
+    return values.to_numpy()
+
+
+def _calculated_scores(layout, checked: np.ndarray) -> np.ndarray:
+    """score_bits over a (rows × layout slots) "checked" matrix."""
+    # Rule tables → boolean masks; first matching rule wins, overrides first
+    conditions = [checked[:, [b for b in range(len(layout.slots)) if layout.override_mask >> b & 1]].any(axis=1)]
+    choices = [0]
+    for rule in layout.rules:
+        hits = checked[:, list(rule.positions)] ^ np.array(rule.negated, dtype=bool)
+        conditions.append(hits.all(axis=1) if rule.all_of else hits.any(axis=1))
+        choices.append(rule.score)
+    return np.select(conditions, choices, default=layout.default_score)
+
+
+def analyze_fms_profiles_batch(
+    frame: Union["pd.DataFrame", np.ndarray],
+    use_manual_scores: Optional[bool] = None,
+) -> "pd.DataFrame":
+    """
+    Vectorized analyze_fms_profile over many flattened profiles.
+    Input: DataFrame with BATCH_COLUMNS-style names (missing columns count as unchecked / absent),
+           or a 2-D array in exact BATCH_COLUMNS order.
+    use_manual_scores: applied to every row; when None, a 'use_manual_scores' column is used if present.
+    Output: one row per input row with an effective score column per test present in the input,
+            plus status, target_level, reason_code and reason. Same results as analyze_fms_profile.
+    """
+    import pandas as pd
+
+    if not isinstance(frame, pd.DataFrame):
+        array = np.asarray(frame)
+        if array.ndim != 2 or array.shape[1] != len(BATCH_COLUMNS):
+            raise ValueError(f"Expected a 2-D array with {len(BATCH_COLUMNS)} columns (BATCH_COLUMNS order)")
+        frame = pd.DataFrame(array, columns=BATCH_COLUMNS)
+
+    n_rows = len(frame)
+    if use_manual_scores is None:
+        manual = _column(frame, 'use_manual_scores', n_rows, False).astype(bool)
     else:
-        return {"status": "POWER", "target_level": 9, "reason": "Perfect Patterning (Score 3). Cleared for Power.", "effective_scores": effective_scores}
\ No newline at end of file
+        manual = np.full(n_rows, bool(use_manual_scores))
+
+    present_columns = set(frame.columns)
+    effective = {}
+    test_present = {}
+    for test_name in FMS_TESTS:
+        prefix = f"{test_name}."
+        test_columns = [column for column in frame.columns if column.startswith(prefix)]
+        if not test_columns:
+            continue  # test not in any profile (per-profile: key absent → counts as 3 below)
+        # A row "has" the test when any of its columns is filled in
+        present = frame[test_columns].notna().any(axis=1).to_numpy()
+
+        layout = COMPILED_TESTS[test_name]
+        # Per-bit "checked" matrix over the test's layout (missing columns are unchecked)
+        checked = np.zeros((n_rows, len(layout.slots)), dtype=bool)
+        has_sub_inputs = np.zeros(n_rows, dtype=bool)
+        category_sums: Dict[str, np.ndarray] = {}
+        for bit, (category, fault) in enumerate(layout.slots):
+            name = f"{prefix}{fault}" if bit == layout.clearing_pain_bit else f"{prefix}{category}.{fault}"
+            if name not in present_columns:
+                continue
+            values = _column(frame, name, n_rows, 0)
+            if bit == layout.clearing_pain_bit:
+                checked[:, bit] = values.astype(bool)
+                continue
+            checked[:, bit] = values > 0
+            category_sums[category] = category_sums.get(category, 0) + values
+        for sums in category_sums.values():
+            has_sub_inputs |= sums > 0
+
+        calculated = _calculated_scores(layout, checked)
+
+        manual_score = _column(frame, f"{prefix}score", n_rows, 2)
+        scores = np.where(~manual & has_sub_inputs, calculated, manual_score)
+        if scores.dtype.kind == 'f' and np.all(scores == np.floor(scores)):
+            scores = scores.astype(np.int64)  # NaN-filled score columns come back as float
+        effective[test_name] = scores
+        test_present[test_name] = present
+
+    # Traffic light over the effective scores (absent tests count as 3, as in the per-profile .get(test, 3))
+    status_codes = _traffic_light_codes(
+        {test_name: np.where(test_present[test_name], scores, 3) for test_name, scores in effective.items()}, n_rows
+    )
+
+    target_levels = np.array([TRAFFIC_LIGHTS[s][0] for s in STATUSES])
+    reason_codes = [TRAFFIC_LIGHTS[s][1] for s in STATUSES]
+    reasons = [TRAFFIC_LIGHTS[s][2] for s in STATUSES]
+
+    columns = {}
+    for test_name, scores in effective.items():
+        present = test_present[test_name]
+        # Tests missing from a row have no effective score (nullable column)
+        if present.all():
+            columns[test_name] = scores
+        else:
+            columns[test_name] = pd.arrays.IntegerArray(np.where(present, scores, 0).astype(np.int64), ~present)
+    result = pd.DataFrame(columns, index=frame.index)
+    result["status"] = pd.Categorical.from_codes(status_codes, categories=list(STATUSES))
+    result["target_level"] = target_levels[status_codes]
+    result["reason_code"] = pd.Categorical.from_codes(status_codes, categories=reason_codes)
+    result["reason"] = pd.Categorical.from_codes(status_codes, categories=reasons)
+    return result
+
+
+def analyze_fms_bits_many(
+    words: np.ndarray,
+    manual_scores: np.ndarray,
+    use_manual_scores: Union[bool, np.ndarray] = False,
+) -> List[Dict[str, Any]]:
+    """
+    analyze_fms_bits for a whole batch in one vectorized pass.
+    words: (rows × 2) fms_bitset matrix; manual_scores: (rows × 7) entered scores in FMS_TESTS order.
+    Returns one analyze_fms_bits-style result per row (every row carries all seven tests).
+    """
+    words = np.atleast_2d(np.asarray(words, dtype=np.uint64))
+    manual_scores = np.atleast_2d(np.asarray(manual_scores, dtype=np.int64))
+    n_rows = len(words)
+    manual = np.broadcast_to(np.asarray(use_manual_scores, dtype=bool), (n_rows,))
+    checked_bits = unpack(words)
+
+    effective = np.empty((n_rows, len(FMS_TESTS)), dtype=np.int64)
+    for j, test_name in enumerate(FMS_TESTS):
+        layout = COMPILED_TESTS[test_name]
+        offset, width = TEST_OFFSETS[test_name], TEST_WIDTHS[test_name]
+        # The test's bitset block is the head of its rule layout (a dict-only pain slot may follow)
+        checked = np.zeros((n_rows, len(layout.slots)), dtype=bool)
+        checked[:, :width] = checked_bits[:, offset:offset + width]
+        has_sub_inputs = np.delete(checked[:, :width], layout.clearing_pain_bit, axis=1).any(axis=1)
+        calculated = _calculated_scores(layout, checked)
+        effective[:, j] = np.where(~manual & has_sub_inputs, calculated, manual_scores[:, j])
+
+    # Table lookup when every score is 0-3 (always, unless a manual score is out of range)
+    if n_rows and effective.min() >= 0 and effective.max() <= 3:
+        status_codes = TRAFFIC_LIGHT_LUT[score_index(effective)]
+    else:
+        status_codes = _traffic_light_codes({t: effective[:, j] for j, t in enumerate(FMS_TESTS)}, n_rows)
+
+    return [
+        _traffic_light_result(STATUSES[code], dict(zip(FMS_TESTS, map(int, row))))
+        for code, row in zip(status_codes, effective)
+    ]
@@ -0,0 +1,150 @@
+# fms_bitset.py: Fixed-width bitset encoding of the FMS fault profile.
+# Every (test, category, fault) checkbox and each test's clearing_pain flag owns one bit, laid out
+# test by test in FMS_TESTS / FMS_FAULT_SCHEMA order. 88 bits: a Python int, or numpy.uint64[2]
+# (word 0 = bits 0-63). Each test's block is contiguous, so per-test scoring is one shift + mask.
+
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.logic.fms_schema import FMS_FAULT_SCHEMA, FMS_TESTS
+
+CLEARING_PAIN_SLOT = ("", "clearing_pain")
+
+BitKey = Tuple[str, str, str]
+
+BIT_KEYS: Tuple[BitKey, ...] = tuple(
+    (test, category, fault)
+    for test in FMS_TESTS
+    for category, fault in (
+        *((c, f) for c, faults in FMS_FAULT_SCHEMA[test].items() for f in faults),
+        CLEARING_PAIN_SLOT,
+    )
+)
+BIT_POSITIONS: Dict[BitKey, int] = {key: i for i, key in enumerate(BIT_KEYS)}
+N_BITS = len(BIT_KEYS)
+N_WORDS = 2
+N_BYTES = (N_BITS + 7) // 8
+assert N_BITS <= 64 * N_WORDS, "fault schema no longer fits in numpy.uint64[2]"
+
+# Per-test block: offset of its first bit, and width (its checkboxes + clearing_pain, last)
+TEST_OFFSETS: Dict[str, int] = {}
+TEST_WIDTHS: Dict[str, int] = {}
+for _i, (_test, _category, _fault) in enumerate(BIT_KEYS):
+    TEST_OFFSETS.setdefault(_test, _i)
+    TEST_WIDTHS[_test] = TEST_WIDTHS.get(_test, 0) + 1
+
+CLEARING_PAIN_MASK = sum(1 << BIT_POSITIONS[(test, *CLEARING_PAIN_SLOT)] for test in FMS_TESTS)
+FAULT_MASK = ((1 << N_BITS) - 1) ^ CLEARING_PAIN_MASK
+
+# test -> {(category, fault): absolute bit} for the encoder's single walk
+_TEST_SLOTS: Dict[str, Dict[Tuple[str, str], int]] = {}
+for (_test, _category, _fault), _bit in BIT_POSITIONS.items():
+    _TEST_SLOTS.setdefault(_test, {})[(_category, _fault)] = _bit
+
+_WORD_MASK = (1 << 64) - 1
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def encode(profile: Optional[Dict[str, Any]]) -> int:
+    """Bitset of every checked (> 0) checkbox and every set clearing_pain flag in a nested profile."""
+    bits = 0
+    if not profile:
+        return bits
+    for test_name, test_data in profile.items():
+        slots = _TEST_SLOTS.get(test_name)
+        if slots is None or not isinstance(test_data, dict):
+            continue
+        for category, details in test_data.items():
+            if isinstance(details, dict):
+                for fault, value in details.items():
+                    bit = slots.get((category, fault))
+                    if bit is not None and isinstance(value, (int, float)) and value > 0:
+                        bits |= 1 << bit
+        if test_data.get("clearing_pain", False):
+            bits |= 1 << slots[CLEARING_PAIN_SLOT]
+    return bits
+
+
+def replace_test(bits: int, test_name: str, test_data: Dict[str, Any]) -> int:
+    """`bits` with one test's block re-encoded from its nested dict (other tests untouched)."""
+    offset = TEST_OFFSETS.get(test_name)
+    if offset is None:
+        return bits
+    block_mask = ((1 << TEST_WIDTHS[test_name]) - 1) << offset
+    return (bits & ~block_mask) | encode({test_name: test_data})
+
+
+def decode(bits: int) -> Dict[str, Dict[str, Any]]:
+    """Nested {test: {category: {fault: 0/1}, "clearing_pain": bool}} for a bitset (scores are not stored)."""
+    profile: Dict[str, Dict[str, Any]] = {}
+    for i, (test, category, fault) in enumerate(BIT_KEYS):
+        test_data = profile.setdefault(test, {"clearing_pain": False})
+        value = bits >> i & 1
+        if (category, fault) == CLEARING_PAIN_SLOT:
+            test_data["clearing_pain"] = bool(value)
+        else:
+            test_data.setdefault(category, {})[fault] = value
+    return profile
+
+
+def bits_for_test(bits: int, test_name: str) -> int:
+    """One test's block, shifted down to bit 0 (same layout as fms_rules' per-test slots)."""
+    offset = TEST_OFFSETS.get(test_name)
+    if offset is None:
+        return 0
+    return bits >> offset & ((1 << TEST_WIDTHS[test_name]) - 1)
+
+
+def iter_active_faults(bits: int) -> Iterator[BitKey]:
+    """(test, category, fault) of every set checkbox bit, in schema order (clearing_pain excluded)."""
+    bits &= FAULT_MASK
+    while bits:
+        low = bits & -bits
+        yield BIT_KEYS[low.bit_length() - 1]
+        bits ^= low
+
+
+def to_words(bits: int) -> np.ndarray:
+    return np.array([bits & _WORD_MASK, bits >> 64], dtype=np.uint64)
+
+
+def from_words(words: Sequence[int]) -> int:
+    return int(words[0]) | int(words[1]) << 64
+
+
+def to_bytes(bits: int) -> bytes:
+    """Fixed-width little-endian form used for DB storage."""
+    return bits.to_bytes(N_BYTES, "little")
+
+
+def from_bytes(data: bytes) -> int:
+    return int.from_bytes(data, "little")
+
+
+def encode_many(profiles: Sequence[Optional[Dict[str, Any]]]) -> np.ndarray:
+    """(profiles × 2) uint64 matrix, one bitset per row."""
+    words = np.zeros((len(profiles), N_WORDS), dtype=np.uint64)
+    for i, profile in enumerate(profiles):
+        words[i] = to_words(encode(profile))
+    return words
+
+
+def unpack(words: np.ndarray) -> np.ndarray:
+    """(rows × N_BITS) boolean matrix from a (rows × 2) or (2,) uint64 bitset array."""
+    words = np.atleast_2d(np.asarray(words, dtype="<u8"))
+    return np.unpackbits(words.view(np.uint8), axis=1, bitorder="little")[:, :N_BITS].astype(bool)
+
+
+# --- SIMILARITY SEARCH ---
+def hamming_distances(query_bits: int, words: np.ndarray, mask: int = FAULT_MASK) -> np.ndarray:
+    """Number of differing checkboxes between one profile and each row of a (rows × 2) bitset matrix."""
+    words = np.atleast_2d(np.asarray(words, dtype="<u8"))
+    diff = (words ^ to_words(query_bits)) & to_words(mask)
+    return _POPCOUNT[diff.view(np.uint8)].sum(axis=1, dtype=np.int64)
+
+
+def nearest_profiles(query_bits: int, words: np.ndarray, k: int = 5, mask: int = FAULT_MASK) -> np.ndarray:
+    """Row indices of the k closest bitsets by Hamming distance (ties keep input order)."""
+    distances = hamming_distances(query_bits, words, mask)
+    return np.argsort(distances, kind="stable")[:k]
@@ -0,0 +1,222 @@
+# fms_rules.py: Declarative FMS scoring criteria, compiled once at import into bitmask predicates.
+# Each test's sub-faults are packed into a small int (bit i = i-th checkbox of that test is > 0),
+# so scoring one test is a few AND/XOR/compare operations instead of a chain of dict lookups.
+
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from src.logic.fms_schema import FMS_FAULT_SCHEMA, FMS_TESTS
+
+# Literals are "category.fault" (true when the checkbox is > 0) or "!category.fault" (true when it is 0).
+# "any" rules fire when at least one literal holds, "all" rules when every literal holds.
+PAIN_LITERAL = "pain.pain_reported"
+CLEARING_PAIN_LITERAL = "clearing_pain"   # top-level bool on the test, not a checkbox
+
+
+class ScoreRule(NamedTuple):
+    score: int
+    mode: str                 # "any" | "all"
+    literals: Tuple[str, ...]
+
+
+# --- OVERRIDES (checked first, for every test) ---
+PAIN_RULE = ScoreRule(0, "any", (PAIN_LITERAL,))
+CLEARING_PAIN_RULE = ScoreRule(0, "any", (CLEARING_PAIN_LITERAL,))
+OVERRIDE_RULES = (PAIN_RULE, CLEARING_PAIN_RULE)
+
+# --- TEST-SPECIFIC RULES (first match wins, binary-adjusted FMS decision trees) ---
+SCORING_RULES: Dict[str, Tuple[ScoreRule, ...]] = {
+    "overhead_squat": (
+        # Major faults present (bad > 0 or good == 0)
+        ScoreRule(1, "any", (
+            "trunk_torso.excessive_forward_lean",
+            "trunk_torso.lumbar_flexion",
+            "lower_limb.knee_valgus",
+            "feet.heels_lift",
+            "upper_body_bar_position.bar_drifts_forward",
+            "!trunk_torso.upright_torso",
+        )),
+        # Heels lift but others ok (unreachable today: heels_lift is already a score-1 fault)
+        ScoreRule(2, "any", ("feet.heels_lift",)),
+    ),
+    "hurdle_step": (
+        ScoreRule(1, "any", ("stepping_leg.toe_drag", "pelvis_core_control.loss_of_balance")),
+        ScoreRule(2, "any", (
+            "pelvis_core_control.excessive_rotation",
+            "stance_leg.knee_valgus",
+            "stance_leg.knee_varus",
+            "!stance_leg.knee_stable",
+        )),
+    ),
+    "inline_lunge": (
+        ScoreRule(1, "any", ("balance_stability.loss_of_balance",)),
+        ScoreRule(2, "any", (
+            "alignment.excessive_forward_lean",
+            "alignment.lateral_shift",
+            "lower_body_control.knee_valgus",
+            "lower_body_control.heel_lift",
+            "!lower_body_control.knee_tracks_over_foot",
+        )),
+    ),
+    "shoulder_mobility": (
+        ScoreRule(1, "any", ("reach_quality.excessive_gap", "reach_quality.asymmetry_present")),
+        ScoreRule(2, "any", ("compensation.rib_flare", "compensation.scapular_winging")),
+        ScoreRule(3, "any", ("reach_quality.hands_within_fist_distance",)),
+    ),
+    "active_straight_leg_raise": (
+        ScoreRule(1, "any", ("moving_leg.lt_60_hip_flexion", "non_moving_leg.foot_lifts_off_floor")),
+        ScoreRule(2, "any", ("pelvic_control.anterior_tilt", "moving_leg.hamstring_restriction")),
+        ScoreRule(3, "all", ("moving_leg.gt_80_hip_flexion", "pelvic_control.pelvis_stable")),
+    ),
+    "trunk_stability_pushup": (
+        ScoreRule(1, "any", ("core_control.hips_lag", "body_alignment.sagging_hips")),
+        ScoreRule(2, "any", ("upper_body.uneven_arm_push", "upper_body.shoulder_instability")),
+    ),
+    "rotary_stability": (
+        ScoreRule(1, "any", ("diagonal_pattern.unable_to_complete",)),
+        ScoreRule(2, "any", ("diagonal_pattern.loss_of_balance", "spinal_control.excessive_rotation")),
+        ScoreRule(3, "any", ("diagonal_pattern.smooth_controlled",)),
+    ),
+}
+
+# Score when no rule fires (also used for tests outside the schema)
+DEFAULT_SCORES = {
+    "overhead_squat": 3,
+    "hurdle_step": 3,
+    "inline_lunge": 3,
+    "shoulder_mobility": 2,
+    "active_straight_leg_raise": 2,
+    "trunk_stability_pushup": 3,
+    "rotary_stability": 1,
+}
+FALLBACK_SCORE = 3
+
+
+# --- COMPILATION ---
+class CompiledRule(NamedTuple):
+    score: int
+    all_of: bool
+    mask: int                 # bits the rule looks at
+    invert: int               # bits of negated literals (flipped before testing)
+    positions: Tuple[int, ...]
+    negated: Tuple[bool, ...]
+
+    def matches(self, bits: int) -> bool:
+        hit = (bits ^ self.invert) & self.mask
+        return hit == self.mask if self.all_of else hit != 0
+
+
+class TestLayout(NamedTuple):
+    """Bit layout of one test: every schema checkbox, plus the pain checkbox and clearing_pain flag."""
+    name: str
+    slots: Tuple[Tuple[str, str], ...]        # (category, fault) per bit; clearing_pain is ("", "clearing_pain")
+    slot_ids: Dict[Tuple[str, str], int]
+    clearing_pain_bit: int
+    override_mask: int
+    rules: Tuple[CompiledRule, ...]
+    default_score: int
+    sub_input_mask: int                       # checkbox bits (everything but clearing_pain)
+
+
+def _build_slots(test_name: str) -> Tuple[Tuple[str, str], ...]:
+    # Checkboxes then clearing_pain: the same block as the test's slice of fms_bitset.BIT_KEYS.
+    # Tests without a pain category get an extra pain slot after it (only set by dict input).
+    slots = [(category, fault) for category, faults in FMS_FAULT_SCHEMA.get(test_name, {}).items() for fault in faults]
+    slots.append(("", CLEARING_PAIN_LITERAL))
+    pain_slot = tuple(PAIN_LITERAL.split("."))
+    if pain_slot not in slots:
+        slots.append(pain_slot)
+    return tuple(slots)
+
+
+def _compile_rule(rule: ScoreRule, slot_ids: Dict[Tuple[str, str], int], clearing_pain_bit: int) -> CompiledRule:
+    if rule.mode not in ("any", "all"):
+        raise ValueError(f"Unknown rule mode '{rule.mode}'")
+    mask = invert = 0
+    positions, negated = [], []
+    for literal in rule.literals:
+        is_negated = literal.startswith("!")
+        name = literal.lstrip("!")
+        if name == CLEARING_PAIN_LITERAL:
+            bit = clearing_pain_bit
+        else:
+            category, _, fault = name.partition(".")
+            if (category, fault) not in slot_ids:
+                raise ValueError(f"Rule literal '{literal}' is not a known checkbox")
+            bit = slot_ids[(category, fault)]
+        mask |= 1 << bit
+        if is_negated:
+            invert |= 1 << bit
+        positions.append(bit)
+        negated.append(is_negated)
+    return CompiledRule(rule.score, rule.mode == "all", mask, invert, tuple(positions), tuple(negated))
+
+
+def compile_test(test_name: str) -> TestLayout:
+    slots = _build_slots(test_name)
+    slot_ids = {slot: i for i, slot in enumerate(slots)}
+    clearing_pain_bit = slot_ids[("", CLEARING_PAIN_LITERAL)]
+
+    overrides = [_compile_rule(rule, slot_ids, clearing_pain_bit) for rule in OVERRIDE_RULES]
+    override_mask = 0
+    for rule in overrides:
+        override_mask |= rule.mask
+
+    return TestLayout(
+        name=test_name,
+        slots=slots,
+        slot_ids=slot_ids,
+        clearing_pain_bit=clearing_pain_bit,
+        override_mask=override_mask,
+        rules=tuple(_compile_rule(rule, slot_ids, clearing_pain_bit) for rule in SCORING_RULES.get(test_name, ())),
+        default_score=DEFAULT_SCORES.get(test_name, FALLBACK_SCORE),
+        sub_input_mask=((1 << len(slots)) - 1) ^ (1 << clearing_pain_bit),
+    )
+
+
+COMPILED_TESTS: Dict[str, TestLayout] = {test: compile_test(test) for test in FMS_TESTS}
+_UNKNOWN_TEST = compile_test("")
+
+
+def layout_for(test_name: str) -> TestLayout:
+    return COMPILED_TESTS.get(test_name, _UNKNOWN_TEST)
+
+
+# --- RUNTIME ---
+def encode_test(test_name: str, test_data: Dict[str, Any]) -> Tuple[int, bool]:
+    """
+    Pack one test's checkboxes into its bit layout.
+    Returns (bits, has_sub_inputs) where has_sub_inputs is True when any nested dict sums above 0.
+    """
+    layout = layout_for(test_name)
+    slot_ids = layout.slot_ids
+    bits = 0
+    has_sub_inputs = False
+    for category, details in test_data.items():
+        if not isinstance(details, dict):
+            continue
+        if sum(details.values()) > 0:
+            has_sub_inputs = True
+        for fault, value in details.items():
+            bit = slot_ids.get((category, fault))
+            if bit is not None and value > 0:
+                bits |= 1 << bit
+    if test_data.get(CLEARING_PAIN_LITERAL, False):
+        bits |= 1 << layout.clearing_pain_bit
+    return bits, has_sub_inputs
+
+
+def score_bits(test_name: str, bits: int, layout: Optional[TestLayout] = None) -> int:
+    """Strictly calculated score (0-3) for an encoded test."""
+    layout = layout or layout_for(test_name)
+    if bits & layout.override_mask:
+        return 0
+    for rule in layout.rules:
+        if rule.matches(bits):
+            return rule.score
+    return layout.default_score
+
+
+def calculate_score_from_faults(test_name: str, test_data: Dict[str, Any]) -> int:
+    """Score (0-3) for one test's nested checkbox dict, using the compiled rule tables."""
+    layout = layout_for(test_name)
+    return score_bits(test_name, encode_test(test_name, test_data)[0], layout)
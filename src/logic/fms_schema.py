@@ -0,0 +1,60 @@
+# fms_schema.py: Canonical layout of the 7 FMS tests and their binary sub-fault checkboxes.
+# Mirrors the Pydantic request models in main.py (FMSProfileRequest). Order matters: it is the
+# stable (test, category, fault) ordering used by the retriever's fault→tag matrix.
+
+FMS_TESTS = (
+    "overhead_squat",
+    "hurdle_step",
+    "inline_lunge",
+    "shoulder_mobility",
+    "active_straight_leg_raise",
+    "trunk_stability_pushup",
+    "rotary_stability",
+)
+
+FMS_FAULT_SCHEMA = {
+    "overhead_squat": {
+        "trunk_torso": ("upright_torso", "excessive_forward_lean", "rib_flare", "lumbar_flexion", "lumbar_extension_sway_back"),
+        "lower_limb": ("knees_track_over_toes", "knee_valgus", "knee_varus", "uneven_depth"),
+        "feet": ("heels_stay_down", "heels_lift", "excessive_pronation", "excessive_supination"),
+        "upper_body_bar_position": ("bar_aligned_over_mid_foot", "bar_drifts_forward", "arms_fall_forward", "shoulder_mobility_restriction_suspected"),
+    },
+    "hurdle_step": {
+        "pelvis_core_control": ("pelvis_stable", "pelvic_drop_trendelenburg", "excessive_rotation", "loss_of_balance"),
+        "stance_leg": ("knee_stable", "knee_valgus", "knee_varus", "ankle_instability"),
+        "stepping_leg": ("clears_hurdle_smoothly", "toe_drag", "hip_flexion_restriction", "asymmetrical_movement"),
+    },
+    "inline_lunge": {
+        "alignment": ("head_neutral", "forward_head", "trunk_upright", "excessive_forward_lean", "lateral_shift"),
+        "lower_body_control": ("knee_tracks_over_foot", "knee_valgus", "knee_instability", "heel_lift"),
+        "balance_stability": ("stable_throughout", "wobbling", "loss_of_balance", "unequal_weight_distribution"),
+    },
+    "shoulder_mobility": {
+        "reach_quality": ("hands_within_fist_distance", "hands_within_hand_length", "excessive_gap", "asymmetry_present"),
+        "compensation": ("no_compensation", "spine_flexion", "rib_flare", "scapular_winging"),
+        "pain": ("no_pain", "pain_reported"),
+    },
+    "active_straight_leg_raise": {
+        "non_moving_leg": ("remains_flat", "knee_bends", "hip_externally_rotates", "foot_lifts_off_floor"),
+        "moving_leg": ("gt_80_hip_flexion", "between_60_80_hip_flexion", "lt_60_hip_flexion", "hamstring_restriction"),
+        "pelvic_control": ("pelvis_stable", "anterior_tilt", "posterior_tilt"),
+    },
+    "trunk_stability_pushup": {
+        "body_alignment": ("neutral_spine_maintained", "sagging_hips", "pike_position"),
+        "core_control": ("initiates_as_one_unit", "hips_lag", "excessive_lumbar_extension"),
+        "upper_body": ("elbows_aligned", "uneven_arm_push", "shoulder_instability"),
+    },
+    "rotary_stability": {
+        "diagonal_pattern": ("smooth_controlled", "loss_of_balance", "unable_to_complete"),
+        "spinal_control": ("neutral_maintained", "excessive_rotation", "lumbar_shift"),
+        "symmetry": ("symmetrical", "left_side_deficit", "right_side_deficit"),
+    },
+}
+
+# Flat, ordered list of every (test, category, fault) checkbox.
+FAULT_KEYS = tuple(
+    (test, category, fault)
+    for test in FMS_TESTS
+    for category, faults in FMS_FAULT_SCHEMA[test].items()
+    for fault in faults
+)
@@ -0,0 +1,214 @@
+# metrics.py: In-process metrics rendered in the Prometheus text format (0.0.4) at GET /metrics.
+# Recording is a dict lookup plus an int/float add; there are no locks. The API runs on one event
+# loop thread, so only metrics touched from worker threads can lose an update under a race, which
+# is acceptable for monitoring. Values that already live elsewhere (cache stats, KB snapshot,
+# write-behind queue) are read by collectors at scrape time instead of being mirrored here.
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[Dict[str, Any], float]                     # (labels, value)
+Family = Tuple[str, str, str, Iterable[Sample]]           # (name, type, help, samples)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def _labels(self, values: LabelValues) -> Dict[str, Any]:
+        return dict(zip(self.labelnames, values))
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, *labels: str):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> List[Tuple[str, Dict[str, Any], float]]:
+        return [(self.name, self._labels(k), v) for k, v in self._values.items()]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = value
+
+    def inc(self, amount: float = 1, *labels: str):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, amount: float = 1, *labels: str):
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    @contextmanager
+    def track(self, *labels: str):
+        """Count the enclosed block as in flight."""
+        self.inc(1, *labels)
+        try:
+            yield
+        finally:
+            self.dec(1, *labels)
+
+    def samples(self) -> List[Tuple[str, Dict[str, Any], float]]:
+        return [(self.name, self._labels(k), v) for k, v in self._values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last = +Inf), sum]
+        self._series: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0])
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    @contextmanager
+    def time(self, *labels: str):
+        """Observe the wall time of the enclosed block (also when it raises)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def samples(self) -> List[Tuple[str, Dict[str, Any], float]]:
+        out = []
+        for key, (counts, total) in self._series.items():
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                out.append((f"{self.name}_bucket", {**labels, "le": le}, cumulative))
+            out.append((f"{self.name}_sum", labels, total))
+            out.append((f"{self.name}_count", labels, cumulative))
+        return out
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def collector(self, fn: Callable[[], Iterable[Family]]):
+        """Register a scrape-time callback returning (name, type, help, [(labels, value), ...]) families."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for collect in self._collectors:
+            try:
+                families = list(collect())
+            except Exception as e:
+                lines.append(f"# collector {getattr(collect, '__name__', collect)} failed: {_escape(e)}")
+                continue
+            for name, kind, help, samples in families:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# --- PIPELINE ---
+STAGE_SECONDS = registry.histogram(
+    "fitai_stage_duration_seconds", "Time spent per pipeline stage (analyze, retrieve, generate, persist).", ("stage",)
+)
+HTTP_IN_FLIGHT = registry.gauge("fitai_http_requests_in_flight", "HTTP requests currently being handled (streams count until closed).")
+LLM_IN_FLIGHT = registry.gauge("fitai_llm_calls_in_flight", "LLM calls currently waiting on the provider.")
+HTTP_IN_FLIGHT.set(0)
+LLM_IN_FLIGHT.set(0)
+
+# --- LLM ---
+LLM_TOKENS = registry.counter("fitai_llm_tokens_total", "Tokens reported by the LLM provider.", ("model", "kind"))
+LLM_CALLS = registry.counter("fitai_llm_calls_total", "LLM calls by outcome.", ("model", "outcome"))
+
+# --- DATABASE ---
+DB_POOL_WAIT_SECONDS = registry.histogram(
+    "fitai_db_pool_checkout_seconds", "Time to check a connection out of the DB pool (includes connecting when the pool grows).",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+DB_CONNECTIONS_OPENED = registry.counter("fitai_db_connections_opened_total", "New DB connections opened by the pool.")
+DB_CONNECTIONS_CLOSED = registry.counter(
+    "fitai_db_connections_closed_total", "DB connections discarded by the pool (recycled, invalidated, overflow returned).", ("reason",)
+)
+DB_POOL_TIMEOUTS = registry.counter("fitai_db_pool_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT seconds.")
+
+
+class InFlightMiddleware:
+    """Plain ASGI middleware (no BaseHTTPMiddleware overhead) keeping HTTP_IN_FLIGHT current."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        with HTTP_IN_FLIGHT.track():
+            await self.app(scope, receive, send)
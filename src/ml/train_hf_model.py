@@ -1,3 +1,4 @@
+# Run from the repo root: python -m src.ml.train_hf_model
 import pandas as pd
 import numpy as np
 import torch
@@ -13,6 +14,8 @@ from transformers import (
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report
 
+from src.logic.fms_analyzer import TRAFFIC_LIGHT_LUT, score_index
+
 # ==========================================
 # CONFIGURATION
 # ==========================================
@@ -58,20 +61,9 @@ def generate_expert_data(n_samples=2000):
         )
         
         # --- B. ASSIGN LABEL (The "Answer") ---
-        # This matches your 'fms_analyzer.py' logic EXACTLY.
-        
-        if 0 in profile:
-            label = 0 # STOP/Medical
-        elif aslr <= 1 or sm <= 1:
-            label = 1 # Mobility
-        elif tsp <= 1 or rs <= 1:
-            label = 2 # Stability
-        elif ds == 1:
-            label = 3 # Patterning
-        elif ds == 2:
-            label = 4 # Strength
-        else:
-            label = 5 # Power
+        # Straight from fms_analyzer's precomputed traffic-light table, so the labels
+        # match analyze_fms_profile EXACTLY (label = index into STATUSES).
+        label = int(TRAFFIC_LIGHT_LUT[score_index(profile)])
             
         data.append(text_input)
         labels.append(label)
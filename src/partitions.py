@@ -0,0 +1,268 @@
+# partitions.py: Monthly range partitions on created_at for the assessment tables.
+# Each month is its own partition (assessment_inputs_p202610, ...) so inserts and recent-data
+# queries only touch small, hot tables and their indexes, however long the history gets.
+# A DEFAULT partition catches rows for months that were not created ahead of time, so inserts
+# never fail if maintenance lapses. maintenance.py (run it from cron) creates partitions ahead,
+# moves rows out of DEFAULT into partitions of their own month (only monthly partitions are ever
+# detached), detaches the ones past retention and archives detached partitions to zstd Parquet files.
+
+import os
+import re
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+PARTITIONED_TABLES = ("assessment_inputs", "assessment_scores")
+
+PARTITION_MONTHS_AHEAD = int(os.environ.get("PARTITION_MONTHS_AHEAD", "3"))
+PARTITION_RETENTION_MONTHS = int(os.environ.get("PARTITION_RETENTION_MONTHS", "12"))
+PARTITION_ARCHIVE = os.environ.get("PARTITION_ARCHIVE", "1") != "0"
+PARTITION_ARCHIVE_DIR = os.environ.get("PARTITION_ARCHIVE_DIR", "data/archive")
+PARTITION_DROP_ARCHIVED = os.environ.get("PARTITION_DROP_ARCHIVED", "1") != "0"
+ARCHIVE_BATCH_ROWS = int(os.environ.get("ARCHIVE_BATCH_ROWS", "10000"))
+
+_MONTH_SUFFIX = re.compile(r"_p(\d{4})(\d{2})$")
+
+
+# --- MONTH ARITHMETIC ---
+def month_start(day: Optional[date] = None) -> date:
+    day = day or datetime.now(timezone.utc).date()
+    return date(day.year, day.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def partition_month(name: str) -> Optional[date]:
+    match = _MONTH_SUFFIX.search(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def _bound(month: date) -> str:
+    return f"'{month:%Y-%m-%d} 00:00:00+00'"
+
+
+def partition_ddl(table: str, month: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+        f"FOR VALUES FROM ({_bound(month)}) TO ({_bound(add_months(month, 1))})"
+    )
+
+
+# --- CATALOG ---
+async def is_partitioned(conn, table: str) -> bool:
+    return bool((await conn.execute(
+        text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:table)"), {"table": table}
+    )).scalar())
+
+
+async def attached_partitions(conn, table: str) -> List[str]:
+    rows = await conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:table) ORDER BY c.relname"
+    ), {"table": table})
+    return [name for name in rows.scalars() if partition_month(name)]
+
+
+async def detached_partitions(conn, table: str) -> List[str]:
+    """Monthly tables no longer attached to `table` (detached, not yet archived and dropped)."""
+    rows = await conn.execute(text(
+        "SELECT relname FROM pg_class WHERE relkind = 'r' AND NOT relispartition "
+        "AND relname ~ :pattern AND pg_table_is_visible(oid) ORDER BY relname"
+    ), {"pattern": f"^{table}_p[0-9]{{6}}$"})
+    return list(rows.scalars())
+
+
+# --- CREATE AHEAD ---
+async def create_partition(conn, table: str, month: date) -> bool:
+    """
+    Create one month's partition. Rows that already fell into the DEFAULT partition for that
+    month are moved into it (Postgres refuses the CREATE while the default holds them).
+    Returns True when the partition was created.
+    """
+    name = partition_name(table, month)
+    if (await conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name})).scalar():
+        return False
+    default = default_partition_name(table)
+    in_range = f"created_at >= {_bound(month)} AND created_at < {_bound(add_months(month, 1))}"
+    stranded = (await conn.execute(text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_range})"))).scalar()
+    if not stranded:
+        await conn.execute(text(partition_ddl(table, month)))
+        return True
+    await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {default}"))
+    await conn.execute(text(partition_ddl(table, month)))
+    columns = await insertable_columns(conn, default)
+    await conn.execute(text(f"INSERT INTO {name} ({columns}) SELECT {columns} FROM {default} WHERE {in_range}"))
+    await conn.execute(text(f"DELETE FROM {default} WHERE {in_range}"))
+    await conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT"))
+    return True
+
+
+async def insertable_columns(conn, table: str) -> str:
+    """Comma-separated columns of `table`, generated columns excluded (Postgres computes those)."""
+    rows = await conn.execute(text(
+        "SELECT attname FROM pg_attribute WHERE attrelid = to_regclass(:table) "
+        "AND attnum > 0 AND NOT attisdropped AND attgenerated = '' ORDER BY attnum"
+    ), {"table": table})
+    return ", ".join(rows.scalars())
+
+
+async def ensure_partitions(
+    conn,
+    first_month: Optional[date] = None,
+    months_ahead: int = PARTITION_MONTHS_AHEAD,
+    today: Optional[date] = None,
+) -> List[str]:
+    """DEFAULT partition plus one partition per month from `first_month` (default: this month) to `months_ahead` ahead."""
+    current = month_start(today)
+    month, last = first_month or current, add_months(current, months_ahead)
+    created = []
+    for table in PARTITIONED_TABLES:
+        await conn.execute(text(f"CREATE TABLE IF NOT EXISTS {default_partition_name(table)} PARTITION OF {table} DEFAULT"))
+    while month <= last:
+        for table in PARTITIONED_TABLES:
+            if await create_partition(conn, table, month):
+                created.append(partition_name(table, month))
+        month = add_months(month, 1)
+    return created
+
+
+# --- DEFAULT PARTITION ---
+async def default_months(conn, table: str) -> List[date]:
+    """Months (UTC) that have rows in `table`'s DEFAULT partition."""
+    rows = await conn.execute(text(
+        f"SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC') FROM {default_partition_name(table)} ORDER BY 1"
+    ))
+    return [month.date() for month in rows.scalars()]
+
+
+async def default_row_counts(conn) -> Dict[str, int]:
+    return {
+        default_partition_name(table): (await conn.execute(text(f"SELECT count(*) FROM {default_partition_name(table)}"))).scalar()
+        for table in PARTITIONED_TABLES
+    }
+
+
+async def partition_default_rows(conn) -> List[str]:
+    """
+    Create the monthly partition of every month with rows in DEFAULT (create_partition moves
+    them over), so those rows fall under retention like any other month. Returns the partitions created.
+    """
+    created = []
+    for table in PARTITIONED_TABLES:
+        for month in await default_months(conn, table):
+            if await create_partition(conn, table, month):
+                created.append(partition_name(table, month))
+    return created
+
+
+# --- RETENTION ---
+def retention_cutoff(retention_months: int = PARTITION_RETENTION_MONTHS, today: Optional[date] = None) -> date:
+    """First month that is kept: partitions of earlier months are past retention."""
+    return add_months(month_start(today), -retention_months)
+
+
+async def detach_old_partitions(
+    conn,
+    retention_months: int = PARTITION_RETENTION_MONTHS,
+    today: Optional[date] = None,
+) -> List[str]:
+    cutoff = retention_cutoff(retention_months, today)
+    detached = []
+    for table in PARTITIONED_TABLES:
+        for name in await attached_partitions(conn, table):
+            if partition_month(name) < cutoff:
+                await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+                detached.append(name)
+    return detached
+
+
+# --- ARCHIVE ---
+def archive_path(name: str, archive_dir: str = PARTITION_ARCHIVE_DIR) -> str:
+    table = name[: _MONTH_SUFFIX.search(name).start()]
+    return os.path.join(archive_dir, table, f"{name}.parquet")
+
+
+async def _arrow_schema(conn, pa, table: str):
+    """(arrow schema, SELECT list) for `table`. json/jsonb are selected as text, since the driver decodes them to dicts."""
+    # Explicit types, so a column that is NULL throughout the first row group can't pin its type
+    types = {
+        "integer": pa.int32(), "bigint": pa.int64(), "smallint": pa.int16(), "smallint[]": pa.list_(pa.int16()),
+        "timestamp with time zone": pa.timestamp("us", tz="UTC"), "bytea": pa.binary(), "boolean": pa.bool_(),
+    }
+    rows = list(await conn.execute(text(
+        "SELECT attname, format_type(atttypid, atttypmod) FROM pg_attribute "
+        "WHERE attrelid = to_regclass(:table) AND attnum > 0 AND NOT attisdropped ORDER BY attnum"
+    ), {"table": table}))
+    # json/jsonb are stored as JSON text; text/varchar and anything else as strings
+    schema = pa.schema([(column, types.get(pg_type, pa.string())) for column, pg_type in rows])
+    select_list = ", ".join(
+        f"{column}::text AS {column}" if pg_type in ("json", "jsonb") else column for column, pg_type in rows
+    )
+    return schema, select_list
+
+
+async def archive_partition(conn, name: str, archive_dir: str = PARTITION_ARCHIVE_DIR, batch_rows: int = ARCHIVE_BATCH_ROWS) -> Dict[str, Any]:
+    """
+    Stream a (detached) partition into `<archive_dir>/<table>/<name>.parquet` (zstd), one row
+    group per `batch_rows`. JSONB columns are stored as JSON text. The file is written under a
+    temporary name and renamed once complete, and its row count is checked against the table.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Archiving partitions needs pyarrow (pip install pyarrow).") from e
+
+    path = archive_path(name, archive_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.partial"
+    expected = (await conn.execute(text(f"SELECT count(*) FROM {name}"))).scalar()
+
+    schema, select_list = await _arrow_schema(conn, pa, name)
+    writer, written, batch = None, 0, []
+    try:
+        result = await conn.stream(text(f"SELECT {select_list} FROM {name} ORDER BY id"))
+        try:
+            async for row in result.mappings():
+                batch.append(dict(row))
+                if len(batch) >= batch_rows:
+                    writer, written = _flush(pa, pq, writer, schema, batch, partial, written)
+                    batch = []
+        finally:
+            await result.close()
+        if batch or writer is None:
+            writer, written = _flush(pa, pq, writer, schema, batch, partial, written)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            writer = None
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    finally:
+        if writer is not None:
+            writer.close()
+    if written != expected:
+        os.remove(partial)
+        raise RuntimeError(f"Archive of {name} wrote {written} rows, table has {expected}; kept the table.")
+    os.replace(partial, path)
+    return {"partition": name, "path": path, "rows": written, "bytes": os.path.getsize(path)}
+
+
+def _flush(pa, pq, writer, schema, batch, partial, written):
+    if writer is None:
+        writer = pq.ParquetWriter(partial, schema, compression="zstd")
+    writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+    return writer, written + len(batch)
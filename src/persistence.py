@@ -0,0 +1,260 @@
+# persistence.py: Write-behind storage of generated assessments.
+# Request handlers enqueue a finished (inputs, scores, plan) record and return; one background
+# task per API worker drains the queue and writes whole batches with multi-row
+# INSERT ... RETURNING in a single transaction, so Neon round-trips leave the latency path.
+
+import asyncio
+import numbers
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import insert, update
+from sqlalchemy.future import select
+
+from src.athletes import summary_updates, update_athlete_summaries
+from src.database import AsyncSessionLocal, AssessmentInput, AssessmentScore, GenerationJob
+from src.logic import fms_bitset
+from src.logic.fms_schema import FMS_TESTS
+
+PERSIST_BATCH_SIZE = int(os.environ.get("PERSIST_BATCH_SIZE", "100"))
+PERSIST_FLUSH_SECONDS = float(os.environ.get("PERSIST_FLUSH_SECONDS", "0.5"))
+PERSIST_QUEUE_MAX = int(os.environ.get("PERSIST_QUEUE_MAX", "10000"))
+
+
+@dataclass
+class PendingAssessment:
+    """One assessment waiting to be written: the AssessmentInput and AssessmentScore column values."""
+    raw_json_data: Dict[str, Any]
+    fault_bits: bytes
+    scores: Dict[str, Any]                    # FMS test → effective score
+    total_score: Any
+    generated_workout: Optional[Dict[str, Any]]
+    athlete_id: Optional[int] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+def composite_score(scores: Dict[str, Any]) -> int:
+    """FMS composite (0-21): sum of the per-test scores. The analyzer itself reports no total."""
+    return int(sum(score for score in scores.values() if isinstance(score, numbers.Integral)))
+
+
+def pending_assessment(context, final_plan: Optional[Dict[str, Any]]) -> PendingAssessment:
+    """Record for a PipelineContext (see src.pipeline) and its generated plan."""
+    effective_scores = context.effective_scores
+    scores = {test: effective_scores.get(test, 0) for test in FMS_TESTS}
+    return PendingAssessment(
+        raw_json_data=context.full_data,
+        fault_bits=fms_bitset.to_bytes(context.fault_bits),
+        scores=scores,
+        total_score=composite_score(scores),
+        generated_workout=final_plan,
+        athlete_id=context.full_data.get("athlete_id"),
+    )
+
+
+async def _insert_assessments(db, records: Sequence[PendingAssessment]) -> List[int]:
+    inputs = (await db.execute(
+        insert(AssessmentInput).returning(AssessmentInput.id, AssessmentInput.created_at, sort_by_parameter_order=True),
+        [{"raw_json_data": r.raw_json_data, "fault_bits": r.fault_bits, "athlete_id": r.athlete_id} for r in records],
+    )).all()
+    input_ids = [row.id for row in inputs]
+    score_ids = (await db.execute(
+        insert(AssessmentScore).returning(AssessmentScore.id, sort_by_parameter_order=True),
+        [
+            {"input_id": input_id, **r.scores, "total_score": r.total_score, "generated_workout": r.generated_workout}
+            for input_id, r in zip(input_ids, records)
+        ],
+    )).scalars().all()
+    await update_athlete_summaries(db, summary_updates(
+        [r.athlete_id for r in records], [r.total_score for r in records], [row.created_at for row in inputs], score_ids,
+    ))
+    return list(score_ids)
+
+
+async def write_assessments(db, records: Sequence[PendingAssessment]) -> List[int]:
+    """
+    Insert `records` in one transaction: one multi-row INSERT ... RETURNING for the inputs,
+    one multi-row INSERT for the scores, one UPDATE per athlete for the summaries.
+    Returns the new assessment_scores ids, in order.
+    """
+    if not records:
+        return []
+    score_ids = await _insert_assessments(db, records)
+    await db.commit()
+    return score_ids
+
+
+async def write_job_assessment(db, job_id: str, record: PendingAssessment) -> Tuple[int, bool]:
+    """
+    Save the assessment of generation job `job_id` at most once across attempts and workers.
+    The insert and the claim on generation_jobs.assessment_id commit together; a worker whose
+    claim finds the column already set (an earlier attempt, or the worker that took over an
+    expired lease) rolls its insert back. Returns (assessment_scores id, whether this call saved it).
+    """
+    [score_id] = await _insert_assessments(db, [record])
+    claimed = await db.execute(
+        update(GenerationJob)
+        .where(GenerationJob.id == job_id, GenerationJob.assessment_id.is_(None))
+        .values(assessment_id=score_id)
+    )
+    if claimed.rowcount == 1:
+        await db.commit()
+        return score_id, True
+    await db.rollback()
+    existing = (await db.execute(select(GenerationJob.assessment_id).where(GenerationJob.id == job_id))).scalar_one()
+    return existing, False
+
+
+async def _write_with_new_session(records: Sequence[PendingAssessment]) -> List[int]:
+    async with AsyncSessionLocal() as db:
+        try:
+            return await write_assessments(db, records)
+        except Exception:
+            await db.rollback()
+            raise
+
+
+class AssessmentWriter:
+    """
+    Background batch writer. A batch is flushed once it holds `batch_size` records or its oldest
+    record has waited `flush_seconds`. Records only live in memory until written: a crash loses
+    at most one flush interval. A failed batch is retried once, then written record by record,
+    so a DB error drops only the records that cannot be written (counted in stats()["failed"]).
+    """
+
+    def __init__(
+        self,
+        write: Callable[[Sequence[PendingAssessment]], Awaitable[Any]] = _write_with_new_session,
+        batch_size: int = PERSIST_BATCH_SIZE,
+        flush_seconds: float = PERSIST_FLUSH_SECONDS,
+        max_queue: int = PERSIST_QUEUE_MAX,
+    ):
+        self._write = write
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = max(0.0, flush_seconds)
+        self.max_queue = max(1, max_queue)
+        self._pending: Deque[PendingAssessment] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        # Metrics
+        self._written = 0
+        self._failed = 0                          # records dropped after the batch retry and per-record writes failed
+        self._retried = 0                         # batches written a second time after a failure
+        self._rejected = 0
+        self._batches = 0
+        self._write_seconds_total = 0.0
+        self._write_seconds_max = 0.0
+        self._last_write_seconds = 0.0
+        self._lag_seconds_max = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done() and not self._stopping
+
+    def start(self):
+        if self.running:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def submit(self, record: PendingAssessment) -> bool:
+        """Queue a record; False when the writer is not running or the queue is full (caller writes inline)."""
+        if not self.running or len(self._pending) >= self.max_queue:
+            self._rejected += 1
+            return False
+        self._pending.append(record)
+        if len(self._pending) == 1 or len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    async def stop(self):
+        """Stop accepting records and write everything still queued."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._pending:
+                if self._stopping:
+                    return
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            age = time.monotonic() - self._pending[0].enqueued_at
+            if len(self._pending) < self.batch_size and age < self.flush_seconds and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_seconds - age)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            started = loop.time()
+            try:
+                dropped = await self._write_batch(batch)
+            finally:
+                elapsed = loop.time() - started
+                self._batches += 1
+                self._last_write_seconds = elapsed
+                self._write_seconds_total += elapsed
+                self._write_seconds_max = max(self._write_seconds_max, elapsed)
+            self._failed += dropped
+            self._written += len(batch) - dropped
+            if dropped < len(batch):
+                self._lag_seconds_max = max(self._lag_seconds_max, time.monotonic() - batch[0].enqueued_at)
+
+    async def _write_batch(self, batch: List[PendingAssessment]) -> int:
+        """
+        Write `batch`, retrying it once; if the retry fails too, write it one record per transaction
+        so a bad record only loses itself. Returns the number of records dropped.
+        """
+        for attempt in range(2):
+            try:
+                await self._write(batch)
+                return 0
+            except Exception as e:
+                print(f"⚠️ DB Save Error (write-behind, {len(batch)} assessments, attempt {attempt + 1}): {str(e)}")
+                if attempt == 0:
+                    self._retried += 1
+        if len(batch) == 1:
+            return 1
+        dropped = 0
+        for record in batch:
+            try:
+                await self._write([record])
+            except Exception as e:
+                dropped += 1
+                print(f"❌ DB Save Error (write-behind, assessment dropped): {str(e)}")
+        return dropped
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queue_depth": len(self._pending),
+            "oldest_pending_seconds": round(time.monotonic() - self._pending[0].enqueued_at, 4) if self._pending else 0.0,
+            "written": self._written,
+            "failed": self._failed,
+            "retried_batches": self._retried,
+            "rejected": self._rejected,
+            "batches": self._batches,
+            "write_seconds_last": round(self._last_write_seconds, 4),
+            "write_seconds_avg": round(self._write_seconds_total / self._batches, 4) if self._batches else 0.0,
+            "write_seconds_max": round(self._write_seconds_max, 4),
+            "enqueue_to_commit_seconds_max": round(self._lag_seconds_max, 4),
+            "batch_size": self.batch_size,
+            "flush_seconds": self.flush_seconds,
+        }
+
+
+assessment_writer = AssessmentWriter()
@@ -0,0 +1,143 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Set, Tuple
+
+import numpy as np
+
+from src.logic import fms_bitset
+from src.logic.fms_analyzer import analyze_effective_scores, analyze_fms_bits, analyze_fms_bits_many, effective_score_from_bits
+from src.logic.fms_schema import FMS_TESTS
+from src.rag.retriever import FAULT_TAG_MATRIX, search_tag_weights
+
+# (test, category, fault, severity) for every checked sub-fault, in schema order
+ActiveFault = Tuple[str, str, str, Any]
+
+
+@dataclass
+class PipelineContext:
+    """
+    Everything derived from one request's FMS profile, computed once and shared by
+    analysis → retrieval → generation → persistence.
+    """
+    full_data: Dict[str, Any]
+    fault_bits: int                           # fms_bitset encoding of every checked sub-fault
+    manual_scores: Dict[str, Any]             # test → entered score
+    analysis: Dict[str, Any]                  # traffic-light result from analyze_fms_bits
+    fault_query: np.ndarray                   # activation vector over FAULT_TAG_MATRIX rows
+    tag_weights: Dict[str, float]             # search tags (incl. level tag) → weight
+
+    @property
+    def effective_scores(self) -> Dict[str, int]:
+        return self.analysis.get("effective_scores", {})
+
+    @property
+    def target_level(self) -> int:
+        return self.analysis.get("target_level", 1)
+
+    @property
+    def status(self) -> str:
+        return self.analysis.get("status", "TRAINING")
+
+    @property
+    def search_tags(self) -> Set[str]:
+        return set(self.tag_weights)
+
+    @property
+    def active_faults(self) -> Tuple[ActiveFault, ...]:
+        return tuple((test, category, fault, 1) for test, category, fault in fms_bitset.iter_active_faults(self.fault_bits))
+
+
+def _low_score_tests(full_data: Dict[str, Any]) -> List[str]:
+    return [test for test, data in full_data.items() if isinstance(data, dict) and data.get('score', 3) <= 2]
+
+
+def _search_inputs(fault_bits: int, full_data: Dict[str, Any], target_level: int) -> Tuple[np.ndarray, Dict[str, float]]:
+    low_score_tests = _low_score_tests(full_data)
+    fault_query = FAULT_TAG_MATRIX.encode_bits(fault_bits, low_score_tests)
+    tag_weights = search_tag_weights(FAULT_TAG_MATRIX.tag_weight_matrix(fault_query)[0], target_level)
+    return fault_query, tag_weights
+
+
+def build_pipeline_context(full_data: Dict[str, Any]) -> PipelineContext:
+    # One walk over the nested profile; every later stage works from the bitset + scores
+    fault_bits = fms_bitset.encode(full_data)
+    manual_scores = {test: data.get('score', 2) for test, data in full_data.items() if isinstance(data, dict)}
+    analysis = analyze_fms_bits(fault_bits, manual_scores, use_manual_scores=full_data.get('use_manual_scores', False))
+    fault_query, tag_weights = _search_inputs(fault_bits, full_data, analysis.get('target_level', 1))
+
+    return PipelineContext(
+        full_data=full_data,
+        fault_bits=fault_bits,
+        manual_scores=manual_scores,
+        analysis=analysis,
+        fault_query=fault_query,
+        tag_weights=tag_weights,
+    )
+
+
+def _batchable(full_data: Dict[str, Any]) -> bool:
+    # The vectorized path needs exactly the seven FMS tests, each with an integer score
+    tests = [test for test, data in full_data.items() if isinstance(data, dict)]
+    return tests == list(FMS_TESTS) and all(type(full_data[test].get('score', 2)) is int for test in tests)
+
+
+def build_pipeline_contexts(profiles: Sequence[Dict[str, Any]]) -> List[PipelineContext]:
+    """
+    build_pipeline_context for many profiles: scoring, traffic light and tag weights run as one
+    vectorized pass over the stacked bitsets. Profiles that are not complete seven-test
+    screenings go through build_pipeline_context one by one.
+    """
+    contexts: List[Any] = [None] * len(profiles)
+    batch = [i for i, full_data in enumerate(profiles) if _batchable(full_data)]
+    for i in set(range(len(profiles))) - set(batch):
+        contexts[i] = build_pipeline_context(profiles[i])
+    if not batch:
+        return contexts
+
+    batch_data = [profiles[i] for i in batch]
+    fault_bits = [fms_bitset.encode(full_data) for full_data in batch_data]
+    words = np.array([fms_bitset.to_words(bits) for bits in fault_bits], dtype=np.uint64)
+    manual_scores = [{test: full_data[test].get('score', 2) for test in FMS_TESTS} for full_data in batch_data]
+    analyses = analyze_fms_bits_many(
+        words,
+        [list(scores.values()) for scores in manual_scores],
+        [bool(full_data.get('use_manual_scores', False)) for full_data in batch_data],
+    )
+    fault_queries = FAULT_TAG_MATRIX.encode_bits_many(words, [_low_score_tests(full_data) for full_data in batch_data])
+    weights = FAULT_TAG_MATRIX.tag_weight_matrix(fault_queries)
+
+    for k, i in enumerate(batch):
+        contexts[i] = PipelineContext(
+            full_data=batch_data[k],
+            fault_bits=fault_bits[k],
+            manual_scores=manual_scores[k],
+            analysis=analyses[k],
+            fault_query=fault_queries[k],
+            tag_weights=search_tag_weights(weights[k], analyses[k].get('target_level', 1)),
+        )
+    return contexts
+
+
+def update_pipeline_context(context: PipelineContext, test_name: str, test_data: Dict[str, Any]) -> PipelineContext:
+    """
+    New context with one test's data replaced. Only that test's effective score is recomputed;
+    the other tests keep their cached scores and the traffic light is re-derived by table lookup.
+    """
+    full_data = {**context.full_data, test_name: test_data}
+    fault_bits = fms_bitset.replace_test(context.fault_bits, test_name, test_data)
+    manual_scores = {**context.manual_scores, test_name: test_data.get('score', 2)}
+
+    effective_scores = dict(context.effective_scores)
+    effective_scores[test_name] = effective_score_from_bits(
+        test_name, fault_bits, manual_scores[test_name], full_data.get('use_manual_scores', False)
+    )
+    analysis = analyze_effective_scores(effective_scores)
+    fault_query, tag_weights = _search_inputs(fault_bits, full_data, analysis.get('target_level', 1))
+
+    return PipelineContext(
+        full_data=full_data,
+        fault_bits=fault_bits,
+        manual_scores=manual_scores,
+        analysis=analysis,
+        fault_query=fault_query,
+        tag_weights=tag_weights,
+    )
@@ -0,0 +1,103 @@
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Sequence, Tuple, Union
+
+import numpy as np
+from scipy import sparse
+
+FIX_BOOST = 5
+
+
+class ExerciseIndex:
+    """
+    Read-only retrieval index built once per knowledge-base snapshot.
+    - by_level: exercise positions bucketed by difficulty_level (KB order preserved)
+    - postings: normalized (lowercased) tag -> frozenset of exercise positions
+    - tag_matrix: sparse exercise × tag incidence matrix built from the postings
+    """
+
+    def __init__(self, exercises: Sequence[Dict[str, Any]]):
+        self.exercises = tuple(exercises)
+
+        by_level: Dict[Any, List[int]] = {}
+        postings: Dict[str, set] = {}
+        for pos, ex in enumerate(self.exercises):
+            by_level.setdefault(ex.get('difficulty_level', 1), []).append(pos)
+            for tag in ex.get('tags', []):
+                postings.setdefault(str(tag).lower(), set()).add(pos)
+
+        self.by_level: Dict[Any, Tuple[int, ...]] = {lvl: tuple(p) for lvl, p in by_level.items()}
+        self.level_positions: Dict[Any, np.ndarray] = {lvl: np.asarray(p, dtype=np.intp) for lvl, p in by_level.items()}
+        self.postings: Dict[str, FrozenSet[int]] = {tag: frozenset(p) for tag, p in postings.items()}
+
+        self.tags: Tuple[str, ...] = tuple(sorted(self.postings))
+        self.tag_ids = {tag: i for i, tag in enumerate(self.tags)}
+        rows = [pos for tag in self.tags for pos in sorted(self.postings[tag])]
+        cols = [self.tag_ids[tag] for tag in self.tags for _ in self.postings[tag]]
+        self.tag_matrix = sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, cols)), shape=(len(self.exercises), len(self.tags)), dtype=np.float64
+        )
+        self.fix_mask = np.array(["fix_" in tag for tag in self.tags], dtype=bool)
+
+        self.level_codes = {lvl: code for code, lvl in enumerate(self.by_level)}
+        self.exercise_level_codes = np.full(len(self.exercises), -1, dtype=np.intp)
+        for lvl, positions in self.level_positions.items():
+            self.exercise_level_codes[positions] = self.level_codes[lvl]
+        self._column_cache: Dict[Tuple[str, ...], np.ndarray] = {}
+
+    def level_bucket(self, level) -> List[Dict[str, Any]]:
+        return [self.exercises[pos] for pos in self.by_level.get(level, ())]
+
+    def tag_vector(self, search_tags: Union[Mapping[str, float], Iterable[str]]) -> np.ndarray:
+        """Dense weight vector over this index's tag columns (unknown tags are dropped)."""
+        if not isinstance(search_tags, Mapping):
+            search_tags = dict.fromkeys(search_tags, 1.0)
+        vec = np.zeros(len(self.tags), dtype=np.float64)
+        for tag, weight in search_tags.items():
+            i = self.tag_ids.get(tag.lower())
+            if i is not None:
+                vec[i] = max(vec[i], weight)
+        return vec
+
+    def project(self, tags: Sequence[str], weights: np.ndarray) -> np.ndarray:
+        """Re-map a (profiles × tags) weight matrix onto this index's tag columns."""
+        weights = np.atleast_2d(weights)
+        cols = self._tag_columns(tuple(tags))
+        known = cols >= 0
+        out = np.zeros((weights.shape[0], len(self.tags)), dtype=np.float64)
+        out[:, cols[known]] = weights[:, known]
+        return out
+
+    def _tag_columns(self, tags: Tuple[str, ...]) -> np.ndarray:
+        cols = self._column_cache.get(tags)
+        if cols is None:
+            cols = np.array([self.tag_ids.get(tag.lower(), -1) for tag in tags], dtype=np.intp)
+            self._column_cache[tags] = cols
+        return cols
+
+    def score_all(self, tag_vectors: np.ndarray) -> np.ndarray:
+        """
+        (profiles × exercises) relevance: weighted matched-tag sum (T @ E.T), plus FIX_BOOST
+        when at least one matched tag is a fix_ tag.
+        """
+        tag_vectors = np.atleast_2d(tag_vectors)
+        scores = (self.tag_matrix @ tag_vectors.T).T
+        fix_hits = (self.tag_matrix @ np.where(self.fix_mask, tag_vectors, 0.0).T).T
+        return scores + FIX_BOOST * (fix_hits > 0)
+
+    def rank_many(self, levels: Sequence[Any], tag_vectors: np.ndarray, limit: int = 6) -> List[List[Dict[str, Any]]]:
+        """
+        Top `limit` exercises per profile, restricted to that profile's level,
+        highest score first with ties in KB order.
+        """
+        if len(levels) == 0:
+            return []
+        codes = np.array([self.level_codes.get(level, -1) for level in levels], dtype=np.intp)
+        in_level = self.exercise_level_codes[None, :] == codes[:, None]
+
+        scores = np.where(in_level, self.score_all(tag_vectors), -np.inf)
+        order = np.argsort(-scores, axis=1, kind='stable')[:, :limit]
+        counts = np.minimum(in_level.sum(axis=1), limit)
+        return [[self.exercises[pos] for pos in order[i, :counts[i]]] for i in range(len(levels))]
+
+    def rank(self, level, search_tags: Union[Mapping[str, float], Iterable[str]], limit: int = 6) -> List[Dict[str, Any]]:
+        """Top `limit` exercises at `level`, highest score first, ties in KB order."""
+        return self.rank_many([level], self.tag_vector(search_tags)[None, :], limit=limit)[0]
@@ -1,14 +1,28 @@
+import asyncio
+import functools
 import os
+import threading
 import uuid
-from typing import List, Dict, Any
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
+import httpx
+from typing import List, Dict, Any, NamedTuple, Optional, AsyncIterator, Tuple, TYPE_CHECKING
+from langchain_core.callbacks import BaseCallbackHandler
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
+from src.rag.llm_cache import llm_cache, LLMResponseCache, LLM_CACHE_SERVE_STALE
+from src.rag.stream_parser import ExerciseCardStreamParser
+from src.rag.reassessment import FULL, UNCHANGED, PlanDiff, diff_plan, format_fault_changes, merge_cards
+from src.metrics import LLM_CALLS, LLM_IN_FLIGHT, LLM_TOKENS
+
+if TYPE_CHECKING:
+    from src.pipeline import PipelineContext
 
 load_dotenv()
 
+MODEL_NAME = "llama-3.3-70b-versatile"
+LLM_HTTP_MAX_CONNECTIONS = int(os.environ.get("LLM_HTTP_MAX_CONNECTIONS", "20"))
+LLM_HTTP_TIMEOUT = float(os.environ.get("LLM_HTTP_TIMEOUT", "60"))
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "8"))  # in-flight LLM calls per worker
+
 # ── UI OUTPUT SCHEMA ──
 class ExerciseCard(BaseModel):
     name: str = Field(description="Exact exercise name from database")
@@ -24,163 +38,635 @@ class WorkoutSession(BaseModel):
     coach_summary: str = Field(description="2-4 sentence explanation of why these exercises were chosen.")
     exercises: List[ExerciseCard] = Field(default_factory=list, description="List of exercises")
 
+class PlanUpdate(BaseModel):
+    coach_summary: str = Field(description="2-4 sentence explanation of the whole updated session.")
+    exercises: List[ExerciseCard] = Field(default_factory=list, description="Only the new exercise cards")
+
+# ── PROMPT (built once, on first use; format instructions are static) ──
+# Indentation is part of the rendered prompt (and of LLM cache keys), so keep it as-is.
+SYSTEM_PROMPT = """
+        You are an expert FMS Strength Coach. Create a corrective workout plan.
+
+        ### ATHLETE DATA
+        - Status: {status}
+        - Target Level: {level}
+        - Key Faults: 
+        {faults_text}
+
+        ### AVAILABLE EXERCISES (STRICT CONSTRAINT)
+        Use ONLY exercises from this list. Do NOT invent new ones.
+        Prioritize ones that best match the specific faults shown above.
+        {exercise_list}
+
+        ### INSTRUCTIONS
+        1. Select 3 top most relevant exercises that address the key faults.
+        2. Create short, specific 'coach_tip' cues mentioning the actual fault.
+        3. Set difficulty_color: Red if severe faults, Yellow if moderate, Green if minor/cleared.
+        4. Return valid JSON matching the schema exactly.
+
+        {format_instructions}
+        """
+
+# Reassessment: rewrite only the cards affected by what changed since the last screen
+REASSESS_SYSTEM_PROMPT = """
+        You are an expert FMS Strength Coach updating an existing corrective workout plan after a re-screen.
+
+        ### ATHLETE DATA
+        - Status: {status}
+        - Target Level: {level}
+        - Key Faults: 
+        {faults_text}
+
+        ### CHANGES SINCE THE LAST SCREEN
+        {changes_text}
+
+        ### EXERCISES KEPT FROM THE PREVIOUS PLAN (do NOT repeat them)
+        {kept_list}
+
+        ### AVAILABLE EXERCISES (STRICT CONSTRAINT)
+        Use ONLY exercises from this list. Do NOT invent new ones.
+        {exercise_list}
+
+        ### INSTRUCTIONS
+        1. Write exactly {n_cards} new exercise card(s) that address the changed faults.
+        2. Create short, specific 'coach_tip' cues mentioning the actual fault.
+        3. Write a coach_summary for the whole updated session (kept + new exercises).
+        4. Return valid JSON matching the schema exactly.
+
+        {format_instructions}
+        """
+
+# langchain_core's prompt/parser stack (and langchain_groq) dominate this module's import time,
+# so templates and clients are built on first use (or by the warm-up step), not at import.
+class _Templates(NamedTuple):
+    prompt: Any
+    output_parser: Any
+    reassess_prompt: Any
+    reassess_parser: Any
+
+
+@functools.lru_cache(maxsize=None)
+def get_templates() -> _Templates:
+    from langchain_core.output_parsers import JsonOutputParser
+    from langchain_core.prompts import ChatPromptTemplate
+
+    output_parser = JsonOutputParser(pydantic_object=WorkoutSession)
+    reassess_parser = JsonOutputParser(pydantic_object=PlanUpdate)
+    return _Templates(
+        prompt=ChatPromptTemplate.from_template(
+            template=SYSTEM_PROMPT,
+            partial_variables={"format_instructions": output_parser.get_format_instructions()}
+        ),
+        output_parser=output_parser,
+        reassess_prompt=ChatPromptTemplate.from_template(
+            template=REASSESS_SYSTEM_PROMPT,
+            partial_variables={"format_instructions": reassess_parser.get_format_instructions()}
+        ),
+        reassess_parser=reassess_parser,
+    )
+
+
+_LAZY_TEMPLATES = {
+    "PROMPT": "prompt", "OUTPUT_PARSER": "output_parser",
+    "REASSESS_PROMPT": "reassess_prompt", "REASSESS_PARSER": "reassess_parser",
+}
+
+def __getattr__(name: str):
+    # Module-level names kept importable (e.g. `from src.rag.generator import PROMPT`)
+    if name in _LAZY_TEMPLATES:
+        return getattr(get_templates(), _LAZY_TEMPLATES[name])
+    if name == "FORMAT_INSTRUCTIONS":
+        return get_templates().output_parser.get_format_instructions()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# ── CHAIN REGISTRY (shared clients, keep-alive connections) ──
+class _HttpPoolStats:
+    """Counts requests vs. newly opened TCP connections via the httpcore trace extension."""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections_opened = 0
+
+    def _on_trace(self, event_name: str, info: Dict[str, Any]):
+        if event_name == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+
+    async def _on_trace_async(self, event_name: str, info: Dict[str, Any]):
+        self._on_trace(event_name, info)
+
+    def on_request(self, request: httpx.Request):
+        self.requests += 1
+        request.extensions["trace"] = self._on_trace
+
+    async def on_request_async(self, request: httpx.Request):
+        self.requests += 1
+        request.extensions["trace"] = self._on_trace_async
+
+    def snapshot(self) -> Dict[str, Any]:
+        reused = max(self.requests - self.connections_opened, 0)
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "connections_reused": reused,
+            "reuse_ratio": (reused / self.requests) if self.requests else 0.0,
+        }
+
+
+class _LLMUsageCallback(BaseCallbackHandler):
+    """Feeds token usage, call outcomes and in-flight calls of one model into src.metrics."""
+    run_inline = True   # plain counter updates: no need to hop to a thread executor
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        LLM_IN_FLIGHT.inc()
+
+    def on_llm_end(self, response, **kwargs):
+        LLM_IN_FLIGHT.dec()
+        LLM_CALLS.inc(1, self.model, "ok")
+        prompt_tokens = completion_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+        if not (prompt_tokens or completion_tokens):
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            prompt_tokens = usage.get("prompt_tokens", 0)
+            completion_tokens = usage.get("completion_tokens", 0)
+        LLM_TOKENS.inc(prompt_tokens, self.model, "prompt")
+        LLM_TOKENS.inc(completion_tokens, self.model, "completion")
+
+    def on_llm_error(self, error, **kwargs):
+        LLM_IN_FLIGHT.dec()
+        LLM_CALLS.inc(1, self.model, "error")
+
+
+class ChainRegistry:
+    """
+    Lazily builds and caches one `PROMPT | ChatGroq | parser` chain per (model, api key).
+    Each model gets its own sync + async httpx client so keep-alive connections are reused
+    across requests instead of paying a new TLS handshake per plan.
+    """
+
+    def __init__(self):
+        self._chains: Dict[Any, Any] = {}
+        self._pool_stats: Dict[str, _HttpPoolStats] = {}
+        self._lock = threading.Lock()
+
+    def get_chain(self, model: str, api_key: str):
+        """`PROMPT | llm | OUTPUT_PARSER` for one-shot generation."""
+        return self._get_entry(model, api_key)["chain"]
+
+    def get_stream_chain(self, model: str, api_key: str):
+        """`PROMPT | llm` yielding raw message chunks, for incremental parsing."""
+        return self._get_entry(model, api_key)["stream_chain"]
+
+    def get_reassess_chain(self, model: str, api_key: str):
+        """`REASSESS_PROMPT | llm | REASSESS_PARSER` for partial plan rewrites."""
+        return self._get_entry(model, api_key)["reassess_chain"]
+
+    def _get_entry(self, model: str, api_key: str) -> Dict[str, Any]:
+        key = (model, api_key)
+        entry = self._chains.get(key)
+        if entry is not None:
+            return entry
+        with self._lock:
+            entry = self._chains.get(key)
+            if entry is None:
+                entry = self._build_entry(model, api_key)
+                self._chains[key] = entry
+            return entry
+
+    def _build_entry(self, model: str, api_key: str) -> Dict[str, Any]:
+        from langchain_groq import ChatGroq
+
+        templates = get_templates()
+        stats = self._pool_stats.setdefault(model, _HttpPoolStats())
+        limits = httpx.Limits(max_connections=LLM_HTTP_MAX_CONNECTIONS, max_keepalive_connections=LLM_HTTP_MAX_CONNECTIONS)
+        llm = ChatGroq(
+            model_name=model,
+            temperature=0.0,
+            api_key=api_key,
+            model_kwargs={"seed": 42},
+            callbacks=[_LLMUsageCallback(model)],
+            http_client=httpx.Client(limits=limits, timeout=LLM_HTTP_TIMEOUT, event_hooks={"request": [stats.on_request]}),
+            http_async_client=httpx.AsyncClient(limits=limits, timeout=LLM_HTTP_TIMEOUT, event_hooks={"request": [stats.on_request_async]}),
+        )
+        print(f"🔌 Created LLM chain for {model}")
+        return {
+            "chain": templates.prompt | llm | templates.output_parser,
+            "stream_chain": templates.prompt | llm,
+            "reassess_chain": templates.reassess_prompt | llm | templates.reassess_parser,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "chains": len(self._chains),
+            "http": {model: stats.snapshot() for model, stats in self._pool_stats.items()},
+        }
+
+
+chain_registry = ChainRegistry()
+
 # ── HELPER: FORMAT FAULTS ──
 def format_faults_for_prompt(full_data: Dict[str, Any]) -> str:
     if not full_data:
         return "No specific faults data available."
 
-    fault_summary = []
-    
-    for test_name, test_data in full_data.items():
-        if not isinstance(test_data, dict):
+    flat_faults = [
+        (test_name, category, fault_name, severity)
+        for test_name, test_data in full_data.items() if isinstance(test_data, dict)
+        for category, details in test_data.items() if isinstance(details, dict)
+        for fault_name, severity in details.items()
+    ]
+    return format_fault_list(flat_faults)
+
+def format_fault_list(flat_faults) -> str:
+    """Same rendering as format_faults_for_prompt, from (test, category, fault, severity) tuples."""
+    grouped: Dict[str, List[str]] = {}
+    for test_name, _, fault_name, severity in flat_faults:
+        try:
+            score_val = int(severity)
+        except (ValueError, TypeError):
             continue
+        if score_val > 0:
+            clean_name = fault_name.replace('_', ' ').title()
+            interpretation = ""
+            if 'heels_lift' in fault_name: interpretation = "→ ankle restriction"
+            elif 'knee_valgus' in fault_name: interpretation = "→ glute weakness / activation needed"
+            elif 'forward_lean' in fault_name: interpretation = "→ core / thoracic control"
+            # Kept as requested (sub-input detail), but won't block generation
+            elif 'pain_reported' in fault_name: interpretation = "→ medical referral required"
+            grouped.setdefault(test_name, []).append(f"{clean_name} ({score_val}) {interpretation}")
 
-        test_faults = []
-        for category, details in test_data.items():
-            if isinstance(details, dict):
-                for fault_name, severity in details.items():
-                    try:
-                        score_val = int(severity)
-                        if score_val > 0:
-                            clean_name = fault_name.replace('_', ' ').title()
-                            interpretation = ""
-                            if 'heels_lift' in fault_name: interpretation = "→ ankle restriction"
-                            elif 'knee_valgus' in fault_name: interpretation = "→ glute weakness / activation needed"
-                            elif 'forward_lean' in fault_name: interpretation = "→ core / thoracic control"
-                            # Kept as requested (sub-input detail), but won't block generation
-                            elif 'pain_reported' in fault_name: interpretation = "→ medical referral required"
-                            test_faults.append(f"{clean_name} ({score_val}) {interpretation}")
-                    except (ValueError, TypeError):
-                        continue
-
-        if test_faults:
-            clean_test = test_name.replace('_', ' ').title()
-            fault_summary.append(f"**{clean_test}**: " + ", ".join(test_faults))
+    fault_summary = []
+    for test_name, test_faults in grouped.items():
+        clean_test = test_name.replace('_', ' ').title()
+        fault_summary.append(f"**{clean_test}**: " + ", ".join(test_faults))
 
     return "\n".join(fault_summary) if fault_summary else "No severe faults detected."
 
-# ── MAIN GENERATOR FUNCTION ──
-def generate_workout_plan(analysis_context: Dict[str, Any], exercises: List[Dict[str, Any]]):
-    call_id = str(uuid.uuid4())[:8]
-    print(f"--- GENERATE CALL START [{call_id}] | received {len(exercises)} items ---")
-
+# ── SHARED STEPS (sync + async paths) ──
+def _precheck(call_id: str, exercises: List[Dict[str, Any]]):
+    """Returns (api_key, early_response). early_response is set when no LLM call should be made."""
     api_key = os.environ.get("GROQ_API_KEY")
     if not api_key:
         print(f"❌ Error [{call_id}]: GROQ_API_KEY is missing.")
-        return {"session_title": "Config Error", "coach_summary": "System configuration error (API Key).", "exercises": []}
+        return None, {"session_title": "Config Error", "coach_summary": "System configuration error (API Key).", "exercises": []}
 
     # REMOVED: The strict "Medical Referral Required" return block.
     # The code now proceeds to generate a workout even if status was "STOP".
 
     if not exercises:
-        return {
+        return api_key, {
             "session_title": "Assessment Complete",
             "coach_summary": "No specific corrective exercises matched your profile. You may be cleared for general activity.",
             "difficulty_color": "Green",
             "exercises": []
         }
+    return api_key, None
 
-    try:
-        # ── ROBUST FILTERING & SORTING ───────────────────────────────────────
-        valid_exercises = []
-        for item in exercises:
-            if not isinstance(item, dict):
-                print(f"WARNING [{call_id}]: Skipping invalid item (not dict): {item}")
-                continue
-            name = item.get('exercise_name') or item.get('name') or "Unnamed Exercise"
-            valid_exercises.append(item)
-
-        if len(valid_exercises) != len(exercises):
-            print(f"WARNING [{call_id}]: Removed {len(exercises) - len(valid_exercises)} invalid items")
-
-        # Sort by exercise_name (case insensitive)
-        valid_exercises.sort(key=lambda x: (x.get('exercise_name') or "").lower())
-
-        # Prepare formatted list for prompt
-        formatted_exercises = []
-        for ex in valid_exercises:
-            name = ex.get('exercise_name', "Unknown Exercise")
-            level = ex.get('difficulty_level') or "?"
-            tags = ex.get('tags', [])
-            tag_str = ", ".join(tags) if isinstance(tags, list) else str(tags)
-            formatted_exercises.append(f"- **{name}** (Level {level})\n  Tags: {tag_str}")
-
-        exercise_text = "\n".join(formatted_exercises)
-
-        # Format faults
-        faults_text = format_faults_for_prompt(analysis_context.get('detailed_faults', {}))
-
-        # Setup LLM
-        llm = ChatGroq(
-            model_name="llama-3.3-70b-versatile",
-            temperature=0.0,
-            api_key=api_key,
-            model_kwargs={"seed": 42}
-        )
-        parser = JsonOutputParser(pydantic_object=WorkoutSession)
+def _select_valid_exercises(call_id: str, exercises: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # ── ROBUST FILTERING & SORTING ───────────────────────────────────────
+    valid_exercises = []
+    for item in exercises:
+        if not isinstance(item, dict):
+            print(f"WARNING [{call_id}]: Skipping invalid item (not dict): {item}")
+            continue
+        valid_exercises.append(item)
 
-        # Enhanced prompt
-        system_prompt = """
-        You are an expert FMS Strength Coach. Create a corrective workout plan.
+    if len(valid_exercises) != len(exercises):
+        print(f"WARNING [{call_id}]: Removed {len(exercises) - len(valid_exercises)} invalid items")
 
-        ### ATHLETE DATA
-        - Status: {status}
-        - Target Level: {level}
-        - Key Faults: 
-        {faults_text}
+    # Sort by exercise_name (case insensitive)
+    valid_exercises.sort(key=lambda x: (x.get('exercise_name') or "").lower())
+    return valid_exercises
 
-        ### AVAILABLE EXERCISES (STRICT CONSTRAINT)
-        Use ONLY exercises from this list. Do NOT invent new ones.
-        Prioritize ones that best match the specific faults shown above.
-        {exercise_list}
+def _build_prompt_inputs(analysis_context: Dict[str, Any], valid_exercises: List[Dict[str, Any]]) -> Dict[str, str]:
+    # Prepare formatted list for prompt
+    formatted_exercises = []
+    for ex in valid_exercises:
+        name = ex.get('exercise_name', "Unknown Exercise")
+        level = ex.get('difficulty_level') or "?"
+        tags = ex.get('tags', [])
+        tag_str = ", ".join(tags) if isinstance(tags, list) else str(tags)
+        formatted_exercises.append(f"- **{name}** (Level {level})\n  Tags: {tag_str}")
 
-        ### INSTRUCTIONS
-        1. Select 3 top most relevant exercises that address the key faults.
-        2. Create short, specific 'coach_tip' cues mentioning the actual fault.
-        3. Set difficulty_color: Red if severe faults, Yellow if moderate, Green if minor/cleared.
-        4. Return valid JSON matching the schema exactly.
+    exercise_text = "\n".join(formatted_exercises)
 
-        {format_instructions}
-        """
+    # Format faults
+    faults_text = format_faults_for_prompt(analysis_context.get('detailed_faults', {}))
 
-        prompt = ChatPromptTemplate.from_template(
-            template=system_prompt,
-            partial_variables={"format_instructions": parser.get_format_instructions()}
-        )
+    return {
+        # We pass the status, but the LLM will now generate a workout instead of hard-stopping
+        "status": analysis_context.get('status', 'TRAINING'),
+        "level": str(analysis_context.get('target_level', 1)),
+        "faults_text": faults_text,
+        "exercise_list": exercise_text
+    }
 
-        chain = prompt | llm | parser
+def _finalize_response(response: Dict[str, Any]) -> Dict[str, Any]:
+    # Fallback for missing fields
+    if 'difficulty_color' not in response:
+        response['difficulty_color'] = 'Yellow'
+    return response
 
-        # Invoke
-        response = chain.invoke({
-            # We pass the status, but the LLM will now generate a workout instead of hard-stopping
-            "status": analysis_context.get('status', 'TRAINING'),
-            "level": str(analysis_context.get('target_level', 1)),
-            "faults_text": faults_text,
-            "exercise_list": exercise_text
-        })
+def _fallback_plan(valid_exercises: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # Safe fallback
+    return {
+        "session_title": "Workout Generated (Fallback)",
+        "coach_summary": "AI coach encountered an issue. Here's a basic plan based on retrieved exercises.",
+        "difficulty_color": "Yellow",
+        "exercises": [
+            {
+                "name": ex.get('exercise_name', 'Exercise'),
+                "tag": "CORRECTIVE",
+                "sets_reps": "3 x 10",
+                "tempo": "Controlled",
+                "coach_tip": "Focus on perfect form."
+            }
+            for ex in valid_exercises[:3]
+        ]
+    }
 
-        # Fallback for missing fields
-        if 'difficulty_color' not in response:
-            response['difficulty_color'] = 'Yellow'
+def _interrupted_plan(cards: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # Stream cut off after some cards: keep exactly those (never cached)
+    return {
+        **_fallback_plan([]),
+        "coach_summary": "AI coach was interrupted. Here are the exercises it completed.",
+        "exercises": list(cards),
+    }
 
+# ── MAIN GENERATOR FUNCTION ──
+def generate_workout_plan(analysis_context: Dict[str, Any], exercises: List[Dict[str, Any]]):
+    call_id = str(uuid.uuid4())[:8]
+    print(f"--- GENERATE CALL START [{call_id}] | received {len(exercises)} items ---")
+
+    api_key, early_response = _precheck(call_id, exercises)
+    if early_response is not None:
+        return early_response
+
+    valid_exercises = []
+    cache_key = None
+    try:
+        valid_exercises = _select_valid_exercises(call_id, exercises)
+        prompt_inputs = _build_prompt_inputs(analysis_context, valid_exercises)
+
+        # Cache lookup (deterministic generation: same rendered prompt + model → same plan)
+        cache_key = LLMResponseCache.make_key(MODEL_NAME, get_templates().prompt.format(**prompt_inputs))
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            print(f"--- GENERATE CALL END [{call_id}] | cache hit ---")
+            return cached
+
+        # Invoke the shared prompt + LLM + parser chain (one pooled HTTP client per model)
+        chain = chain_registry.get_chain(MODEL_NAME, api_key)
+        response = _finalize_response(chain.invoke(prompt_inputs))
+
+        llm_cache.put(cache_key, MODEL_NAME, response)
         print(f"--- GENERATE CALL END [{call_id}] | success ---")
         return response
 
     except Exception as e:
         print(f"❌ GENERATION ERROR [{call_id}]: {str(e)}")
-        # Safe fallback
-        return {
-            "session_title": "Workout Generated (Fallback)",
-            "coach_summary": "AI coach encountered an issue. Here's a basic plan based on retrieved exercises.",
-            "difficulty_color": "Yellow",
-            "exercises": [
-                {
-                    "name": ex.get('exercise_name', 'Exercise'),
-                    "tag": "CORRECTIVE",
-                    "sets_reps": "3 x 10",
-                    "tempo": "Controlled",
-                    "coach_tip": "Focus on perfect form."
-                }
-                for ex in valid_exercises[:3]
-            ]
-        }
\ No newline at end of file
+        # Prefer a previously generated plan for the exact same prompt, even if expired
+        if cache_key and LLM_CACHE_SERVE_STALE:
+            stale = llm_cache.get(cache_key, allow_stale=True)
+            if stale is not None:
+                print(f"--- GENERATE CALL END [{call_id}] | served cached plan after provider error ---")
+                return stale
+        return _fallback_plan(valid_exercises)
+
+# ── LLM CONCURRENCY LIMIT (one per event loop) ──
+# Created at startup by the API lifespan and worker.py. asyncio primitives belong to the loop
+# they are used on, so a call from any other loop (scripts, tests) gets a limit of its own.
+_llm_limiter: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+
+def init_llm_limiter(limit: Optional[int] = None) -> asyncio.Semaphore:
+    """Create the running loop's limit on in-flight LLM calls (default LLM_MAX_CONCURRENCY). Call from inside the loop at startup."""
+    global _llm_limiter
+    semaphore = asyncio.Semaphore(max(1, LLM_MAX_CONCURRENCY if limit is None else limit))
+    _llm_limiter = (asyncio.get_running_loop(), semaphore)
+    return semaphore
+
+def _get_llm_semaphore() -> asyncio.Semaphore:
+    limiter = _llm_limiter
+    if limiter is None or limiter[0] is not asyncio.get_running_loop():
+        return init_llm_limiter()
+    return limiter[1]
+
+# ── ASYNC GENERATOR (does not block the event loop) ──
+
+async def agenerate_workout_plan(
+    analysis_context: Dict[str, Any],
+    exercises: List[Dict[str, Any]],
+    fallback: bool = True
+):
+    """
+    Async twin of generate_workout_plan: same prompt, cache and fallbacks, but uses `ainvoke`.
+    With fallback=False (queued jobs, which retry) a failed generation raises instead of
+    returning the basic fallback plan; a cached plan for the same prompt is still served.
+    """
+    call_id = str(uuid.uuid4())[:8]
+    print(f"--- AGENERATE CALL START [{call_id}] | received {len(exercises)} items ---")
+
+    api_key, early_response = _precheck(call_id, exercises)
+    if not fallback and api_key is None:
+        raise RuntimeError("GROQ_API_KEY is missing.")
+    if early_response is not None:
+        return early_response
+
+    valid_exercises = []
+    cache_key = None
+    try:
+        valid_exercises = _select_valid_exercises(call_id, exercises)
+        prompt_inputs = _build_prompt_inputs(analysis_context, valid_exercises)
+
+        cache_key = LLMResponseCache.make_key(MODEL_NAME, get_templates().prompt.format(**prompt_inputs))
+        cached = await asyncio.to_thread(llm_cache.get, cache_key)
+        if cached is not None:
+            print(f"--- AGENERATE CALL END [{call_id}] | cache hit ---")
+            return cached
+
+        chain = chain_registry.get_chain(MODEL_NAME, api_key)
+        async with _get_llm_semaphore():
+            response = _finalize_response(await chain.ainvoke(prompt_inputs))
+
+        await asyncio.to_thread(llm_cache.put, cache_key, MODEL_NAME, response)
+        print(f"--- AGENERATE CALL END [{call_id}] | success ---")
+        return response
+
+    except Exception as e:
+        print(f"❌ GENERATION ERROR [{call_id}]: {str(e)}")
+        if cache_key and LLM_CACHE_SERVE_STALE:
+            stale = await asyncio.to_thread(llm_cache.get, cache_key, True)
+            if stale is not None:
+                print(f"--- AGENERATE CALL END [{call_id}] | served cached plan after provider error ---")
+                return stale
+        if not fallback:
+            raise
+        return _fallback_plan(valid_exercises)
+
+# ── STREAMING GENERATOR (cards as soon as they are complete) ──
+_STREAM_END = object()
+
+async def _read_llm_stream(stream_chain, prompt_inputs: Dict[str, Any], texts: asyncio.Queue):
+    """
+    Reads the provider stream into `texts`, then puts _STREAM_END (or the exception it failed with).
+    Only this task holds the LLM semaphore, so a slow SSE client never keeps a slot busy.
+    """
+    try:
+        async with _get_llm_semaphore():
+            async for chunk in stream_chain.astream(prompt_inputs):
+                texts.put_nowait(chunk.content if isinstance(chunk.content, str) else "")
+    except Exception as e:
+        texts.put_nowait(e)
+    else:
+        texts.put_nowait(_STREAM_END)
+
+async def astream_workout_plan(
+    analysis_context: Dict[str, Any], exercises: List[Dict[str, Any]]
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Yields ("card", ExerciseCard dict) for each exercise the moment its JSON object closes
+    in the LLM stream, then exactly one ("plan", WorkoutSession dict) with the full result.
+    Uses the same prompt, cache and fallbacks as agenerate_workout_plan, except when the LLM
+    fails after cards were already sent: the plan is then built from those cards.
+    """
+    call_id = str(uuid.uuid4())[:8]
+    print(f"--- STREAM GENERATE CALL START [{call_id}] | received {len(exercises)} items ---")
+
+    api_key, early_response = _precheck(call_id, exercises)
+    if early_response is not None:
+        yield "plan", early_response
+        return
+
+    valid_exercises = []
+    emitted: List[Dict[str, Any]] = []
+    cache_key = None
+    try:
+        valid_exercises = _select_valid_exercises(call_id, exercises)
+        prompt_inputs = _build_prompt_inputs(analysis_context, valid_exercises)
+
+        cache_key = LLMResponseCache.make_key(MODEL_NAME, get_templates().prompt.format(**prompt_inputs))
+        cached = await asyncio.to_thread(llm_cache.get, cache_key)
+        if cached is not None:
+            print(f"--- STREAM GENERATE CALL END [{call_id}] | cache hit ---")
+            for card in cached.get('exercises', []):
+                yield "card", card
+            yield "plan", cached
+            return
+
+        stream_chain = chain_registry.get_stream_chain(MODEL_NAME, api_key)
+        card_parser = ExerciseCardStreamParser()
+        chunks = []
+        texts: asyncio.Queue = asyncio.Queue()
+        reader = asyncio.create_task(_read_llm_stream(stream_chain, prompt_inputs, texts))
+        try:
+            while True:
+                text = await texts.get()
+                if text is _STREAM_END:
+                    break
+                if isinstance(text, Exception):
+                    raise text
+                chunks.append(text)
+                for card in card_parser.feed(text):
+                    emitted.append(card)
+                    yield "card", card
+        finally:
+            # Client gone or provider failed: stop reading (and free the LLM slot) right away
+            reader.cancel()
+
+        response = _finalize_response(get_templates().output_parser.parse("".join(chunks)))
+        await asyncio.to_thread(llm_cache.put, cache_key, MODEL_NAME, response)
+        print(f"--- STREAM GENERATE CALL END [{call_id}] | success ---")
+        yield "plan", response
+
+    except Exception as e:
+        print(f"❌ GENERATION ERROR [{call_id}]: {str(e)}")
+        if emitted:
+            # The client already shows these cards; a stale or fallback plan would contradict them
+            print(f"--- STREAM GENERATE CALL END [{call_id}] | plan from {len(emitted)} cards sent before the error ---")
+            yield "plan", _interrupted_plan(emitted)
+            return
+        if cache_key and LLM_CACHE_SERVE_STALE:
+            stale = await asyncio.to_thread(llm_cache.get, cache_key, True)
+            if stale is not None:
+                print(f"--- STREAM GENERATE CALL END [{call_id}] | served cached plan after provider error ---")
+                yield "plan", stale
+                return
+        yield "plan", _fallback_plan(valid_exercises)
+
+# ── REASSESSMENT (rewrite only the cards whose faults changed) ──
+async def areassess_workout_plan(
+    previous_plan: Dict[str, Any],
+    previous_context: "PipelineContext",
+    context: "PipelineContext",
+    exercises: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Update a stored plan after a re-screen. Cards whose exercise is still retrieved and whose
+    tags are untouched by the fault changes are kept verbatim; only the others are sent to the
+    LLM for rewriting. Falls back to a full agenerate_workout_plan when the target level moved.
+    The result carries a `reassessment` block describing what was kept and rewritten.
+    """
+    call_id = str(uuid.uuid4())[:8]
+    diff = diff_plan(previous_plan, previous_context, context, exercises)
+    print(f"--- REASSESS CALL START [{call_id}] | mode={diff.mode} | rewrite {len(diff.affected)}/{len(diff.previous_cards)} cards ---")
+
+    if diff.mode == FULL:
+        plan = await agenerate_workout_plan(context.analysis, exercises)
+    elif diff.mode == UNCHANGED:
+        plan = dict(previous_plan)
+    else:
+        plan = await _arewrite_cards(call_id, previous_plan, diff, context)
+
+    plan = dict(plan)
+    plan["reassessment"] = diff.summary()
+    print(f"--- REASSESS CALL END [{call_id}] ---")
+    return plan
+
+async def _arewrite_cards(call_id: str, previous_plan: Dict[str, Any], diff: PlanDiff, context: "PipelineContext") -> Dict[str, Any]:
+    api_key, early_response = _precheck(call_id, diff.available_exercises)
+    if early_response is not None:
+        return early_response
+
+    valid_exercises = []
+    cache_key = None
+    try:
+        valid_exercises = _select_valid_exercises(call_id, diff.available_exercises)
+        base_inputs = _build_prompt_inputs(context.analysis, valid_exercises)
+        prompt_inputs = {
+            **base_inputs,
+            "changes_text": format_fault_changes(diff),
+            "kept_list": "\n".join(f"- {diff.previous_cards[i].get('name', '')}" for i in diff.kept),
+            "n_cards": str(len(diff.affected)),
+        }
+
+        cache_key = LLMResponseCache.make_key(MODEL_NAME, get_templates().reassess_prompt.format(**prompt_inputs))
+        update = await asyncio.to_thread(llm_cache.get, cache_key)
+        if update is None:
+            chain = chain_registry.get_reassess_chain(MODEL_NAME, api_key)
+            async with _get_llm_semaphore():
+                update = await chain.ainvoke(prompt_inputs)
+            await asyncio.to_thread(llm_cache.put, cache_key, MODEL_NAME, update)
+        else:
+            print(f"--- REASSESS [{call_id}] | cache hit ---")
+
+        plan = dict(previous_plan)
+        plan["exercises"] = merge_cards(diff, [c for c in update.get("exercises", []) if isinstance(c, dict)])
+        if update.get("coach_summary"):
+            plan["coach_summary"] = update["coach_summary"]
+        return _finalize_response(plan)
+
+    except Exception as e:
+        print(f"❌ REASSESS ERROR [{call_id}]: {str(e)}")
+        if cache_key and LLM_CACHE_SERVE_STALE:
+            stale = await asyncio.to_thread(llm_cache.get, cache_key, True)
+            if stale is not None:
+                return {**previous_plan, "exercises": merge_cards(diff, stale.get("exercises", []))}
+        # Keep what is still valid, fill the rest with basic cards
+        fallback_cards = _fallback_plan(valid_exercises)["exercises"]
+        return {**previous_plan, "exercises": merge_cards(diff, fallback_cards)}
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional, Tuple
+
+from src.rag.exercise_index import ExerciseIndex
+
+# --- CONFIGURATION ---
+JSON_KB_PATH = 'data/processed/exercise_knowledge_base.json'
+
+# How often (seconds) a request is allowed to stat() the KB file for changes.
+KB_RELOAD_CHECK_SECONDS = float(os.environ.get("KB_RELOAD_CHECK_SECONDS", "1.0"))
+
+
+@dataclass(frozen=True)
+class KnowledgeBaseSnapshot:
+    """Immutable view of the exercise knowledge base as loaded from disk."""
+    exercises: Tuple[Dict[str, Any], ...]
+    version: str          # short content hash, changes only when the file content changes
+    content_hash: str     # full sha256 of the raw file bytes
+    mtime_ns: int
+    size: int
+    loaded_at: float
+    index: ExerciseIndex  # level buckets + tag postings, built at load time
+
+    def __len__(self):
+        return len(self.exercises)
+
+
+EMPTY_SNAPSHOT = KnowledgeBaseSnapshot(
+    exercises=(), version="empty", content_hash="", mtime_ns=0, size=0, loaded_at=0.0,
+    index=ExerciseIndex(()),
+)
+
+
+class KnowledgeBaseStore:
+    """
+    Process-wide holder of the exercise knowledge base.
+    Loads once, then reloads only when the file's mtime/size change AND its content hash differs.
+    The new snapshot is fully built before it replaces the old one, so readers never see a partial KB.
+    """
+
+    def __init__(self, path: str = JSON_KB_PATH, check_interval: float = KB_RELOAD_CHECK_SECONDS):
+        self.path = path
+        self.check_interval = check_interval
+        self._snapshot: Optional[KnowledgeBaseSnapshot] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> str:
+        return self.get().version
+
+    def get(self) -> KnowledgeBaseSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._last_check < self.check_interval:
+            return snapshot
+        return self.reload()
+
+    def reload(self, force: bool = False) -> KnowledgeBaseSnapshot:
+        with self._lock:
+            self._last_check = time.monotonic()
+            current = self._snapshot
+
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                print(f"❌ ERROR: JSON file not found at {self.path}")
+                return current or EMPTY_SNAPSHOT
+
+            if (not force and current is not None
+                    and stat.st_mtime_ns == current.mtime_ns and stat.st_size == current.size):
+                return current
+
+            try:
+                with open(self.path, 'rb') as f:
+                    raw = f.read()
+            except OSError as e:
+                print(f"❌ ERROR reading JSON: {e}")
+                return current or EMPTY_SNAPSHOT
+
+            content_hash = hashlib.sha256(raw).hexdigest()
+            if not force and current is not None and content_hash == current.content_hash:
+                # File touched but content unchanged: keep the same snapshot/version.
+                self._snapshot = replace(current, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                return self._snapshot
+
+            try:
+                data = json.loads(raw.decode('utf-8'))
+            except (ValueError, UnicodeDecodeError) as e:
+                print(f"❌ ERROR reading JSON: {e}")
+                return current or EMPTY_SNAPSHOT
+
+            if not isinstance(data, list):
+                print(f"❌ ERROR: Expected a list of exercises in {self.path}")
+                return current or EMPTY_SNAPSHOT
+
+            exercises = tuple(data)
+            snapshot = KnowledgeBaseSnapshot(
+                exercises=exercises,
+                version=content_hash[:12],
+                content_hash=content_hash,
+                mtime_ns=stat.st_mtime_ns,
+                size=stat.st_size,
+                loaded_at=time.time(),
+                index=ExerciseIndex(exercises),
+            )
+            self._snapshot = snapshot
+            print(f"✅ SUCCESS: Loaded {len(snapshot)} exercises from JSON (kb_version={snapshot.version}).")
+            return snapshot
+
+
+# Shared by all requests in this process.
+kb_store = KnowledgeBaseStore()
+
+
+def get_knowledge_base() -> KnowledgeBaseSnapshot:
+    return kb_store.get()
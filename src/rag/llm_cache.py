@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# --- CONFIGURATION ---
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", "data/cache/llm_cache.sqlite3")
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_TTL_SECONDS = float(os.environ.get("LLM_CACHE_TTL_SECONDS", "0"))  # 0 = never expires
+LLM_CACHE_SERVE_STALE = os.environ.get("LLM_CACHE_SERVE_STALE", "1") == "1"
+
+
+class LLMResponseCache:
+    """
+    Disk-backed (SQLite) cache of parsed LLM responses keyed by sha256(model + rendered prompt).
+    Generation runs with temperature=0 and a fixed seed, so the same prompt yields the same plan.
+    Bounded to `max_entries` with least-recently-used eviction and an optional TTL.
+    """
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+        enabled: bool = LLM_CACHE_ENABLED,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.stale_served = 0
+        self.writes = 0
+        self.evictions = 0
+        self.errors = 0
+
+    @staticmethod
+    def make_key(model: str, rendered_prompt: str) -> str:
+        return hashlib.sha256(f"{model}\n{rendered_prompt}".encode("utf-8")).hexdigest()
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        # caller holds self._lock
+        if self._conn is None and self.enabled:
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                conn = sqlite3.connect(self.path, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    " key TEXT PRIMARY KEY, model TEXT NOT NULL, response TEXT NOT NULL,"
+                    " created_at REAL NOT NULL, last_access REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_last_access ON llm_cache (last_access)")
+                conn.commit()
+                self._conn = conn
+            except sqlite3.Error as e:
+                print(f"❌ LLM cache disabled (cannot open {self.path}): {e}")
+                self.errors += 1
+                self.enabled = False
+        return self._conn
+
+    def get(self, key: str, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
+        """Cached response for `key`, or None. Expired entries are only returned when allow_stale=True."""
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    if not allow_stale:
+                        self.misses += 1
+                    return None
+
+                now = time.time()
+                is_expired = self.ttl_seconds > 0 and now - row[1] > self.ttl_seconds
+                if is_expired and not allow_stale:
+                    self.expired += 1
+                    self.misses += 1
+                    return None
+
+                conn.execute(
+                    "UPDATE llm_cache SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key)
+                )
+                conn.commit()
+                if allow_stale:
+                    self.stale_served += 1
+                else:
+                    self.hits += 1
+                return json.loads(row[0])
+            except (sqlite3.Error, ValueError) as e:
+                print(f"❌ LLM cache read error: {e}")
+                self.errors += 1
+                return None
+
+    def put(self, key: str, model: str, response: Dict[str, Any]):
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return
+            try:
+                now = time.time()
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, model, response, created_at, last_access, hits)"
+                    " VALUES (?, ?, ?, ?, ?, 0)",
+                    (key, model, json.dumps(response), now, now),
+                )
+                self.writes += 1
+
+                overflow = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_entries
+                if overflow > 0:
+                    conn.execute(
+                        "DELETE FROM llm_cache WHERE key IN"
+                        " (SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                        (overflow,),
+                    )
+                    self.evictions += overflow
+                conn.commit()
+            except (sqlite3.Error, TypeError, ValueError) as e:
+                print(f"❌ LLM cache write error: {e}")
+                self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = 0
+            if self._conn is not None:
+                try:
+                    entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+                except sqlite3.Error:
+                    pass
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "stale_served": self.stale_served,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "errors": self.errors,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+llm_cache = LLMResponseCache()
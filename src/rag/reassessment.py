@@ -0,0 +1,127 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Set, Tuple, TYPE_CHECKING
+
+from src.logic import fms_bitset
+
+if TYPE_CHECKING:
+    from src.pipeline import PipelineContext
+
+# full      → target level moved or nothing worth keeping: write a new plan from scratch
+# partial   → rewrite only the affected ExerciseCards, keep the rest verbatim
+# unchanged → no card is affected: return the previous plan as-is (no LLM call)
+FULL, PARTIAL, UNCHANGED = "full", "partial", "unchanged"
+
+
+@dataclass
+class PlanDiff:
+    mode: str
+    previous_cards: List[Dict[str, Any]]
+    affected: List[int] = field(default_factory=list)           # card positions to rewrite
+    reasons: Dict[int, str] = field(default_factory=dict)
+    added_faults: Tuple[Tuple[str, str, str], ...] = ()
+    removed_faults: Tuple[Tuple[str, str, str], ...] = ()
+    changed_tags: Set[str] = field(default_factory=set)
+    available_exercises: List[Dict[str, Any]] = field(default_factory=list)  # retrieved, minus kept cards
+
+    @property
+    def kept(self) -> List[int]:
+        return [i for i in range(len(self.previous_cards)) if i not in self.reasons]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "rewritten": list(self.affected),
+            "kept": self.kept,
+            "reasons": {str(i): r for i, r in self.reasons.items()},
+            "added_faults": [".".join(k) for k in self.added_faults],
+            "removed_faults": [".".join(k) for k in self.removed_faults],
+        }
+
+
+def _name_key(name: Any) -> str:
+    return str(name or "").strip().lower()
+
+
+def diff_plan(
+    previous_plan: Dict[str, Any],
+    previous_context: "PipelineContext",
+    context: "PipelineContext",
+    exercises: List[Dict[str, Any]],
+) -> PlanDiff:
+    """
+    Decide which cards of the previous plan survive a re-screen.
+    A card is kept when its exercise is still retrieved for the new profile, none of that
+    exercise's tags belong to a fault (or pattern) whose state changed since the last screen,
+    and its cue does not mention a fault that has since resolved.
+    """
+    cards = [c for c in (previous_plan or {}).get("exercises", []) if isinstance(c, dict)]
+    changed_bits = previous_context.fault_bits ^ context.fault_bits
+    added = tuple(fms_bitset.iter_active_faults(changed_bits & context.fault_bits))
+    removed = tuple(fms_bitset.iter_active_faults(changed_bits & previous_context.fault_bits))
+    new_tags = set(context.tag_weights) - set(previous_context.tag_weights)
+    changed_tags = new_tags | (set(previous_context.tag_weights) - set(context.tag_weights))
+
+    diff = PlanDiff(
+        mode=PARTIAL, previous_cards=cards, added_faults=added, removed_faults=removed, changed_tags=changed_tags
+    )
+    if not cards or previous_context.target_level != context.target_level:
+        diff.mode = FULL
+        diff.reasons = {i: "target level changed" for i in range(len(cards))}
+        diff.affected = sorted(diff.reasons)
+        return diff
+
+    retrieved = {_name_key(ex.get("exercise_name")): ex for ex in exercises if isinstance(ex, dict)}
+    rank = {name: pos for pos, name in enumerate(retrieved)}
+    resolved_phrases = [fault.replace("_", " ") for _, _, fault in removed]
+    for i, card in enumerate(cards):
+        ex = retrieved.get(_name_key(card.get("name")))
+        if ex is None:
+            diff.reasons[i] = "no longer retrieved for the new profile"
+            continue
+        hit = sorted({str(t).lower() for t in ex.get("tags", [])} & changed_tags)
+        if hit:
+            diff.reasons[i] = "addresses changed fault tag(s): " + ", ".join(hit)
+            continue
+        text = f"{card.get('tag', '')} {card.get('coach_tip', '')}".lower()
+        stale = [phrase for phrase in resolved_phrases if phrase in text]
+        if stale:
+            diff.reasons[i] = "cues a resolved fault: " + ", ".join(stale)
+
+    # New faults that no remaining card covers: free the least relevant card for them
+    if added and not diff.reasons:
+        covered = {str(t).lower() for i in range(len(cards)) for t in retrieved[_name_key(cards[i].get("name"))].get("tags", [])}
+        if new_tags - covered:
+            weakest = max(range(len(cards)), key=lambda i: rank[_name_key(cards[i].get("name"))])
+            diff.reasons[weakest] = "replaced to address new fault(s)"
+    diff.affected = sorted(diff.reasons)
+
+    kept_names = {_name_key(cards[i].get("name")) for i in diff.kept}
+    diff.available_exercises = [
+        ex for ex in exercises if isinstance(ex, dict) and _name_key(ex.get("exercise_name")) not in kept_names
+    ]
+    if not diff.affected:
+        diff.mode = UNCHANGED
+    elif not diff.kept or not diff.available_exercises:
+        diff.mode = FULL
+    return diff
+
+
+def format_fault_changes(diff: PlanDiff) -> str:
+    lines = []
+    for label, keys in (("New", diff.added_faults), ("Resolved", diff.removed_faults)):
+        for test, _, fault in keys:
+            lines.append(f"- {label}: {test.replace('_', ' ').title()} → {fault.replace('_', ' ').title()}")
+    return "\n".join(lines) if lines else "- No sub-fault changes (retrieved exercises changed)."
+
+
+def merge_cards(diff: PlanDiff, new_cards: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Previous cards with the affected positions filled, in order, from `new_cards` (unfilled slots are dropped)."""
+    replacements = iter(new_cards)
+    merged = []
+    for i, card in enumerate(diff.previous_cards):
+        if i in diff.reasons:
+            card = next(replacements, None)
+            if card is None:
+                continue
+        merged.append(card)
+    return merged
@@ -1,11 +1,19 @@
-import json
 import os
+import threading
 import uuid
-from typing import Dict, Any, List, Optional
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple, TYPE_CHECKING
 from src.logic.fms_analyzer import analyze_fms_profile
+from src.rag.knowledge_base import JSON_KB_PATH, get_knowledge_base
+from src.rag.tag_matrix import FaultTagMatrix
+
+if TYPE_CHECKING:
+    from src.pipeline import PipelineContext
 
 # --- CONFIGURATION ---
-JSON_KB_PATH = 'data/processed/exercise_knowledge_base.json'
+TOP_K_EXERCISES = 6  # increased to 6 for better selection pool
+RETRIEVAL_CACHE_SIZE = int(os.environ.get("RETRIEVAL_CACHE_SIZE", "1024"))
 
 FAULT_TO_TAG_MAP = {
     "heels_lift": "fix_heels_lift",
@@ -59,32 +67,138 @@ FAULT_TO_TAG_MAP = {
     "right_side_deficit": "fix_asymmetry"
 }
 
+# Tag added when a test's entered score is <= 2
+PATTERN_TAG_MAP = {
+    "overhead_squat": "pattern_squat",
+    "hurdle_step": "pattern_step",
+    "inline_lunge": "pattern_lunge",
+    "shoulder_mobility": "pattern_shoulder",
+    "active_straight_leg_raise": "pattern_leg_raise",
+    "trunk_stability_pushup": "pattern_pushup",
+    "rotary_stability": "pattern_rotary",
+}
+
+# Per-test relevance weight applied to every tag a test's faults activate (1.0 = unweighted)
+TEST_TAG_WEIGHTS = {
+    "overhead_squat": 1.0,
+    "hurdle_step": 1.0,
+    "inline_lunge": 1.0,
+    "shoulder_mobility": 1.0,
+    "active_straight_leg_raise": 1.0,
+    "trunk_stability_pushup": 1.0,
+    "rotary_stability": 1.0,
+}
+
+# Namespaced exceptions to FAULT_TO_TAG_MAP: (test, category, fault) -> (tag, weight)
+# e.g. ("hurdle_step", "stance_leg", "knee_valgus"): ("fix_knee_valgus", 0.5)
+FAULT_TAG_OVERRIDES = {}
+
+# Compiled once at import; shared by every retrieval call.
+FAULT_TAG_MATRIX = FaultTagMatrix(
+    FAULT_TO_TAG_MAP,
+    PATTERN_TAG_MAP,
+    test_weights=TEST_TAG_WEIGHTS,
+    overrides=FAULT_TAG_OVERRIDES,
+)
+
+# --- RETRIEVAL CACHE ---
+class RetrievalCache:
+    """
+    Bounded LRU of ranked exercises keyed by (kb_version, target_level, canonical search tags).
+    The whole cache is dropped the first time a key for a new KB version is seen.
+    """
+
+    def __init__(self, maxsize: int = RETRIEVAL_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Tuple, Tuple[Dict[str, Any], ...]]" = OrderedDict()
+        self._kb_version: Optional[str] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(kb_version: str, target_level: int, tag_weights: Dict[str, float]) -> Tuple:
+        return (kb_version, target_level, tuple(sorted(tag_weights.items())))
+
+    def _sync_version(self, kb_version: str):
+        if kb_version != self._kb_version:
+            if self._data:
+                self.invalidations += 1
+            self._data.clear()
+            self._kb_version = kb_version
+
+    def get(self, key: Tuple) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            self._sync_version(key[0])
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return list(value)
+
+    def put(self, key: Tuple, exercises: List[Dict[str, Any]]):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._sync_version(key[0])
+            self._data[key] = tuple(exercises)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+                "kb_version": self._kb_version,
+            }
+
+
+retrieval_cache = RetrievalCache()
+
+def search_tag_weights(weights_row: np.ndarray, target_level) -> Dict[str, float]:
+    """Non-zero tag weights for one profile plus its level tag."""
+    tag_weights = {FAULT_TAG_MATRIX.tags[i]: float(weights_row[i]) for i in np.flatnonzero(weights_row)}
+    level_tag = f"level_{target_level}"
+    tag_weights[level_tag] = max(tag_weights.get(level_tag, 0.0), 1.0)
+    return tag_weights
+
 def fetch_exercises_from_json():
-    """Fetch all exercises from the local JSON Knowledge Base"""
-    print(f"--- DEBUG: Loading exercises from {JSON_KB_PATH}... ---")
-    
-    if not os.path.exists(JSON_KB_PATH):
-        print(f"❌ ERROR: JSON file not found at {JSON_KB_PATH}")
-        return []
-        
-    try:
-        with open(JSON_KB_PATH, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            print(f"✅ SUCCESS: Loaded {len(data)} exercises from JSON.")
-            return data
-    except Exception as e:
-        print(f"❌ ERROR reading JSON: {e}")
-        return []
+    """Fetch all exercises from the shared, hot-reloaded JSON Knowledge Base"""
+    return list(get_knowledge_base().exercises)
 
 async def get_exercises_by_profile(
     simple_scores: Dict[str, int],
-    detailed_faults: Optional[Dict[str, Any]] = None
+    detailed_faults: Optional[Dict[str, Any]] = None,
+    context: Optional["PipelineContext"] = None
 ) -> Dict[str, Any]:
+    """
+    Pass `context` (see src.pipeline) to reuse the request's analysis and derived tags;
+    otherwise the profile is analyzed and encoded here.
+    """
     call_id = str(uuid.uuid4())[:8]
     print(f"--- RETRIEVAL CALL START [{call_id}] ---")
 
     # 1. Analyze
-    if detailed_faults:
+    if context is not None:
+        analysis = context.analysis
+    elif detailed_faults:
         analysis = analyze_fms_profile(detailed_faults, use_manual_scores=detailed_faults.get('use_manual_scores', False))
     else:
         analysis = analyze_fms_profile(simple_scores)
@@ -92,73 +206,38 @@ async def get_exercises_by_profile(
     target_level = analysis.get('target_level', 1)
     print(f"--- DEBUG [{call_id}]: Target Level is {target_level} ---")
 
-    # 2. Load Data
-    kb = fetch_exercises_from_json()
+    # 2. Load Data (shared snapshot, re-read only when the file changes)
+    snapshot = get_knowledge_base()
+    kb = snapshot.exercises
     
     if not kb:
         print(f"--- RETRIEVAL CALL END [{call_id}] | ERROR: No data ---")
-        return {"status": "ERROR_NO_DATA", "analysis": analysis, "data": []}
-
-    # 3. Build Search Tags
-    search_tags = set()
-    search_tags.add(f"level_{target_level}")
-
-    if detailed_faults:
-        for test, data in detailed_faults.items():
-            if test == 'use_manual_scores': continue
-            if not isinstance(data, dict): continue
-            
-            # Add pattern tags for low scores in each major test
-            if test == 'overhead_squat' and data.get('score', 3) <= 2:
-                search_tags.add("pattern_squat")
-            elif test == 'hurdle_step' and data.get('score', 3) <= 2:
-                search_tags.add("pattern_step")
-            elif test == 'inline_lunge' and data.get('score', 3) <= 2:
-                search_tags.add("pattern_lunge")
-            elif test == 'shoulder_mobility' and data.get('score', 3) <= 2:
-                search_tags.add("pattern_shoulder")
-            elif test == 'active_straight_leg_raise' and data.get('score', 3) <= 2:
-                search_tags.add("pattern_leg_raise")
-            elif test == 'trunk_stability_pushup' and data.get('score', 3) <= 2:
-                search_tags.add("pattern_pushup")
-            elif test == 'rotary_stability' and data.get('score', 3) <= 2:
-                search_tags.add("pattern_rotary")
-
-            # Fault-specific tags (binary > 0)
-            for category in data.values():
-                if isinstance(category, dict):
-                    for fault, severity in category.items():
-                        if isinstance(severity, (int, float)) and severity > 0:
-                            if fault in FAULT_TO_TAG_MAP:
-                                search_tags.add(FAULT_TO_TAG_MAP[fault])
+        return {"status": "ERROR_NO_DATA", "analysis": analysis, "data": [], "kb_version": snapshot.version}
+
+    # 3. Build Search Tags: profile → (test, category, fault) vector → weighted tags
+    if context is not None:
+        tag_weights = context.tag_weights
+    else:
+        query = FAULT_TAG_MATRIX.encode(detailed_faults)
+        tag_weights = search_tag_weights(FAULT_TAG_MATRIX.tag_weight_matrix(query)[0], target_level)
+    search_tags = set(tag_weights)
     
     print(f"--- DEBUG [{call_id}]: Searching for tags: {search_tags} ---")
 
-    # 4. Filter & Score exercises
-    scored_exercises = []
-    for ex in kb:
-        ex_tags = [str(t).lower() for t in ex.get('tags', [])]
-        ex_level = ex.get('difficulty_level', 1)
-        
-        # Strict level matching
-        if ex_level == target_level:
-            match_count = sum(1 for t in search_tags if t.lower() in ex_tags)
-            
-            # Boost for specific corrective tags
-            if match_count > 0:
-                if any("fix_" in t for t in search_tags if t.lower() in ex_tags):
-                    match_count += 5
-            scored_exercises.append({"ex": ex, "score": match_count})
-
-    # 5. Sort by relevance
-    scored_exercises.sort(key=lambda x: x['score'], reverse=True)
-    top_exercises = [x['ex'] for x in scored_exercises[:6]]  # increased to 6 for better selection pool
-
-    # Fallback if no matches
-    if not top_exercises:
-        print(f"--- DEBUG [{call_id}]: No specific matches → using general level fallback ---")
-        fallback = [ex for ex in kb if ex.get('difficulty_level') == target_level]
-        top_exercises = fallback[:6]
+    # 4. Score exercises at the target level: exercise-tag matrix × tag weight vector
+    cache_key = RetrievalCache.make_key(snapshot.version, target_level, tag_weights)
+    top_exercises = retrieval_cache.get(cache_key)
+    if top_exercises is not None:
+        print(f"--- DEBUG [{call_id}]: Retrieval cache hit ---")
+    else:
+        top_exercises = snapshot.index.rank(target_level, tag_weights, limit=TOP_K_EXERCISES)
+
+        # Fallback if no matches
+        if not top_exercises:
+            print(f"--- DEBUG [{call_id}]: No specific matches → using general level fallback ---")
+            top_exercises = snapshot.index.level_bucket(target_level)[:TOP_K_EXERCISES]
+
+        retrieval_cache.put(cache_key, top_exercises)
 
     # Final debug of returned items
     print(f"--- DEBUG [{call_id}]: RETRIEVED {len(top_exercises)} EXERCISES ---")
@@ -166,10 +245,83 @@ async def get_exercises_by_profile(
         name = ex.get('exercise_name', 'MISSING_NAME')
         print(f"  [{i}] {name}")
 
-    print(f"--- RETRIEVAL CALL END [{call_id}] | returning {len(top_exercises)} items ---")
+    print(f"--- RETRIEVAL CALL END [{call_id}] | returning {len(top_exercises)} items (kb_version={snapshot.version}) ---")
 
     return {
         "status": "SUCCESS",
         "analysis": analysis,
-        "data": top_exercises
-    }
\ No newline at end of file
+        "data": top_exercises,
+        "kb_version": snapshot.version
+    }
+
+async def get_exercises_for_profiles(
+    profiles: List[Dict[str, Any]],
+    contexts: Optional[List["PipelineContext"]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Batch retrieval for team screenings. Returns one result per profile, identical to
+    get_exercises_by_profile(..., detailed_faults=profile), but all profiles are encoded into
+    one query matrix and scored against the exercise-tag matrix in a single vectorized pass.
+    Pass `contexts` (one per profile, see src.pipeline.build_pipeline_contexts) to reuse their analysis.
+    """
+    call_id = str(uuid.uuid4())[:8]
+    print(f"--- BATCH RETRIEVAL CALL START [{call_id}] | {len(profiles)} profiles ---")
+
+    # 1. Analyze
+    profiles = [p or {} for p in profiles]
+    if contexts is not None:
+        analyses = [context.analysis for context in contexts]
+    else:
+        analyses = [
+            analyze_fms_profile(p, use_manual_scores=p.get('use_manual_scores', False))
+            for p in profiles
+        ]
+    target_levels = [a.get('target_level', 1) for a in analyses]
+
+    # 2. Load Data (one snapshot for the whole batch)
+    snapshot = get_knowledge_base()
+    if not snapshot.exercises:
+        print(f"--- BATCH RETRIEVAL CALL END [{call_id}] | ERROR: No data ---")
+        return [
+            {"status": "ERROR_NO_DATA", "analysis": a, "data": [], "kb_version": snapshot.version}
+            for a in analyses
+        ]
+
+    # 3. Build per-profile tag weights and look them up in the retrieval cache
+    if contexts is not None:
+        queries = np.array([context.fault_query for context in contexts]).reshape(len(contexts), len(FAULT_TAG_MATRIX.row_keys))
+        weights = FAULT_TAG_MATRIX.tag_weight_matrix(queries)
+        tag_weights = [context.tag_weights for context in contexts]
+    else:
+        weights = FAULT_TAG_MATRIX.tag_weight_matrix(FAULT_TAG_MATRIX.encode_many(profiles))
+        tag_weights = [search_tag_weights(row, lvl) for row, lvl in zip(weights, target_levels)]
+    keys = [RetrievalCache.make_key(snapshot.version, lvl, tw) for lvl, tw in zip(target_levels, tag_weights)]
+    ranked: List[Optional[List[Dict[str, Any]]]] = [retrieval_cache.get(key) for key in keys]
+    misses = [i for i, hit in enumerate(ranked) if hit is None]
+
+    # 4. Score + level filter + top-k for every cache miss at once
+    if misses:
+        tag_vectors = snapshot.index.project(FAULT_TAG_MATRIX.tags, weights[misses])
+        miss_levels = [target_levels[i] for i in misses]
+        level_cols = np.array([snapshot.index.tag_ids.get(f"level_{lvl}", -1) for lvl in miss_levels], dtype=np.intp)
+        rows = np.flatnonzero(level_cols >= 0)
+        tag_vectors[rows, level_cols[rows]] = np.maximum(tag_vectors[rows, level_cols[rows]], 1.0)
+
+        for i, top_exercises in zip(misses, snapshot.index.rank_many(miss_levels, tag_vectors, limit=TOP_K_EXERCISES)):
+            if not top_exercises:
+                top_exercises = snapshot.index.level_bucket(target_levels[i])[:TOP_K_EXERCISES]
+            retrieval_cache.put(keys[i], top_exercises)
+            ranked[i] = top_exercises
+
+    results = [
+        {
+            "status": "SUCCESS",
+            "analysis": analysis,
+            "data": top_exercises,
+            "kb_version": snapshot.version
+        }
+        for analysis, top_exercises in zip(analyses, ranked)
+    ]
+
+    print(f"--- BATCH RETRIEVAL CALL END [{call_id}] | {len(results)} results, {len(misses)} scored (kb_version={snapshot.version}) ---")
+    return results
@@ -0,0 +1,70 @@
+import json
+import re
+from typing import Any, Dict, List
+
+_ARRAY_START = re.compile(r'"exercises"\s*:\s*\[')
+
+
+class ExerciseCardStreamParser:
+    """
+    Incremental scanner over streamed LLM text. Returns each object of the top-level
+    "exercises": [...] array as soon as its closing brace arrives, without waiting for
+    the rest of the JSON document. String contents and escapes are tracked so braces
+    inside coach tips do not confuse the depth count.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0            # next character to scan
+        self._in_array = False
+        self._done = False
+        self._depth = 0          # object depth inside the exercises array
+        self._obj_start = -1
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        if self._done or not chunk:
+            return []
+        self._text += chunk
+
+        if not self._in_array:
+            match = _ARRAY_START.search(self._text)
+            if match is None:
+                return []
+            self._in_array = True
+            self._pos = match.end()
+
+        cards = []
+        text = self._text
+        i = self._pos
+        while i < len(text):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == '{':
+                if self._depth == 0:
+                    self._obj_start = i
+                self._depth += 1
+            elif ch == '}':
+                self._depth -= 1
+                if self._depth == 0 and self._obj_start >= 0:
+                    try:
+                        cards.append(json.loads(text[self._obj_start:i + 1]))
+                    except ValueError:
+                        pass
+                    self._obj_start = -1
+            elif ch == ']' and self._depth == 0:
+                self._done = True
+                i += 1
+                break
+            i += 1
+        self._pos = i
+        return cards
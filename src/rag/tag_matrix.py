@@ -0,0 +1,126 @@
+from typing import Any, Dict, Iterable, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from src.logic import fms_bitset
+from src.logic.fms_schema import FAULT_KEYS, FMS_TESTS
+
+# Row key used for the "score <= 2 in this test" pattern rule, e.g. ("hurdle_step", "score", "low").
+LOW_SCORE_KEY = ("score", "low")
+
+FaultKey = Tuple[str, str, str]
+
+
+class FaultTagMatrix:
+    """
+    Sparse (test, category, fault) × tag matrix compiled once from the flat FAULT_TO_TAG_MAP.
+    Each cell holds the weight that an active fault contributes to a search tag, so the same
+    fault name in two tests (e.g. knee_valgus in squat vs hurdle step) stays separate.
+    """
+
+    def __init__(
+        self,
+        fault_to_tag: Mapping[str, str],
+        pattern_tags: Mapping[str, str],
+        test_weights: Optional[Mapping[str, float]] = None,
+        overrides: Optional[Mapping[FaultKey, Tuple[str, float]]] = None,
+    ):
+        test_weights = test_weights or {}
+        overrides = overrides or {}
+
+        cells: Dict[FaultKey, Tuple[str, float]] = {}
+        for key in FAULT_KEYS:
+            test, _, fault = key
+            if fault in fault_to_tag:
+                cells[key] = (fault_to_tag[fault], test_weights.get(test, 1.0))
+        for test in FMS_TESTS:
+            if test in pattern_tags:
+                cells[(test, *LOW_SCORE_KEY)] = (pattern_tags[test], test_weights.get(test, 1.0))
+        cells.update(overrides)
+
+        self.row_keys: Tuple[FaultKey, ...] = tuple(FAULT_KEYS) + tuple((t, *LOW_SCORE_KEY) for t in FMS_TESTS)
+        self.row_ids = {key: i for i, key in enumerate(self.row_keys)}
+        self.tags: Tuple[str, ...] = tuple(sorted({tag.lower() for tag, _ in cells.values()}))
+        self.tag_ids = {tag: i for i, tag in enumerate(self.tags)}
+
+        rows, cols, data = [], [], []
+        for key, (tag, weight) in cells.items():
+            if key not in self.row_ids:
+                continue
+            rows.append(self.row_ids[key])
+            cols.append(self.tag_ids[tag.lower()])
+            data.append(float(weight))
+        self.matrix = sparse.csr_matrix(
+            (data, (rows, cols)), shape=(len(self.row_keys), len(self.tags)), dtype=np.float64
+        )
+        # Column-major copy for the per-tag max reduction in tag_weight_matrix
+        self._csc = self.matrix.tocsc()
+        self._csc.sort_indices()
+        self._nonempty_cols = np.flatnonzero(np.diff(self._csc.indptr))
+        # fms_bitset position -> matrix row (clearing_pain bits have no row)
+        bit_rows = np.array([self.row_ids.get(key, -1) for key in fms_bitset.BIT_KEYS], dtype=np.intp)
+        self._bit_mask = bit_rows >= 0
+        self._bit_rows = bit_rows[self._bit_mask]
+
+    def encode(self, detailed_faults: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Binary row-activation vector for a nested FMS profile."""
+        if not detailed_faults:
+            return np.zeros(len(self.row_keys), dtype=np.float64)
+        low_score_tests = [
+            test for test, data in detailed_faults.items()
+            if isinstance(data, dict) and data.get('score', 3) <= 2
+        ]
+        return self.encode_bits(fms_bitset.encode(detailed_faults), low_score_tests)
+
+    def encode_bits(self, fault_bits: int, low_score_tests: Iterable[str] = ()) -> np.ndarray:
+        """Activation vector from an fms_bitset fault bitset."""
+        query = np.zeros(len(self.row_keys), dtype=np.float64)
+        if fault_bits:
+            active = fms_bitset.unpack(fms_bitset.to_words(fault_bits))[0]
+            query[self._bit_rows[active[self._bit_mask]]] = 1.0
+        for test in low_score_tests:
+            i = self.row_ids.get((test, *LOW_SCORE_KEY))
+            if i is not None:
+                query[i] = 1.0
+        return query
+
+    def encode_bits_many(self, words: np.ndarray, low_score_tests: Sequence[Iterable[str]]) -> np.ndarray:
+        """Activation vectors for a (rows × 2) fms_bitset matrix, one row per bitset."""
+        active = fms_bitset.unpack(words)
+        queries = np.zeros((len(active), len(self.row_keys)), dtype=np.float64)
+        queries[:, self._bit_rows] = active[:, self._bit_mask]
+        for i, tests in enumerate(low_score_tests):
+            for test in tests:
+                j = self.row_ids.get((test, *LOW_SCORE_KEY))
+                if j is not None:
+                    queries[i, j] = 1.0
+        return queries
+
+    def encode_many(self, profiles: Sequence[Optional[Dict[str, Any]]]) -> np.ndarray:
+        """Stack of activation vectors, one row per profile."""
+        queries = np.zeros((len(profiles), len(self.row_keys)), dtype=np.float64)
+        for i, profile in enumerate(profiles):
+            queries[i] = self.encode(profile)
+        return queries
+
+    def tag_weight_matrix(self, queries: np.ndarray) -> np.ndarray:
+        """
+        (profiles × tags) weights for a stack of activation vectors. A tag takes the strongest
+        weight among the active rows that map to it, so with unit weights each row is exactly
+        the old search-tag set.
+        """
+        queries = np.atleast_2d(queries)
+        out = np.zeros((queries.shape[0], len(self.tags)), dtype=np.float64)
+        if queries.shape[0] == 0 or self._nonempty_cols.size == 0:
+            return out
+        gathered = queries[:, self._csc.indices] * self._csc.data
+        out[:, self._nonempty_cols] = np.maximum.reduceat(
+            gathered, self._csc.indptr[self._nonempty_cols], axis=1
+        )
+        return out
+
+    def tag_weights(self, query: np.ndarray) -> Dict[str, float]:
+        """Search-tag weights for a single activation vector."""
+        weights = self.tag_weight_matrix(query[None, :])[0]
+        return {self.tags[i]: float(weights[i]) for i in np.flatnonzero(weights)}
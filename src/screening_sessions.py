@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from src.pipeline import PipelineContext
+
+# --- CONFIGURATION ---
+SCREENING_SESSION_MAX = int(os.environ.get("SCREENING_SESSION_MAX", "1000"))
+SCREENING_SESSION_TTL_SECONDS = float(os.environ.get("SCREENING_SESSION_TTL_SECONDS", "3600"))
+
+
+@dataclass
+class ScreeningSession:
+    session_id: str
+    context: PipelineContext
+    revision: int = 0
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+
+class ScreeningSessionStore:
+    """
+    In-process store of live screenings (one coach filling in the seven tests one at a time).
+    Each session keeps the latest PipelineContext so a single-test patch only re-scores that test.
+    Bounded LRU; sessions idle for longer than `ttl_seconds` are dropped.
+    """
+
+    def __init__(self, maxsize: int = SCREENING_SESSION_MAX, ttl_seconds: float = SCREENING_SESSION_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, ScreeningSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def create(self, context: PipelineContext) -> ScreeningSession:
+        session = ScreeningSession(session_id=uuid.uuid4().hex, context=context)
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self.created += 1
+            while len(self._sessions) > self.maxsize:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+        return session
+
+    def get(self, session_id: str) -> Optional[ScreeningSession]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if self.ttl_seconds > 0 and time.time() - session.updated_at > self.ttl_seconds:
+                del self._sessions[session_id]
+                self.expired += 1
+                return None
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def update(self, session: ScreeningSession, context: PipelineContext) -> ScreeningSession:
+        with self._lock:
+            session.context = context
+            session.revision += 1
+            session.updated_at = time.time()
+            if session.session_id in self._sessions:
+                self._sessions.move_to_end(session.session_id)
+        return session
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.maxsize,
+                "created": self.created,
+                "expired": self.expired,
+                "evictions": self.evictions,
+            }
+
+
+screening_sessions = ScreeningSessionStore()
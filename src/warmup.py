@@ -0,0 +1,90 @@
+# warmup.py: Explicit warm-up after boot, reported by GET /readyz.
+# The process starts serving liveness immediately; /readyz stays 503 until the schema is checked,
+# DB connections are open, the KB + exercise index are loaded, the scoring/retrieval code paths
+# have run once and the LLM chain (the lazily imported langchain stack + HTTP clients) exists.
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from src.database import DB_POOL_SIZE, engine, ensure_schema, prewarm_pool
+from src.pipeline import build_pipeline_context
+from src.rag.generator import MODEL_NAME, chain_registry, get_templates
+from src.rag.knowledge_base import kb_store
+
+WARMUP_DB_CONNECTIONS = int(os.environ.get("WARMUP_DB_CONNECTIONS", str(DB_POOL_SIZE)))
+WARMUP_RETRY_SECONDS = float(os.environ.get("WARMUP_RETRY_SECONDS", "5"))
+
+
+@dataclass
+class WarmupState:
+    ready: bool = False
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    steps: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    def view(self) -> Dict[str, Any]:
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = round((self.finished_at or time.monotonic()) - self.started_at, 4)
+        return {"ready": self.ready, "warmup_seconds": elapsed, "steps": self.steps}
+
+
+async def _run_step(state: WarmupState, name: str, fn: Callable[[], Awaitable[Dict[str, Any]]]) -> bool:
+    started = time.perf_counter()
+    try:
+        info = await fn()
+    except Exception as e:
+        state.steps[name] = {"ok": False, "error": str(e), "seconds": round(time.perf_counter() - started, 4)}
+        print(f"⚠️ Warm-up step '{name}' failed: {str(e)}")
+        return False
+    state.steps[name] = {"ok": True, "seconds": round(time.perf_counter() - started, 4), **(info or {})}
+    return True
+
+
+async def _warm_db() -> Dict[str, Any]:
+    # Schema check first (a version read, DDL only when the schema is behind), then open the
+    # pool's connections together so the first requests don't pay the connect + TLS handshake.
+    async with engine.begin() as conn:
+        applied = await ensure_schema(conn)
+    opened = await prewarm_pool(WARMUP_DB_CONNECTIONS)
+    return {"schema_applied": applied, "connections": max(1, opened)}
+
+
+async def _warm_kb() -> Dict[str, Any]:
+    kb = kb_store.reload(force=True)
+    # Run analysis + index ranking once so first-call costs (numpy/scipy dispatch) are paid here
+    context = build_pipeline_context({})
+    kb.index.rank(context.target_level, context.tag_weights, limit=1)
+    return {"exercises": len(kb), "kb_version": kb.version}
+
+
+async def _warm_llm() -> Dict[str, Any]:
+    await asyncio.to_thread(get_templates)
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        return {"chain": "skipped (GROQ_API_KEY not set)"}
+    await asyncio.to_thread(chain_registry.get_chain, MODEL_NAME, api_key)
+    return {"chain": MODEL_NAME}
+
+
+STEPS = {"db": _warm_db, "kb": _warm_kb, "llm": _warm_llm}
+
+
+async def warm_up(state: WarmupState, retry_seconds: float = WARMUP_RETRY_SECONDS):
+    """Run every step concurrently; failed steps (e.g. DB not reachable yet) are retried until all pass."""
+    state.started_at = time.monotonic()
+    pending = dict(STEPS)
+    while pending:
+        results = await asyncio.gather(*(_run_step(state, name, fn) for name, fn in pending.items()))
+        pending = {name: fn for (name, fn), ok in zip(pending.items(), results) if not ok}
+        if pending:
+            await asyncio.sleep(retry_seconds)
+    state.finished_at = time.monotonic()
+    state.ready = True
+    print(f"🔥 Warm-up complete in {state.finished_at - state.started_at:.2f}s: {state.steps}")
+
+
+warmup_state = WarmupState()
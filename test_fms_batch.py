@@ -0,0 +1,106 @@
+# test_fms_batch.py: analyze_fms_profiles_batch must agree with analyze_fms_profile row for row.
+
+import random
+
+import numpy as np
+import pandas as pd
+
+from src.logic import fms_bitset
+
+from src.logic.fms_analyzer import (
+    BATCH_COLUMNS,
+    analyze_fms_bits,
+    analyze_fms_bits_many,
+    analyze_fms_profile,
+    analyze_fms_profiles_batch,
+    flatten_fms_profile,
+    profiles_to_frame,
+)
+from src.logic.fms_schema import FMS_FAULT_SCHEMA, FMS_TESTS
+
+
+def random_profile(rng, p=0.15):
+    profile = {}
+    for test in FMS_TESTS:
+        if rng.random() < 0.05:
+            continue  # test missing from the stored profile
+        test_data = {"score": rng.randint(0, 3), "clearing_pain": rng.random() < 0.03}
+        for category, faults in FMS_FAULT_SCHEMA[test].items():
+            if rng.random() < 0.1:
+                continue  # category never expanded
+            test_data[category] = {fault: int(rng.random() < p) for fault in faults}
+        profile[test] = test_data
+    profile["use_manual_scores"] = rng.random() < 0.2
+    return profile
+
+
+def assert_rows_match(profiles, batch):
+    for i, profile in enumerate(profiles):
+        expected = analyze_fms_profile(profile, use_manual_scores=profile.get("use_manual_scores", False))
+        row = batch.iloc[i]
+        assert row["status"] == expected["status"]
+        assert row["target_level"] == expected["target_level"]
+        assert row["reason"] == expected["reason"]
+        for test in FMS_TESTS:
+            if test in expected["effective_scores"]:
+                assert row[test] == expected["effective_scores"][test], (i, test)
+            elif test in batch.columns:
+                assert pd.isna(row[test]), (i, test)
+
+
+def test_batch_matches_per_profile():
+    rng = random.Random(3)
+    profiles = [random_profile(rng, p=rng.choice([0.02, 0.1, 0.3])) for _ in range(4000)]
+    batch = analyze_fms_profiles_batch(profiles_to_frame(profiles))
+    assert len(batch) == len(profiles)
+    assert_rows_match(profiles, batch)
+
+
+def test_batch_accepts_array_in_column_order():
+    rng = random.Random(5)
+    profiles = []
+    for _ in range(500):
+        profile = random_profile(rng)
+        for test in FMS_TESTS:  # a dense array carries every test and category
+            test_data = profile.setdefault(test, {"score": 2, "clearing_pain": False})
+            for category, faults in FMS_FAULT_SCHEMA[test].items():
+                test_data.setdefault(category, dict.fromkeys(faults, 0))
+        profiles.append(profile)
+
+    frame = profiles_to_frame(profiles)
+    array = frame.reindex(columns=list(BATCH_COLUMNS)).to_numpy(dtype=np.int64)
+    batch = analyze_fms_profiles_batch(array, use_manual_scores=False)
+    for profile in profiles:
+        profile["use_manual_scores"] = False
+    assert_rows_match(profiles, batch)
+
+
+def test_missing_values_count_as_unchecked():
+    profile = {"shoulder_mobility": {"score": 3, "reach_quality": {"excessive_gap": 1}}}
+    frame = pd.DataFrame([flatten_fms_profile(profile), {"overhead_squat.score": 2}])
+    batch = analyze_fms_profiles_batch(frame)
+    assert batch.loc[0, "shoulder_mobility"] == 1
+    assert batch.loc[0, "status"] == "MOBILITY"
+    assert batch.loc[1, "overhead_squat"] == 2
+    assert batch.loc[1, "status"] == "STRENGTH"
+
+
+def test_bits_many_matches_analyze_fms_bits():
+    rng = random.Random(7)
+    profiles = [random_profile(rng, p=rng.choice([0.02, 0.1, 0.3])) for _ in range(2000)]
+    for profile in profiles:
+        for test in FMS_TESTS:
+            profile.setdefault(test, {"score": rng.randint(0, 3)})
+    words = fms_bitset.encode_many(profiles)
+    manual_scores = [[profile[test]["score"] for test in FMS_TESTS] for profile in profiles]
+    use_manual = [profile["use_manual_scores"] for profile in profiles]
+    results = analyze_fms_bits_many(words, manual_scores, use_manual)
+    for profile, scores, manual, result in zip(profiles, manual_scores, use_manual, results):
+        bits = fms_bitset.encode(profile)
+        assert result == analyze_fms_bits(bits, dict(zip(FMS_TESTS, scores)), manual)
+
+
+def test_bits_many_out_of_range_manual_score():
+    words = fms_bitset.encode_many([{}])
+    result = analyze_fms_bits_many(words, [[5, 3, 3, 3, 3, 3, 3]], True)[0]
+    assert result == analyze_fms_bits(0, dict(zip(FMS_TESTS, [5, 3, 3, 3, 3, 3, 3])), True)
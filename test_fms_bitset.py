@@ -0,0 +1,96 @@
+# test_fms_bitset.py: The fixed-width fault bitset must round-trip and agree with the nested-dict paths.
+
+import random
+
+import numpy as np
+
+from src.logic import fms_bitset
+from src.logic.fms_analyzer import analyze_fms_bits, analyze_fms_profile
+from src.logic.fms_rules import COMPILED_TESTS
+from src.logic.fms_schema import FAULT_KEYS, FMS_FAULT_SCHEMA, FMS_TESTS
+from src.rag.retriever import FAULT_TAG_MATRIX
+from src.rag.tag_matrix import LOW_SCORE_KEY
+
+
+def random_profile(rng, p=0.15):
+    profile = {}
+    for test in FMS_TESTS:
+        test_data = {"score": rng.randint(0, 3), "clearing_pain": rng.random() < 0.05}
+        for category, faults in FMS_FAULT_SCHEMA[test].items():
+            test_data[category] = {fault: int(rng.random() < p) for fault in faults}
+        profile[test] = test_data
+    profile["use_manual_scores"] = rng.random() < 0.2
+    return profile
+
+
+def reference_activation(profile):
+    # Previous FaultTagMatrix.encode: nested walk per matrix row
+    query = np.zeros(len(FAULT_TAG_MATRIX.row_keys))
+    for i, (test, category, fault) in enumerate(FAULT_TAG_MATRIX.row_keys):
+        data = profile.get(test)
+        if not isinstance(data, dict):
+            continue
+        if (category, fault) == LOW_SCORE_KEY:
+            query[i] = float(data.get("score", 3) <= 2)
+        elif isinstance(data.get(category), dict):
+            query[i] = float(data[category].get(fault, 0) > 0)
+    return query
+
+
+def test_layout():
+    assert fms_bitset.N_BITS == len(FAULT_KEYS) + len(FMS_TESTS)
+    assert fms_bitset.N_BITS <= 128
+    for test, layout in COMPILED_TESTS.items():
+        # Each test's bitset block is the prefix of its rule-engine layout
+        offset, width = fms_bitset.TEST_OFFSETS[test], fms_bitset.TEST_WIDTHS[test]
+        block = tuple((c, f) for _, c, f in fms_bitset.BIT_KEYS[offset:offset + width])
+        assert layout.slots[:width] == block
+
+
+def test_round_trip():
+    rng = random.Random(2)
+    for _ in range(500):
+        profile = random_profile(rng)
+        bits = fms_bitset.encode(profile)
+        assert bits < 1 << fms_bitset.N_BITS
+        assert fms_bitset.from_words(fms_bitset.to_words(bits)) == bits
+        assert fms_bitset.from_bytes(fms_bitset.to_bytes(bits)) == bits
+        assert len(fms_bitset.to_bytes(bits)) == fms_bitset.N_BYTES
+
+        decoded = fms_bitset.decode(bits)
+        for test in FMS_TESTS:
+            expected = {k: v for k, v in profile[test].items() if k != "score"}
+            assert decoded[test] == expected
+        assert fms_bitset.encode(decoded) == bits
+
+        active = set(fms_bitset.iter_active_faults(bits))
+        assert active == {(t, c, f) for t, c, f in FAULT_KEYS if profile[t][c][f]}
+        unpacked = fms_bitset.unpack(fms_bitset.to_words(bits))[0]
+        assert [bool(bits >> i & 1) for i in range(fms_bitset.N_BITS)] == unpacked.tolist()
+
+
+def test_analyze_fms_bits_matches_profile_analysis():
+    rng = random.Random(4)
+    for _ in range(3000):
+        profile = random_profile(rng, p=rng.choice([0.0, 0.05, 0.2]))
+        manual = profile["use_manual_scores"]
+        scores = {t: profile[t]["score"] for t in FMS_TESTS}
+        assert analyze_fms_bits(fms_bitset.encode(profile), scores, manual) == analyze_fms_profile(profile, manual)
+
+
+def test_tag_matrix_encoding_matches_nested_walk():
+    rng = random.Random(6)
+    for _ in range(1000):
+        profile = random_profile(rng)
+        assert np.array_equal(FAULT_TAG_MATRIX.encode(profile), reference_activation(profile))
+
+
+def test_nearest_profiles_by_hamming_distance():
+    rng = random.Random(8)
+    profiles = [random_profile(rng) for _ in range(200)]
+    words = fms_bitset.encode_many(profiles)
+    query = fms_bitset.encode(profiles[17])
+    distances = fms_bitset.hamming_distances(query, words)
+    expected = [bin((fms_bitset.encode(p) ^ query) & fms_bitset.FAULT_MASK).count("1") for p in profiles]
+    assert distances.tolist() == expected
+    assert fms_bitset.nearest_profiles(query, words, k=1)[0] == 17
@@ -0,0 +1,261 @@
+# test_fms_rules.py: Property tests for the compiled FMS rule engine (src/logic/fms_rules.py).
+# The reference below is the hand-written per-test decision tree the rule tables replaced;
+# the compiled engine must agree with it on every binary combination of a test's checkboxes.
+
+import itertools
+import random
+
+import pytest
+
+from src.logic.fms_analyzer import analyze_fms_profile
+from src.logic.fms_rules import COMPILED_TESTS, calculate_score_from_faults, encode_test, score_bits
+from src.logic.fms_schema import FMS_FAULT_SCHEMA, FMS_TESTS
+
+
+# --- REFERENCE IMPLEMENTATION (previous analyze_fms_profile closure, verbatim) ---
+def reference_score(test_name, test_data):
+    """
+    Returns the strictly calculated score (0-3) based on FMS decision trees from the book.
+    Adjusted for binary (0=absent, 1=present for faults; reverse for positives).
+    """
+    # 1. Extract sub-dictionaries (ignore the manual 'score' field)
+    sub_data = {k: v for k, v in test_data.items() if k != 'score'}
+
+    # 2. Check for PAIN first (Global Override for this test)
+    pain_data = sub_data.get('pain', {})
+    # If pain reported > 0, score is immediately 0
+    if pain_data.get('pain_reported', 0) > 0:
+        return 0
+    # Also check clearing_pain for relevant tests
+    if test_data.get('clearing_pain', False):
+        return 0
+
+    # 3. Test-specific logic from PDF (binary-adjusted)
+    if test_name == 'overhead_squat':
+        feet = sub_data.get('feet', {})
+        trunk = sub_data.get('trunk_torso', {})
+        lower = sub_data.get('lower_limb', {})
+        upper = sub_data.get('upper_body_bar_position', {})
+
+        # Score 1: Major faults present (bad >0 or good ==0)
+        major_faults = (
+            trunk.get('excessive_forward_lean', 0) > 0 or
+            trunk.get('lumbar_flexion', 0) > 0 or
+            lower.get('knee_valgus', 0) > 0 or
+            feet.get('heels_lift', 0) > 0 or
+            upper.get('bar_drifts_forward', 0) > 0 or
+            trunk.get('upright_torso', 0) == 0  # Good thing absent
+        )
+        if major_faults:
+            return 1
+
+        # Score 2: Heels lift but others ok
+        if feet.get('heels_lift', 0) > 0:
+            return 2
+
+        # All good → 3
+        return 3
+
+    elif test_name == 'hurdle_step':
+        pelvis = sub_data.get('pelvis_core_control', {})
+        stepping = sub_data.get('stepping_leg', {})
+        stance = sub_data.get('stance_leg', {})
+
+        # Score 1: Contact or loss of balance
+        if stepping.get('toe_drag', 0) > 0 or pelvis.get('loss_of_balance', 0) > 0:
+            return 1
+
+        # Score 2: Alignment lost, movement in lumbar, etc.
+        if (pelvis.get('excessive_rotation', 0) > 0 or
+            stance.get('knee_valgus', 0) > 0 or
+            stance.get('knee_varus', 0) > 0 or
+            stance.get('knee_stable', 0) == 0):
+            return 2
+
+        # All aligned → 3
+        return 3
+
+    elif test_name == 'inline_lunge':
+        alignment = sub_data.get('alignment', {})
+        lower = sub_data.get('lower_body_control', {})
+        balance = sub_data.get('balance_stability', {})
+
+        # Score 1: Loss of balance
+        if balance.get('loss_of_balance', 0) > 0:
+            return 1
+
+        # Score 2: Forward lean, valgus, etc.
+        if (alignment.get('excessive_forward_lean', 0) > 0 or
+            alignment.get('lateral_shift', 0) > 0 or
+            lower.get('knee_valgus', 0) > 0 or
+            lower.get('heel_lift', 0) > 0 or
+            lower.get('knee_tracks_over_foot', 0) == 0):
+            return 2
+
+        # All good → 3
+        return 3
+
+    elif test_name == 'shoulder_mobility':
+        reach = sub_data.get('reach_quality', {})
+        compensation = sub_data.get('compensation', {})
+
+        # Score 0 already handled by pain
+        # Score 1: Excessive gap or asymmetry
+        if reach.get('excessive_gap', 0) > 0 or reach.get('asymmetry_present', 0) > 0:
+            return 1
+
+        # Score 2: Within hand length but compensation
+        if compensation.get('rib_flare', 0) > 0 or compensation.get('scapular_winging', 0) > 0:
+            return 2
+
+        # Score 3: Within fist, no comp
+        if reach.get('hands_within_fist_distance', 0) > 0:
+            return 3
+        return 2  # Default if partial
+
+    elif test_name == 'active_straight_leg_raise':
+        non_moving = sub_data.get('non_moving_leg', {})
+        moving = sub_data.get('moving_leg', {})
+        pelvic = sub_data.get('pelvic_control', {})
+
+        # Score 1: <60 flexion or major faults
+        if moving.get('lt_60_hip_flexion', 0) > 0 or non_moving.get('foot_lifts_off_floor', 0) > 0:
+            return 1
+
+        # Score 2: 60-80 with some tilt
+        if pelvic.get('anterior_tilt', 0) > 0 or moving.get('hamstring_restriction', 0) > 0:
+            return 2
+
+        # Score 3: >80, stable
+        if moving.get('gt_80_hip_flexion', 0) > 0 and pelvic.get('pelvis_stable', 0) > 0:
+            return 3
+        return 2
+
+    elif test_name == 'trunk_stability_pushup':
+        core = sub_data.get('core_control', {})
+        body = sub_data.get('body_alignment', {})
+        upper = sub_data.get('upper_body', {})
+
+        # Score 1: Unable (lag or sagging)
+        if core.get('hips_lag', 0) > 0 or body.get('sagging_hips', 0) > 0:
+            return 1
+
+        # Score 2: Minor issues
+        if upper.get('uneven_arm_push', 0) > 0 or upper.get('shoulder_instability', 0) > 0:
+            return 2
+
+        return 3
+
+    elif test_name == 'rotary_stability':
+        diagonal = sub_data.get('diagonal_pattern', {})
+        spinal = sub_data.get('spinal_control', {})
+
+        # Score 1: Unable
+        if diagonal.get('unable_to_complete', 0) > 0:
+            return 1
+
+        # Score 2: Can do with loss
+        if diagonal.get('loss_of_balance', 0) > 0 or spinal.get('excessive_rotation', 0) > 0:
+            return 2
+
+        # Score 3: Smooth
+        if diagonal.get('smooth_controlled', 0) > 0:
+            return 3
+        return 1
+
+    # Default for any missed test
+    return 3
+
+
+def reference_effective_scores(profile, use_manual_scores=False):
+    effective_scores = {}
+    for test_name in profile:
+        if test_name in ['use_manual_scores']: continue
+        test_data = profile[test_name]
+        has_sub_inputs = False
+        for k, v in test_data.items():
+            if isinstance(v, dict):
+                if sum(v.values()) > 0:
+                    has_sub_inputs = True
+                    break
+        if use_manual_scores:
+            effective_scores[test_name] = test_data.get('score', 2)
+        elif has_sub_inputs:
+            effective_scores[test_name] = reference_score(test_name, test_data)
+        else:
+            effective_scores[test_name] = test_data.get('score', 2)
+    return effective_scores
+
+
+# --- HELPERS ---
+def build_test_data(test_name, layout_bits, score=2):
+    """Nested checkbox dict for one test from a bitmask over its schema checkboxes + clearing_pain."""
+    slots = [(c, f) for c, faults in FMS_FAULT_SCHEMA[test_name].items() for f in faults]
+    test_data = {"score": score, "clearing_pain": bool(layout_bits >> len(slots) & 1)}
+    for i, (category, fault) in enumerate(slots):
+        test_data.setdefault(category, {})[fault] = layout_bits >> i & 1
+    return test_data
+
+
+def random_profile(rng, p=0.2):
+    profile = {test: build_test_data(test, 0, score=rng.randint(0, 3)) for test in FMS_TESTS}
+    for test_data in profile.values():
+        test_data["clearing_pain"] = rng.random() < 0.05
+        for category, faults in list(test_data.items()):
+            if isinstance(faults, dict):
+                for fault in faults:
+                    faults[fault] = int(rng.random() < p)
+                if rng.random() < 0.1:
+                    del test_data[category]  # partially filled forms
+    profile["use_manual_scores"] = rng.random() < 0.2
+    return profile
+
+
+# --- TESTS ---
+@pytest.mark.parametrize("test_name", FMS_TESTS)
+def test_compiled_rules_match_reference_on_every_binary_input(test_name):
+    n_bits = sum(len(f) for f in FMS_FAULT_SCHEMA[test_name].values()) + 1  # + clearing_pain
+    for bits in range(1 << n_bits):
+        test_data = build_test_data(test_name, bits)
+        assert calculate_score_from_faults(test_name, test_data) == reference_score(test_name, test_data), (
+            test_name, test_data
+        )
+
+
+@pytest.mark.parametrize("test_name", FMS_TESTS)
+def test_missing_categories_default_to_absent(test_name):
+    categories = list(FMS_FAULT_SCHEMA[test_name])
+    for keep in itertools.product((False, True), repeat=len(categories)):
+        test_data = {c: {f: 0 for f in FMS_FAULT_SCHEMA[test_name][c]} for c, k in zip(categories, keep) if k}
+        assert calculate_score_from_faults(test_name, test_data) == reference_score(test_name, test_data)
+
+
+def test_unknown_test_uses_overrides_then_fallback():
+    assert calculate_score_from_faults("made_up_test", {"x": {"y": 1}}) == reference_score("made_up_test", {"x": {"y": 1}})
+    assert calculate_score_from_faults("made_up_test", {"pain": {"pain_reported": 1}}) == 0
+    assert calculate_score_from_faults("made_up_test", {"clearing_pain": True}) == 0
+
+
+def test_every_rule_literal_is_a_schema_checkbox():
+    for test_name, layout in COMPILED_TESTS.items():
+        assert layout.slots[layout.clearing_pain_bit] == ("", "clearing_pain")
+        for rule in layout.rules:
+            assert all(0 <= pos < len(layout.slots) for pos in rule.positions)
+
+
+def test_encode_then_score_matches_one_shot():
+    rng = random.Random(7)
+    for _ in range(500):
+        profile = random_profile(rng)
+        for test_name in FMS_TESTS:
+            bits, _ = encode_test(test_name, profile[test_name])
+            assert score_bits(test_name, bits) == calculate_score_from_faults(test_name, profile[test_name])
+
+
+def test_analyze_fms_profile_effective_scores_match_reference():
+    rng = random.Random(11)
+    for _ in range(3000):
+        profile = random_profile(rng)
+        manual = profile["use_manual_scores"]
+        result = analyze_fms_profile(profile, use_manual_scores=manual)
+        assert result["effective_scores"] == reference_effective_scores(profile, use_manual_scores=manual)
@@ -0,0 +1,84 @@
+# test_fms_traffic_light.py: The precomputed traffic-light table must reproduce the original
+# if/elif decision on every one of the 4^7 score combinations.
+
+import itertools
+import random
+
+import numpy as np
+
+from src.logic.fms_analyzer import (
+    STATUSES,
+    TRAFFIC_LIGHT_LUT,
+    TRAFFIC_LIGHTS,
+    analyze_fms_profile,
+    encode_scores,
+    score_index,
+    traffic_light_status,
+)
+from src.logic.fms_schema import FMS_TESTS
+
+
+# --- REFERENCE IMPLEMENTATION (previous traffic-light branch of analyze_fms_profile) ---
+def reference_traffic_light(effective_scores):
+    if any(score == 0 for score in effective_scores.values()):
+        return {"status": "STOP", "target_level": 0, "reason": "Pain detected (Score 0 in one or more tests). Refer to medical professional."}
+    if effective_scores.get('active_straight_leg_raise', 3) <= 1 or \
+       effective_scores.get('shoulder_mobility', 3) <= 1:
+        return {"status": "MOBILITY", "target_level": 1, "reason": "Mobility Restriction (Score 1 in ASLR or SM)"}
+    if effective_scores.get('rotary_stability', 3) <= 1 or \
+       effective_scores.get('trunk_stability_pushup', 3) <= 1:
+        return {"status": "STABILITY", "target_level": 3, "reason": "Motor Control Failure (Score 1 in TS or RS)"}
+    min_pattern = min(
+        effective_scores.get('hurdle_step', 3),
+        effective_scores.get('inline_lunge', 3),
+        effective_scores.get('overhead_squat', 3)
+    )
+    if min_pattern <= 1:
+        return {"status": "PATTERN", "target_level": 5, "reason": "Pattern Dysfunction (Score 1 in Squat/Hurdle/Lunge)"}
+    elif min_pattern == 2:
+        return {"status": "STRENGTH", "target_level": 7, "reason": "Acceptable Patterning (Score 2). Cleared for Strength."}
+    else:
+        return {"status": "POWER", "target_level": 9, "reason": "Perfect Patterning (Score 3). Cleared for Power."}
+
+
+# --- TESTS ---
+def test_lut_matches_reference_on_full_score_space():
+    assert TRAFFIC_LIGHT_LUT.shape == (4 ** len(FMS_TESTS),)
+    for combo in itertools.product(range(4), repeat=len(FMS_TESTS)):
+        scores = dict(zip(FMS_TESTS, combo))
+        expected = reference_traffic_light(scores)
+        index = encode_scores(scores)
+        assert index == score_index(combo)
+        assert STATUSES[TRAFFIC_LIGHT_LUT[index]] == expected["status"], scores
+
+        result = analyze_fms_profile({t: {"score": s} for t, s in scores.items()}, use_manual_scores=True)
+        assert {k: result[k] for k in ("status", "target_level", "reason")} == expected
+        assert result["effective_scores"] == scores
+
+
+def test_missing_tests_count_as_three():
+    rng = random.Random(1)
+    for _ in range(2000):
+        tests = rng.sample(FMS_TESTS, rng.randint(0, len(FMS_TESTS)))
+        scores = {t: rng.randint(0, 3) for t in tests}
+        assert encode_scores(scores) is not None
+        assert traffic_light_status(scores) == reference_traffic_light(scores)["status"]
+
+
+def test_inputs_outside_the_table_fall_back():
+    cases = [
+        {"overhead_squat": 5},
+        {"shoulder_mobility": -1},
+        {"hurdle_step": 1.5, "inline_lunge": 2},
+        {"overhead_squat": 3, "extra_test": 0},
+    ]
+    for scores in cases:
+        assert encode_scores(scores) is None
+        assert traffic_light_status(scores) == reference_traffic_light(scores)["status"]
+
+
+def test_vectorized_index_matches_scalar():
+    combos = np.array(list(itertools.product(range(4), repeat=len(FMS_TESTS))))
+    assert np.array_equal(score_index(combos), np.arange(len(combos)))
+    levels = np.array([TRAFFIC_LIGHTS[s][0] for s in STATUSES])[TRAFFIC_LIGHT_LUT]
+    assert set(levels.tolist()) == {0, 1, 3, 5, 7, 9}
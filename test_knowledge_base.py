@@ -0,0 +1,69 @@
+# test_knowledge_base.py: Hot reload of the exercise KB: a content change gives a new version and a
+# rebuilt index, an unchanged or unreadable file keeps the current snapshot.
+
+import json
+import os
+
+from src.rag.knowledge_base import EMPTY_SNAPSHOT, KnowledgeBaseStore
+
+
+def write_kb(path, exercises, bump=1):
+    path.write_text(exercises if isinstance(exercises, str) else json.dumps(exercises))
+    # distinct mtime even on coarse-grained filesystems
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + bump * 1_000_000_000))
+
+
+def squat(ex_id, level, *tags):
+    return {"id": ex_id, "exercise_name": ex_id, "difficulty_level": level, "tags": [f"level_{level}", *tags]}
+
+
+def test_reload_rebuilds_the_index_for_new_content(tmp_path):
+    path = tmp_path / "kb.json"
+    write_kb(path, [squat("a", 1, "pattern_squat"), squat("b", 2, "pattern_squat")])
+    store = KnowledgeBaseStore(str(path), check_interval=3600)
+    first = store.get()
+    assert len(first) == 2 and set(first.index.by_level) == {1, 2}
+    assert [ex["id"] for ex in first.index.rank(1, {"pattern_squat": 1.0})] == ["a"]
+
+    write_kb(path, [squat("c", 1, "fix_heels_lift"), squat("d", 3, "pattern_squat")], bump=2)
+    assert store.get() is first                          # within check_interval: no stat()
+    second = store.reload()
+    assert second.version != first.version and store.version == second.version
+    assert set(second.index.by_level) == {1, 3} and "fix_heels_lift" in second.index.postings
+    assert [ex["id"] for ex in second.index.rank(1, {"fix_heels_lift": 1.0})] == ["c"]
+    assert first.index.rank(1, {"pattern_squat": 1.0})[0]["id"] == "a"   # old snapshot untouched
+
+
+def test_touch_without_content_change_keeps_the_version(tmp_path):
+    path = tmp_path / "kb.json"
+    write_kb(path, [squat("a", 1)])
+    store = KnowledgeBaseStore(str(path), check_interval=0)
+    first = store.get()
+    write_kb(path, [squat("a", 1)], bump=2)
+    second = store.reload()
+    assert second.version == first.version and second.index is first.index
+    assert second.mtime_ns != first.mtime_ns
+
+
+def test_failed_parse_keeps_the_previous_snapshot(tmp_path):
+    path = tmp_path / "kb.json"
+    write_kb(path, [squat("a", 1)])
+    store = KnowledgeBaseStore(str(path), check_interval=0)
+    good = store.get()
+
+    write_kb(path, '[{"id": "b", "difficulty_level": ', bump=2)     # truncated write
+    assert store.reload() is good and store.get() is good
+    write_kb(path, '{"not": "a list"}', bump=3)
+    assert store.reload() is good
+    path.unlink()
+    assert store.reload() is good
+
+    write_kb(path, [squat("b", 2)], bump=4)
+    recovered = store.reload()
+    assert recovered.version != good.version and [ex["id"] for ex in recovered.exercises] == ["b"]
+
+
+def test_missing_file_on_first_load_is_empty(tmp_path):
+    store = KnowledgeBaseStore(str(tmp_path / "missing.json"), check_interval=0)
+    assert store.get() is EMPTY_SNAPSHOT and store.version == "empty"
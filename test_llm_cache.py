@@ -0,0 +1,122 @@
+# test_llm_cache.py: The SQLite LLM response cache (hits, TTL expiry, LRU eviction at the size cap)
+# and the generator serving an expired plan when the LLM call fails; the prompt inputs that its keys
+# are built from.
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.rag import generator, llm_cache as llm_cache_module
+from src.rag.llm_cache import LLMResponseCache
+
+PLAN = {"session_title": "Cached", "coach_summary": "From the cache.", "difficulty_color": "Green", "exercises": []}
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache_module, "time", SimpleNamespace(time=clock.time))
+    return clock
+
+
+def make_cache(tmp_path, **kwargs):
+    return LLMResponseCache(path=str(tmp_path / "llm_cache.sqlite3"), enabled=True, **kwargs)
+
+
+def test_hit_returns_the_stored_response(tmp_path, clock):
+    cache = make_cache(tmp_path)
+    key = LLMResponseCache.make_key("model", "prompt")
+    assert key != LLMResponseCache.make_key("other-model", "prompt")
+    assert cache.get(key) is None
+    cache.put(key, "model", PLAN)
+    assert cache.get(key) == PLAN
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["writes"], stats["entries"]) == (1, 1, 1, 1)
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl_seconds=60)
+    key = LLMResponseCache.make_key("model", "prompt")
+    cache.put(key, "model", PLAN)
+    clock.now += 59
+    assert cache.get(key) == PLAN
+    clock.now += 2
+    assert cache.get(key) is None
+    assert cache.get(key, allow_stale=True) == PLAN
+    stats = cache.stats()
+    assert (stats["hits"], stats["expired"], stats["stale_served"]) == (1, 1, 1)
+
+
+def test_size_cap_evicts_least_recently_used(tmp_path, clock):
+    cache = make_cache(tmp_path, max_entries=3)
+    keys = [LLMResponseCache.make_key("model", f"prompt {i}") for i in range(4)]
+    for key in keys[:3]:
+        clock.now += 1
+        cache.put(key, "model", PLAN)
+    clock.now += 1
+    assert cache.get(keys[0]) == PLAN        # touched: keys[1] is now the oldest
+    clock.now += 1
+    cache.put(keys[3], "model", PLAN)
+    assert cache.get(keys[1]) is None
+    assert all(cache.get(key) == PLAN for key in (keys[0], keys[2], keys[3]))
+    assert cache.stats()["evictions"] == 1 and cache.stats()["entries"] == 3
+
+
+class FakeChain:
+    def __init__(self, response=None, error=None):
+        self.response, self.error, self.calls = response, error, 0
+
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return dict(self.response)
+
+
+def test_generator_serves_stale_plan_when_the_llm_fails(tmp_path, clock, monkeypatch):
+    cache = make_cache(tmp_path, ttl_seconds=60)
+    monkeypatch.setattr(generator, "llm_cache", cache)
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    exercises = [{"exercise_name": "Wall Squat", "difficulty_level": 5, "tags": ["pattern_squat"]}]
+    analysis = {"status": "PATTERN", "target_level": 5, "detailed_faults": {}}
+
+    ok = FakeChain(response=PLAN)
+    monkeypatch.setattr(generator.chain_registry, "get_chain", lambda model, api_key: ok)
+    assert asyncio.run(generator.agenerate_workout_plan(analysis, exercises)) == PLAN
+    assert asyncio.run(generator.agenerate_workout_plan(analysis, exercises)) == PLAN
+    assert ok.calls == 1                                           # second call was a cache hit
+
+    clock.now += 120                                               # expired
+    failing = FakeChain(error=RuntimeError("provider down"))
+    monkeypatch.setattr(generator.chain_registry, "get_chain", lambda model, api_key: failing)
+    assert asyncio.run(generator.agenerate_workout_plan(analysis, exercises)) == PLAN
+    assert failing.calls == 1 and cache.stats()["stale_served"] == 1
+
+    monkeypatch.setattr(generator, "llm_cache", make_cache(tmp_path / "empty"))
+    fallback = asyncio.run(generator.agenerate_workout_plan(analysis, exercises))
+    assert fallback["session_title"] == "Workout Generated (Fallback)"
+
+
+def test_prompt_inputs_from_a_pipeline_context_match_the_baseline():
+    # /generate-workout has always sent the traffic-light result without 'detailed_faults'; the
+    # prompt (and so every cache key) must not change because the analysis now comes from a context
+    from src.pipeline import build_pipeline_context
+
+    profile = {"overhead_squat": {"score": 1, "lower_limb": {"knee_valgus": 1}}, "use_manual_scores": False}
+    context = build_pipeline_context(profile)
+    exercises = [{"exercise_name": "Wall Squat", "difficulty_level": 5, "tags": ["pattern_squat"]}]
+    assert generator._build_prompt_inputs(context.analysis, exercises) == {
+        "status": context.analysis["status"],
+        "level": str(context.analysis["target_level"]),
+        "faults_text": "No specific faults data available.",
+        "exercise_list": "- **Wall Squat** (Level 5)\n  Tags: pattern_squat",
+    }
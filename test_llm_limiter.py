@@ -0,0 +1,89 @@
+# test_llm_limiter.py: The per-event-loop cap on in-flight LLM calls (created at startup by the
+# API lifespan and the worker; any other loop gets its own), which a streaming client that stops
+# reading must not hold.
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+from src.rag import generator
+from src.rag.llm_cache import LLMResponseCache
+
+ANALYSIS = {"status": "PATTERN", "target_level": 5, "detailed_faults": {}}
+
+
+class SlowChain:
+    def __init__(self):
+        self.in_flight = self.peak = 0
+
+    async def ainvoke(self, inputs):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return {"session_title": "Plan", "coach_summary": inputs["exercise_list"], "exercises": []}
+
+
+def setup(monkeypatch, tmp_path):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    monkeypatch.setattr(generator, "llm_cache", LLMResponseCache(path=str(tmp_path / "c.sqlite3"), enabled=False))
+    chain = SlowChain()
+    monkeypatch.setattr(generator.chain_registry, "get_chain", lambda model, api_key: chain)
+    return chain
+
+
+async def generate_many(n):
+    return await asyncio.gather(*(
+        generator.agenerate_workout_plan(ANALYSIS, [{"exercise_name": f"Exercise {i}", "difficulty_level": 5}])
+        for i in range(n)
+    ))
+
+
+def test_startup_limit_caps_in_flight_calls(monkeypatch, tmp_path):
+    chain = setup(monkeypatch, tmp_path)
+
+    async def app():
+        generator.init_llm_limiter(2)
+        return await generate_many(6)
+
+    plans = asyncio.run(app())
+    assert len(plans) == 6 and chain.peak == 2
+
+
+def test_each_event_loop_gets_its_own_limit(monkeypatch, tmp_path):
+    chain = setup(monkeypatch, tmp_path)
+    monkeypatch.setattr(generator, "LLM_MAX_CONCURRENCY", 3)
+    # a semaphore contended on one loop used to fail on the next ("bound to a different event loop")
+    for _ in range(2):
+        chain.peak = 0
+        plans = asyncio.run(generate_many(5))
+        assert [plan["session_title"] for plan in plans] == ["Plan"] * 5     # no fallback plans
+        assert chain.peak == 3
+
+
+class ChunkedStream:
+    def __init__(self, text):
+        self.text = text
+
+    async def astream(self, inputs):
+        for i in range(0, len(self.text), 16):
+            yield SimpleNamespace(content=self.text[i:i + 16])
+
+
+def test_a_stalled_stream_client_does_not_hold_an_llm_slot(monkeypatch, tmp_path):
+    setup(monkeypatch, tmp_path)
+    card = {"name": "Wall Squat", "tag": "SQUAT", "sets_reps": "3 x 10", "tempo": "3-1-3-0", "coach_tip": "Slow."}
+    document = json.dumps({"session_title": "Streamed", "exercises": [card, card], "coach_summary": "Done."})
+    monkeypatch.setattr(generator.chain_registry, "get_stream_chain", lambda model, api_key: ChunkedStream(document))
+
+    async def app():
+        generator.init_llm_limiter(1)
+        stream = generator.astream_workout_plan(ANALYSIS, [{"exercise_name": "Wall Squat", "difficulty_level": 5}])
+        assert (await stream.__anext__())[0] == "card"      # the SSE client stops reading here
+        plans = await asyncio.wait_for(generate_many(2), timeout=5)
+        rest = [event async for event in stream]
+        return plans, rest
+
+    plans, rest = asyncio.run(app())
+    assert [plan["session_title"] for plan in plans] == ["Plan"] * 2
+    assert [kind for kind, _ in rest] == ["card", "plan"] and rest[-1][1]["session_title"] == "Streamed"
@@ -0,0 +1,43 @@
+# test_metrics.py: /metrics output must be valid Prometheus text exposition.
+
+from src.metrics import MetricsRegistry
+
+
+def test_render_counter_gauge_histogram():
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "Calls.", ("model", "outcome"))
+    in_flight = registry.gauge("in_flight", "In flight.")
+    latency = registry.histogram("latency_seconds", "Latency.", ("stage",), buckets=(0.1, 1.0))
+
+    calls.inc(1, "m", "ok")
+    calls.inc(2, "m", "ok")
+    with in_flight.track():
+        assert 'in_flight 1' in registry.render()
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value, "analyze")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE calls_total counter" in lines
+    assert 'calls_total{model="m",outcome="ok"} 3' in lines
+    assert "in_flight 0" in lines
+    assert 'latency_seconds_bucket{stage="analyze",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{stage="analyze",le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{stage="analyze",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{stage="analyze"} 5.55' in lines
+    assert 'latency_seconds_count{stage="analyze"} 3' in lines
+
+
+def test_collectors_and_label_escaping():
+    registry = MetricsRegistry()
+
+    @registry.collector
+    def info():
+        yield "kb_info", "gauge", "KB version.", [({"version": 'a"b\\c'}, 1)]
+
+    @registry.collector
+    def broken():
+        raise RuntimeError("boom")
+
+    text = registry.render()
+    assert 'kb_info{version="a\\"b\\\\c"} 1' in text.splitlines()
+    assert "# collector broken failed: boom" in text
@@ -0,0 +1,97 @@
+# test_reassessment.py: Which cards of a stored plan survive a re-screen.
+
+import asyncio
+
+from src.logic.fms_schema import FMS_FAULT_SCHEMA, FMS_TESTS
+from src.pipeline import build_pipeline_context
+from src.rag.reassessment import FULL, PARTIAL, UNCHANGED, diff_plan, merge_cards
+from src.rag.retriever import get_exercises_by_profile
+
+
+def blank_profile(score=2):
+    profile = {
+        test: {"score": score, "clearing_pain": False, **{c: dict.fromkeys(f, 0) for c, f in FMS_FAULT_SCHEMA[test].items()}}
+        for test in FMS_TESTS
+    }
+    profile["use_manual_scores"] = False
+    return profile
+
+
+def screen(profile):
+    context = build_pipeline_context(profile)
+    result = asyncio.run(get_exercises_by_profile(context.effective_scores, profile, context=context))
+    return context, result["data"]
+
+
+def plan_from(exercises, tip="Keep the torso tall."):
+    return {
+        "session_title": "Previous",
+        "coach_summary": "Old summary",
+        "exercises": [
+            {"name": ex["exercise_name"], "tag": "CORRECTIVE", "sets_reps": "3 x 10", "tempo": "Controlled", "coach_tip": tip}
+            for ex in exercises[:3]
+        ],
+    }
+
+
+def test_same_profile_keeps_every_card():
+    profile = blank_profile()
+    profile["overhead_squat"]["feet"]["heels_lift"] = 1
+    context, exercises = screen(profile)
+    diff = diff_plan(plan_from(exercises), context, context, exercises)
+    assert diff.mode == UNCHANGED
+    assert diff.kept == [0, 1, 2] and diff.affected == []
+
+
+def test_target_level_change_regenerates_everything():
+    before = blank_profile()
+    before["overhead_squat"]["feet"]["heels_lift"] = 1
+    after = blank_profile()
+    after["shoulder_mobility"]["reach_quality"]["excessive_gap"] = 1
+    old_context, old_exercises = screen(before)
+    new_context, new_exercises = screen(after)
+    assert old_context.target_level != new_context.target_level
+
+    diff = diff_plan(plan_from(old_exercises), old_context, new_context, new_exercises)
+    assert diff.mode == FULL
+    assert diff.affected == [0, 1, 2]
+
+
+def test_new_fault_rewrites_only_some_cards():
+    before = blank_profile()
+    before["overhead_squat"]["feet"]["heels_lift"] = 1
+    after = blank_profile()
+    after["overhead_squat"]["feet"]["heels_lift"] = 1
+    after["overhead_squat"]["lower_limb"]["knee_valgus"] = 1
+    old_context, old_exercises = screen(before)
+    new_context, new_exercises = screen(after)
+    assert old_context.target_level == new_context.target_level
+
+    previous_plan = plan_from(old_exercises)
+    diff = diff_plan(previous_plan, old_context, new_context, new_exercises)
+    assert diff.mode == PARTIAL
+    assert diff.added_faults == (("overhead_squat", "lower_limb", "knee_valgus"),)
+    assert diff.affected and diff.kept
+    kept_names = {previous_plan["exercises"][i]["name"] for i in diff.kept}
+    assert not kept_names & {ex["exercise_name"] for ex in diff.available_exercises}
+
+    new_card = {"name": "NEW", "tag": "KNEE", "sets_reps": "3 x 8", "tempo": "3-1-1-0", "coach_tip": "Push knees out."}
+    merged = merge_cards(diff, [new_card])
+    assert [c["name"] for c in merged] == [
+        "NEW" if i in diff.affected else card["name"] for i, card in enumerate(previous_plan["exercises"])
+    ]
+
+
+def test_card_cueing_a_resolved_fault_is_rewritten():
+    before = blank_profile()
+    before["overhead_squat"]["feet"]["heels_lift"] = 1
+    before["overhead_squat"]["upper_body_bar_position"]["arms_fall_forward"] = 1
+    after = blank_profile()
+    after["overhead_squat"]["feet"]["heels_lift"] = 1
+    old_context, old_exercises = screen(before)
+    new_context, new_exercises = screen(after)
+
+    previous_plan = plan_from(old_exercises)
+    previous_plan["exercises"][0]["coach_tip"] = "Stop the arms fall forward by bracing."
+    diff = diff_plan(previous_plan, old_context, new_context, new_exercises)
+    assert 0 in diff.affected
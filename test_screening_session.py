@@ -0,0 +1,59 @@
+# test_screening_session.py: Single-test patches must give the same context as re-analyzing the whole profile.
+
+import random
+
+from src.logic.fms_schema import FMS_FAULT_SCHEMA, FMS_TESTS
+from src.pipeline import build_pipeline_context, update_pipeline_context
+from src.screening_sessions import ScreeningSessionStore
+
+
+def random_test_data(rng, test, p=0.15):
+    test_data = {"score": rng.randint(0, 3), "clearing_pain": rng.random() < 0.05}
+    for category, faults in FMS_FAULT_SCHEMA[test].items():
+        test_data[category] = {fault: int(rng.random() < p) for fault in faults}
+    return test_data
+
+
+def random_profile(rng):
+    profile = {test: random_test_data(rng, test, p=rng.choice([0.0, 0.05, 0.2])) for test in FMS_TESTS}
+    profile["use_manual_scores"] = rng.random() < 0.1
+    return profile
+
+
+def test_patch_matches_full_reanalysis():
+    rng = random.Random(9)
+    for _ in range(300):
+        context = build_pipeline_context(random_profile(rng))
+        for _ in range(7):
+            test = rng.choice(FMS_TESTS)
+            patched = update_pipeline_context(context, test, random_test_data(rng, test, p=rng.choice([0.0, 0.1, 0.3])))
+            full = build_pipeline_context(patched.full_data)
+            assert patched.analysis == full.analysis
+            assert patched.fault_bits == full.fault_bits
+            assert patched.tag_weights == full.tag_weights
+            assert patched.manual_scores == full.manual_scores
+            context = patched
+
+
+def test_patch_does_not_mutate_previous_context():
+    rng = random.Random(10)
+    context = build_pipeline_context(random_profile(rng))
+    before = (dict(context.effective_scores), context.fault_bits, dict(context.full_data))
+    update_pipeline_context(context, "overhead_squat", random_test_data(rng, "overhead_squat", p=0.5))
+    assert before == (dict(context.effective_scores), context.fault_bits, dict(context.full_data))
+
+
+def test_store_expires_and_evicts():
+    rng = random.Random(12)
+    store = ScreeningSessionStore(maxsize=2, ttl_seconds=60)
+    contexts = [build_pipeline_context(random_profile(rng)) for _ in range(3)]
+    sessions = [store.create(c) for c in contexts]
+    assert store.get(sessions[0].session_id) is None  # evicted (LRU, maxsize=2)
+    assert store.get(sessions[2].session_id).context is contexts[2]
+
+    session = store.update(sessions[2], contexts[0])
+    assert session.revision == 1 and session.context is contexts[0]
+
+    session.updated_at -= 120
+    assert store.get(session.session_id) is None
+    assert store.stats()["expired"] == 1
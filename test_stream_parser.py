@@ -0,0 +1,106 @@
+# test_stream_parser.py: Incremental exercise-card parsing of streamed LLM output, and the plan
+# sent when the stream fails after some cards were already delivered.
+
+import asyncio
+import json
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from src.rag import generator
+from src.rag.llm_cache import LLMResponseCache
+from src.rag.stream_parser import ExerciseCardStreamParser
+
+CARDS = [
+    {"name": "Wall Squat", "tag": "SQUAT", "sets_reps": "3 x 10", "tempo": "3-1-3-0",
+     "coach_tip": "Say \"knees out\" {twice} and keep \\ heels down."},
+    {"name": "Dead Bug", "tag": "CORE", "sets_reps": "3 x 8", "tempo": "Controlled",
+     "coach_tip": "Ribs down: no ] or } here ends the card."},
+]
+DOCUMENT = json.dumps({"session_title": "Level 5 {Squat}", "exercises": CARDS, "coach_summary": "Done."}, indent=2)
+
+
+def feed_all(chunks):
+    parser = ExerciseCardStreamParser()
+    return [card for chunk in chunks for card in parser.feed(chunk)]
+
+
+def test_whole_document_in_one_chunk():
+    assert feed_all([DOCUMENT]) == CARDS
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_split_at_random_points(seed):
+    rng = random.Random(seed)
+    cuts = sorted(rng.sample(range(1, len(DOCUMENT)), 25))
+    chunks = [DOCUMENT[i:j] for i, j in zip([0, *cuts], [*cuts, len(DOCUMENT)])]
+    assert feed_all(chunks) == CARDS
+
+
+def test_one_character_at_a_time():
+    # splits inside "exercises", inside escapes (\" and \\) and between every brace
+    assert feed_all(list(DOCUMENT)) == CARDS
+
+
+def test_cards_arrive_as_soon_as_they_close():
+    parser = ExerciseCardStreamParser()
+    first_end = DOCUMENT.rindex("}", 0, DOCUMENT.index("Dead Bug")) + 1   # the card's own closing brace
+    assert parser.feed(DOCUMENT[:first_end - 1]) == []
+    assert parser.feed(DOCUMENT[first_end - 1:first_end]) == [CARDS[0]]
+
+
+def test_malformed_and_truncated_tails():
+    # an unclosed card at the end of the stream is never emitted
+    truncated = DOCUMENT[:DOCUMENT.index("Dead Bug")]
+    assert feed_all([truncated]) == [CARDS[0]]
+    # an object that is not valid JSON is skipped, later cards still parse
+    broken = '{"exercises": [{"name": oops}, ' + json.dumps(CARDS[1]) + "]}"
+    assert feed_all([broken]) == [CARDS[1]]
+    # anything after the closing ] is ignored, even card-shaped objects
+    trailing = '{"exercises": [' + json.dumps(CARDS[0]) + '], "extra": [' + json.dumps(CARDS[1]) + "]}"
+    assert feed_all([trailing]) == [CARDS[0]]
+    # no exercises array at all
+    assert feed_all(['{"session_title": "x"}', "garbage {"]) == []
+
+
+class FailingStream:
+    """Stream chain that sends `text` in small chunks, then raises."""
+
+    def __init__(self, text):
+        self.text = text
+
+    async def astream(self, inputs):
+        for i in range(0, len(self.text), 7):
+            yield SimpleNamespace(content=self.text[i:i + 7])
+        raise RuntimeError("connection reset")
+
+
+def run_stream(monkeypatch, tmp_path, text):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    cache = LLMResponseCache(path=str(tmp_path / "llm_cache.sqlite3"), enabled=True)
+    monkeypatch.setattr(generator, "llm_cache", cache)
+    monkeypatch.setattr(generator.chain_registry, "get_stream_chain", lambda model, api_key: FailingStream(text))
+    exercises = [{"exercise_name": "Wall Squat", "difficulty_level": 5, "tags": ["pattern_squat"]},
+                 {"exercise_name": "Goblet Squat", "difficulty_level": 5, "tags": ["pattern_squat"]}]
+    analysis = {"status": "PATTERN", "target_level": 5, "detailed_faults": {}}
+
+    async def collect():
+        return [event async for event in generator.astream_workout_plan(analysis, exercises)]
+
+    return asyncio.run(collect()), cache
+
+
+def test_failure_after_cards_keeps_the_cards_sent(monkeypatch, tmp_path):
+    truncated = DOCUMENT[:DOCUMENT.index("Dead Bug")]
+    events, cache = run_stream(monkeypatch, tmp_path, truncated)
+    assert events[:-1] == [("card", CARDS[0])]
+    kind, plan = events[-1]
+    assert kind == "plan" and plan["exercises"] == [CARDS[0]]
+    assert cache.stats()["writes"] == 0
+
+
+def test_failure_before_any_card_falls_back(monkeypatch, tmp_path):
+    events, _ = run_stream(monkeypatch, tmp_path, '{"session_title": "Lev')
+    assert [kind for kind, _ in events] == ["plan"]
+    assert [card["name"] for card in events[0][1]["exercises"]] == ["Goblet Squat", "Wall Squat"]
@@ -0,0 +1,38 @@
+import asyncio
+import signal
+
+from main import _process_workout_generation
+from src.jobs import WORKER_CONCURRENCY, run_worker
+from src.persistence import assessment_writer
+from src.rag.generator import init_llm_limiter
+from src.rag.knowledge_base import kb_store
+
+# Standalone generation worker for the async job API (POST /jobs/generate-workout).
+# Scale these separately from the API:  python worker.py
+
+async def handle_generation_job(payload, db, job_id):
+    # Raises on LLM or save failures, so the job is retried with backoff instead of succeeding
+    # with a fallback plan; the assessment is stored (once per job) before the job is marked succeeded.
+    return await _process_workout_generation(payload, db, durable=True, job_id=job_id)
+
+async def main():
+    kb = kb_store.reload(force=True)
+    print(f"📚 Knowledge base ready: {len(kb)} exercises (kb_version={kb.version})")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    init_llm_limiter()
+    assessment_writer.start()
+    print(f"🛠️ Worker started: {WORKER_CONCURRENCY} concurrent jobs")
+    try:
+        await run_worker(handle_generation_job, WORKER_CONCURRENCY, stop)
+    finally:
+        # Running jobs have finished; write their assessments before exiting
+        await assessment_writer.stop()
+    print("👋 Worker stopped.")
+
+if __name__ == "__main__":
+    asyncio.run(main())